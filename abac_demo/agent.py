@@ -1,6 +1,6 @@
 import os
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 
 from google.adk.agents import Agent
 
@@ -8,7 +8,8 @@ from google.adk.agents import Agent
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-from abac_demo.tools.datastore import get_datastore_content
+from abac_demo.attributes import build_resolver
+from abac_demo.tools.datastore import get_datastore_content, run_in_io_pool
 from google.adk.tools import ToolContext
 
 # Agent Definitions
@@ -44,17 +45,76 @@ else:
     datastore_name = "sales"
     logger.info("ABAC Demo: Initialized for Sales Agent.")
 
+# Resolves the caller's attributes on every tool call. Without ABAC_ATTRIBUTES_FILE,
+# every caller gets the role configured above.
+attribute_resolver = build_resolver({"agent_type": datastore_name, "access_level": access_level})
 
-def tool_wrapper(tool_context: ToolContext) -> Dict[str, Any]:
+
+def tool_wrapper(
+    tool_context: ToolContext,
+    page_size: Optional[int] = None,
+    cursor: Optional[str] = None,
+    filters: Optional[str] = None,
+    fields: Optional[List[str]] = None,
+) -> Dict[str, Any]:
     """Fetches content from the datastore based on the user's access level.
 
+    The caller's agent type and access level are resolved for each call, so one
+    process can serve every role. Large datastores are returned one page at a time.
+    When the result contains a 'next_cursor', call the tool again with that cursor
+    to fetch the next page. Use 'filters' and 'fields' to fetch only the records and
+    fields you need instead of the whole datastore.
+
     Args:
         tool_context (ToolContext): The tool context.
+        page_size (Optional[int]): The maximum number of records to return.
+        cursor (Optional[str]): The 'next_cursor' from the previous page, if any.
+        filters (Optional[str]): Conditions joined with 'and', using ==, !=, >, >=, <, <=
+            on quoted strings or numbers, e.g. "campaign == 'Q1_Launch' and budget > 50000".
+        fields (Optional[List[str]]): The fields to return for each record.
 
     Returns:
         dict: The datastore content or an error message.
     """
-    logger.info(f"tool_wrapper called for datastore: {datastore_name} with access level: {access_level}")
-    return get_datastore_content(datastore_name, access_level, tool_context)
+    try:
+        attributes = attribute_resolver.resolve(tool_context)
+    except Exception as e:
+        logger.error(f"tool_wrapper could not resolve caller attributes: {e}")
+        return {"status": "error", "message": "Unable to determine the caller's access rights."}
+    if attributes is None:
+        logger.warning("tool_wrapper denied access to a caller without ABAC attributes.")
+        return {"status": "error", "message": "Access denied: unknown caller."}
+
+    caller_type = attributes.get("agent_type")
+    caller_level = attributes.get("access_level")
+    logger.info(f"tool_wrapper called for datastore: {caller_type} with access level: {caller_level}")
+    return get_datastore_content(
+        caller_type,
+        caller_level,
+        tool_context,
+        agent_type=caller_type,
+        page_size=page_size,
+        cursor=cursor,
+        filters=filters,
+        fields=fields,
+    )
+
+
+async def tool_wrapper_async(
+    tool_context: ToolContext,
+    page_size: Optional[int] = None,
+    cursor: Optional[str] = None,
+    filters: Optional[str] = None,
+    fields: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """Runs `tool_wrapper` on the datastore I/O pool, since its attribute lookups and reads block."""
+    return await run_in_io_pool(
+        tool_wrapper, tool_context, page_size=page_size, cursor=cursor, filters=filters, fields=fields
+    )
+
+# ADK builds the tool's description from its docstring, so the model sees the same one either way.
+tool_wrapper_async.__doc__ = tool_wrapper.__doc__
 
-root_agent.tools = [tool_wrapper]
+# ABAC_ASYNC_DATASTORE=true serves the tool without blocking the event loop during datastore I/O.
+use_async_datastore: bool = os.getenv("ABAC_ASYNC_DATASTORE", "false").lower() == "true"
+root_agent.tools = [tool_wrapper_async if use_async_datastore else tool_wrapper]
@@ -0,0 +1,224 @@
+"""Per-request resolution of ABAC subject attributes.
+
+Attributes are looked up for each tool call, so a single process can serve every
+role. They are taken from:
+
+1. An `AttributeProvider` keyed by the caller's user id, when one is configured.
+   `FileAttributeProvider` is a local, file-backed stand-in for a directory
+   service. The provider is the only source in this mode: session state can be
+   seeded by the client (e.g. the `state` of `create_session`), so it must not
+   be able to raise a caller's role.
+2. Without a provider (the single-role demo deployment), the session state
+   (`user:agent_type` / `user:access_level`) if it carries both keys, otherwise
+   the process defaults (from `AGENT_TYPE` / `ACCESS_LEVEL`).
+
+Provider results, including "unknown principal", are kept in a bounded TTL cache
+so most tool calls do not reach the provider. Access decisions need no separate
+cache: they come from the precomputed table in `abac_demo.policy`.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Protocol, Tuple
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+ATTRIBUTE_NAMES: Tuple[str, ...] = ("agent_type", "access_level")
+STATE_KEYS: Dict[str, str] = {name: f"user:{name}" for name in ATTRIBUTE_NAMES}
+
+DEFAULT_TTL_SECONDS: float = float(os.getenv("ABAC_ATTRIBUTE_TTL_SECONDS", "300"))
+DEFAULT_NEGATIVE_TTL_SECONDS: float = float(os.getenv("ABAC_ATTRIBUTE_NEGATIVE_TTL_SECONDS", "30"))
+DEFAULT_MAX_ENTRIES: int = int(os.getenv("ABAC_ATTRIBUTE_CACHE_MAX_ENTRIES", "10000"))
+
+Attributes = Dict[str, str]
+
+_MISSING = object()
+
+
+class TTLCache:
+    """A bounded, thread-safe LRU cache whose entries expire after a time-to-live.
+
+    Negative results (None) are cached under their own, usually shorter, TTL so
+    repeated lookups of unknown keys do not hammer the backing service.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        ttl: float = DEFAULT_TTL_SECONDS,
+        negative_ttl: float = DEFAULT_NEGATIVE_TTL_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._expirations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Returns the cached value for `key`, or `default` if absent or expired."""
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                self._misses += 1
+                return default
+            expires_at, value = item
+            if expires_at <= self._clock():
+                del self._entries[key]
+                self._expirations += 1
+                self._misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Caches `value` under `key`, using the negative TTL when `value` is None."""
+        ttl = self.negative_ttl if value is None else self.ttl
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (self._clock() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_load(self, key: Hashable, load: Callable[[], Any]) -> Any:
+        """Returns the cached value for `key`, calling `load()` and caching its result on a miss."""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = load()
+            self.set(key, value)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._hits = self._misses = self._expirations = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "expirations": self._expirations,
+                "entries": len(self._entries),
+            }
+
+
+class AttributeProvider(Protocol):
+    """Looks up the ABAC attributes of a principal (e.g. a directory or IAM service)."""
+
+    def get_attributes(self, principal: str) -> Optional[Attributes]:
+        """Returns the principal's attributes, or None if the principal is unknown."""
+        ...
+
+
+class FileAttributeProvider:
+    """An `AttributeProvider` backed by a JSON file mapping user ids to attributes.
+
+    Example file: `{"alice": {"agent_type": "marketing", "access_level": "manager"}}`.
+    The file is re-read on every lookup, like a round-trip to a real provider.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def get_attributes(self, principal: str) -> Optional[Attributes]:
+        with open(self.path, 'r') as f:
+            attributes = json.load(f).get(principal)
+        return dict(attributes) if attributes is not None else None
+
+
+def _state_attributes(tool_context: Any) -> Optional[Attributes]:
+    state = getattr(tool_context, "state", None)
+    if state is None:
+        return None
+    attributes = {name: state.get(key) for name, key in STATE_KEYS.items()}
+    if not all(isinstance(value, str) for value in attributes.values()):
+        return None
+    return attributes
+
+
+def _principal(tool_context: Any) -> Optional[str]:
+    principal = getattr(tool_context, "user_id", None)
+    return principal if isinstance(principal, str) and principal else None
+
+
+class AttributeResolver:
+    """Resolves the subject attributes for a tool call, caching provider lookups per principal."""
+
+    def __init__(
+        self,
+        provider: Optional[AttributeProvider] = None,
+        defaults: Optional[Attributes] = None,
+        cache: Optional[TTLCache] = None,
+    ):
+        self.provider = provider
+        self.defaults = defaults
+        self.cache = cache if cache is not None else TTLCache()
+
+    def resolve(self, tool_context: Any) -> Optional[Attributes]:
+        """Returns the caller's attributes, or None if they cannot be determined.
+
+        Args:
+            tool_context (ToolContext): The tool context of the current call.
+
+        Returns:
+            Optional[Attributes]: The attributes (every name in `ATTRIBUTE_NAMES`),
+                or None for an unknown caller.
+        """
+        if self.provider is None:
+            attributes = _state_attributes(tool_context)
+            if attributes is not None:
+                return attributes
+            return dict(self.defaults) if self.defaults is not None else None
+
+        if _state_attributes(tool_context) is not None:
+            logger.warning("Ignoring ABAC attributes in session state: an attribute provider is configured.")
+        principal = _principal(tool_context)
+        if principal is None:
+            logger.warning("Cannot resolve ABAC attributes: the tool context carries no user id.")
+            return None
+        attributes = self.cache.get_or_load(principal, lambda: self._lookup(principal))
+        return dict(attributes) if attributes is not None else None
+
+    def _lookup(self, principal: str) -> Optional[Attributes]:
+        try:
+            attributes = self.provider.get_attributes(principal)
+        except Exception as e:
+            # Provider failures are not cached, so the next call retries.
+            logger.error(f"Attribute provider failed for principal '{principal}': {e}")
+            raise
+        if attributes is None or not all(isinstance(attributes.get(name), str) for name in ATTRIBUTE_NAMES):
+            logger.warning(f"No complete ABAC attributes found for principal '{principal}'.")
+            return None
+        return attributes
+
+
+def build_resolver(defaults: Attributes) -> AttributeResolver:
+    """Builds the resolver for the ABAC agent's tool.
+
+    When `ABAC_ATTRIBUTES_FILE` is set, attributes are resolved per user from that
+    file only; `defaults` and session state are ignored, so unknown users are
+    denied rather than inheriting the process role or claiming their own.
+
+    Args:
+        defaults (Attributes): The process-wide attributes used without a provider.
+
+    Returns:
+        AttributeResolver: The resolver.
+    """
+    attributes_file = os.getenv("ABAC_ATTRIBUTES_FILE")
+    if attributes_file:
+        logger.info(f"Resolving ABAC attributes per user from '{attributes_file}'.")
+        return AttributeResolver(provider=FileAttributeProvider(attributes_file))
+    return AttributeResolver(defaults=defaults)
@@ -0,0 +1,278 @@
+"""Declarative ABAC policies compiled into an indexed decision table.
+
+A policy is plain data (a dict, or a JSON file with the same shape):
+
+- ``attributes``: the subject attributes and the values each may take.
+- ``subjects``: named subjects, each a set of attribute values.
+- ``datastores``: the protected datastores and the field sets each exposes.
+  A field set of ``"*"`` exposes every field.
+- ``actions``: the actions that can be performed on a datastore.
+- ``rules``: ``allow``/``deny`` rules matching on subject attributes,
+  datastores and actions. Deny rules override allow rules; among allow rules
+  the first match wins and selects the field set to serve.
+
+`compile_policy` evaluates the rules against every combination of attribute
+values, datastore and action once, so `CompiledPolicy.evaluate` is a single
+dictionary lookup.
+"""
+import itertools
+import json
+import logging
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, Iterable, List, Mapping, Optional, Tuple, Union
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+WILDCARD = "*"
+
+DEFAULT_POLICY: Dict[str, Any] = {
+    "attributes": {
+        "agent_type": ["marketing", "sales"],
+        "access_level": ["employee", "manager"],
+    },
+    "subjects": {
+        "marketing_employee": {"agent_type": "marketing", "access_level": "employee"},
+        "marketing_manager": {"agent_type": "marketing", "access_level": "manager"},
+        "sales_employee": {"agent_type": "sales", "access_level": "employee"},
+        "sales_manager": {"agent_type": "sales", "access_level": "manager"},
+    },
+    "datastores": {
+        "marketing": {"field_sets": {"full": WILDCARD, "limited": ["campaigns"]}},
+        "sales": {"field_sets": {"full": WILDCARD, "limited": ["deals"]}},
+    },
+    "actions": ["read"],
+    "rules": [
+        {"id": "managers-read-full", "effect": "allow", "subject": {"access_level": "manager"},
+         "datastores": WILDCARD, "actions": ["read"], "field_set": "full"},
+        {"id": "employees-read-limited", "effect": "allow", "subject": {"access_level": "employee"},
+         "datastores": WILDCARD, "actions": ["read"], "field_set": "limited"},
+        {"id": "marketing-only-marketing", "effect": "deny", "subject": {"agent_type": "marketing"},
+         "datastores": ["sales"], "actions": WILDCARD},
+        {"id": "sales-only-sales", "effect": "deny", "subject": {"agent_type": "sales"},
+         "datastores": ["marketing"], "actions": WILDCARD},
+    ],
+}
+
+Subject = Union[str, Mapping[str, Optional[str]]]
+
+
+class PolicyError(ValueError):
+    """Raised when a policy document is malformed or a subject cannot be resolved."""
+
+
+@dataclass(frozen=True)
+class Decision:
+    """The outcome of evaluating a subject's request against a policy.
+
+    Attributes:
+        allowed (bool): Whether the request is permitted.
+        field_set (Optional[str]): The name of the field set to serve, when allowed.
+        fields (Optional[FrozenSet[str]]): The permitted fields, or None for every field.
+        rule (Optional[str]): The id of the deciding rule, if any rule matched.
+        reason (str): A short, loggable explanation.
+    """
+    allowed: bool
+    field_set: Optional[str] = None
+    fields: Optional[FrozenSet[str]] = None
+    rule: Optional[str] = None
+    reason: str = ""
+
+
+DEFAULT_DENY = Decision(allowed=False, reason="no matching rule")
+
+
+class CompiledPolicy:
+    """A policy compiled into a decision table keyed by (attribute values..., datastore, action)."""
+
+    def __init__(
+        self,
+        attribute_order: Tuple[str, ...],
+        domains: Dict[str, FrozenSet[str]],
+        subjects: Dict[str, Dict[str, str]],
+        table: Dict[Tuple[Optional[str], ...], Decision],
+        field_sets: Dict[str, Dict[str, Optional[FrozenSet[str]]]],
+    ):
+        self.attribute_order = attribute_order
+        self.domains = domains
+        self.subjects = subjects
+        self.field_sets = field_sets
+        self._table = table
+
+    def __len__(self) -> int:
+        return len(self._table)
+
+    def knows_value(self, attribute: str, value: Optional[str]) -> bool:
+        """Returns True if `value` is a declared value of `attribute`."""
+        return value in self.domains.get(attribute, ())
+
+    def _key(self, subject: Subject) -> Tuple[Optional[str], ...]:
+        if isinstance(subject, str):
+            try:
+                subject = self.subjects[subject]
+            except KeyError:
+                raise PolicyError(f"Unknown subject '{subject}'.") from None
+        return tuple(subject.get(attribute) for attribute in self.attribute_order)
+
+    def evaluate(self, subject: Subject, datastore: str, action: str = "read") -> Decision:
+        """Decides whether `subject` may perform `action` on `datastore`.
+
+        Args:
+            subject (Subject): A named subject, or a mapping of attribute values.
+                Attributes that are missing or None are treated as unset.
+            datastore (str): The datastore being accessed.
+            action (str): The action being performed.
+
+        Returns:
+            Decision: The precomputed decision. Unknown attribute values,
+                datastores and actions are denied.
+        """
+        return self._table.get(self._key(subject) + (datastore, action), DEFAULT_DENY)
+
+    def evaluate_many(
+        self, requests: Iterable[Tuple[Subject, str]], action: str = "read"
+    ) -> List[Decision]:
+        """Evaluates many (subject, datastore) pairs for the same action.
+
+        Args:
+            requests (Iterable[Tuple[Subject, str]]): The pairs to evaluate.
+            action (str): The action being performed.
+
+        Returns:
+            list: One Decision per pair, in input order.
+        """
+        table_get = self._table.get
+        key = self._key
+        return [table_get(key(subject) + (datastore, action), DEFAULT_DENY) for subject, datastore in requests]
+
+
+def _as_list(value: Any, universe: Iterable[str], what: str) -> List[str]:
+    """Expands a wildcard or single value into a list, checking it against the declared universe."""
+    universe = list(universe)
+    if value == WILDCARD:
+        return universe
+    values = [value] if isinstance(value, str) else list(value)
+    unknown = [v for v in values if v not in universe]
+    if unknown:
+        raise PolicyError(f"Undeclared {what}: {unknown}.")
+    return values
+
+
+def _resolve_fields(field_set: Any) -> Optional[FrozenSet[str]]:
+    return None if field_set == WILDCARD else frozenset(field_set)
+
+
+def compile_policy(spec: Mapping[str, Any]) -> CompiledPolicy:
+    """Validates a policy document and compiles it into a decision table.
+
+    Args:
+        spec (Mapping[str, Any]): The policy document.
+
+    Returns:
+        CompiledPolicy: The compiled policy.
+
+    Raises:
+        PolicyError: If the document references undeclared attributes, values,
+            datastores, actions or field sets.
+    """
+    try:
+        attributes: Dict[str, List[str]] = {name: list(values) for name, values in spec["attributes"].items()}
+        datastores: Dict[str, Dict[str, Any]] = dict(spec["datastores"])
+        actions: List[str] = list(spec["actions"])
+        rules: List[Mapping[str, Any]] = list(spec["rules"])
+    except KeyError as e:
+        raise PolicyError(f"Policy is missing required section {e}.") from None
+
+    subjects: Dict[str, Dict[str, str]] = {}
+    for name, values in spec.get("subjects", {}).items():
+        for attribute, value in values.items():
+            _as_list(value, attributes.get(attribute, ()), f"value for attribute '{attribute}' in subject '{name}'")
+        subjects[name] = dict(values)
+
+    compiled_rules = []
+    for index, rule in enumerate(rules):
+        rule_id = rule.get("id", f"rule-{index}")
+        effect = rule.get("effect", "allow")
+        if effect not in ("allow", "deny"):
+            raise PolicyError(f"Rule '{rule_id}' has invalid effect '{effect}'.")
+        conditions = {}
+        for attribute, value in rule.get("subject", {}).items():
+            if attribute not in attributes:
+                raise PolicyError(f"Rule '{rule_id}' references undeclared attribute '{attribute}'.")
+            conditions[attribute] = frozenset(_as_list(value, attributes[attribute], f"value for '{attribute}' in rule '{rule_id}'"))
+        rule_datastores = _as_list(rule.get("datastores", WILDCARD), datastores, f"datastore in rule '{rule_id}'")
+        rule_actions = _as_list(rule.get("actions", WILDCARD), actions, f"action in rule '{rule_id}'")
+        field_set = rule.get("field_set")
+        if effect == "allow":
+            for datastore in rule_datastores:
+                if field_set not in datastores[datastore].get("field_sets", {}):
+                    raise PolicyError(f"Rule '{rule_id}' selects field set '{field_set}' not declared for datastore '{datastore}'.")
+        compiled_rules.append((rule_id, effect, conditions, frozenset(rule_datastores), frozenset(rule_actions), field_set))
+
+    attribute_order = tuple(attributes)
+    # None stands for an attribute the caller did not supply.
+    value_space = [[None, *attributes[attribute]] for attribute in attribute_order]
+
+    table: Dict[Tuple[Optional[str], ...], Decision] = {}
+    for values in itertools.product(*value_space):
+        subject = dict(zip(attribute_order, values))
+        matching = [
+            rule for rule in compiled_rules
+            if all(subject[attribute] in allowed for attribute, allowed in rule[2].items())
+        ]
+        for datastore, action in itertools.product(datastores, actions):
+            applicable = [rule for rule in matching if datastore in rule[3] and action in rule[4]]
+            deny = next((rule for rule in applicable if rule[1] == "deny"), None)
+            allow = next((rule for rule in applicable if rule[1] == "allow"), None)
+            if deny is not None:
+                decision = Decision(allowed=False, rule=deny[0], reason=f"denied by rule '{deny[0]}'")
+            elif allow is not None:
+                field_set = allow[5]
+                decision = Decision(
+                    allowed=True,
+                    field_set=field_set,
+                    fields=_resolve_fields(datastores[datastore]["field_sets"][field_set]),
+                    rule=allow[0],
+                    reason=f"allowed by rule '{allow[0]}'",
+                )
+            else:
+                continue  # Falls through to DEFAULT_DENY at lookup time.
+            table[values + (datastore, action)] = decision
+
+    logger.info(f"Compiled ABAC policy: {len(compiled_rules)} rules into {len(table)} decisions.")
+    return CompiledPolicy(
+        attribute_order=attribute_order,
+        domains={name: frozenset(values) for name, values in attributes.items()},
+        subjects=subjects,
+        table=table,
+        field_sets={
+            datastore: {name: _resolve_fields(fields) for name, fields in config.get("field_sets", {}).items()}
+            for datastore, config in datastores.items()
+        },
+    )
+
+
+def load_policy(path: str) -> CompiledPolicy:
+    """Loads and compiles a JSON policy document.
+
+    Args:
+        path (str): Path to the policy file.
+
+    Returns:
+        CompiledPolicy: The compiled policy.
+    """
+    with open(path, 'r') as f:
+        return compile_policy(json.load(f))
+
+
+def _load_active_policy() -> CompiledPolicy:
+    policy_file = os.getenv("ABAC_POLICY_FILE")
+    if policy_file:
+        logger.info(f"Loading ABAC policy from '{policy_file}'.")
+        return load_policy(policy_file)
+    return compile_policy(DEFAULT_POLICY)
+
+
+# The policy enforced by the datastore tool, compiled once at import.
+active_policy: CompiledPolicy = _load_active_policy()
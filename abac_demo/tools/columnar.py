@@ -0,0 +1,277 @@
+"""Columnar copies of record datastores with indexed filter and projection pushdown.
+
+A record-oriented datastore (a list of dicts) is converted once into one NumPy
+array per field. Numeric fields keep a sorted index, so range and equality
+filters are answered with a binary search; other fields get a value index on
+first use. A query therefore touches only the matching rows, and the response
+is assembled from the requested columns alone.
+
+Filters use a small expression language: comparisons joined with `and`, e.g.
+`campaign == 'Q1_Launch' and budget > 50000`. Supported operators are
+`==`, `!=`, `>`, `>=`, `<`, `<=`; values are quoted strings, numbers, `true`,
+`false` or `null`. Range operators require a numeric field.
+"""
+import ast
+import re
+from dataclasses import dataclass
+from typing import Any, Collection, Dict, Iterable, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+_CLAUSE = re.compile(
+    r"""\s*(?P<field>[A-Za-z_]\w*)\s*(?P<op>==|!=|>=|<=|>|<)\s*"""
+    r"""(?P<value>'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*"|-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?|true|false|null)\s*"""
+)
+_AND = re.compile(r"and\b\s*", re.IGNORECASE)
+_LITERALS = {"true": True, "false": False, "null": None}
+_RANGE_OPS = frozenset({">", ">=", "<", "<="})
+
+
+class QueryError(ValueError):
+    """Raised when a filter expression is malformed or references an unavailable field."""
+
+
+@dataclass(frozen=True)
+class Condition:
+    """A single `field op value` comparison."""
+    field: str
+    op: str
+    value: Any
+
+    def matches(self, record: Mapping[str, Any]) -> bool:
+        """Evaluates the condition against one record (used when streaming records)."""
+        if self.field not in record:
+            return False
+        actual = record[self.field]
+        if self.op == "==":
+            return actual == self.value
+        if self.op == "!=":
+            return actual != self.value
+        if not _is_number(actual):
+            return False
+        if self.op == ">":
+            return actual > self.value
+        if self.op == ">=":
+            return actual >= self.value
+        if self.op == "<":
+            return actual < self.value
+        return actual <= self.value
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def parse_filters(expression: Optional[str]) -> List[Condition]:
+    """Parses a filter expression into conditions that must all hold.
+
+    Args:
+        expression (Optional[str]): The expression, or None/empty for no filter.
+
+    Returns:
+        list: The parsed conditions.
+
+    Raises:
+        QueryError: If the expression is malformed.
+    """
+    if not expression or not expression.strip():
+        return []
+    conditions = []
+    position = 0
+    while True:
+        match = _CLAUSE.match(expression, position)
+        if match is None:
+            raise QueryError(f"Invalid filter near: '{expression[position:position + 30]}'.")
+        raw = match.group("value")
+        value = _LITERALS[raw] if raw in _LITERALS else ast.literal_eval(raw)
+        op = match.group("op")
+        if op in _RANGE_OPS and not _is_number(value):
+            raise QueryError(f"Operator '{op}' requires a numeric value.")
+        conditions.append(Condition(match.group("field"), op, value))
+        position = match.end()
+        if position == len(expression):
+            return conditions
+        separator = _AND.match(expression, position)
+        if separator is None:
+            raise QueryError(f"Expected 'and' near: '{expression[position:position + 30]}'.")
+        position = separator.end()
+
+
+def check_fields(conditions: Sequence[Condition], fields: Optional[Iterable[str]], known: Collection[str]) -> None:
+    """Checks that a query references only `known` fields.
+
+    Raises:
+        QueryError: With the same messages as `ColumnarTable.query`, if a condition or
+            requested field is not in `known`.
+    """
+    for condition in conditions:
+        if condition.field not in known:
+            raise QueryError(f"Unknown field '{condition.field}'.")
+    if fields is not None:
+        unknown = [name for name in dict.fromkeys(fields) if name not in known]
+        if unknown:
+            raise QueryError(f"Unknown field(s): {unknown}.")
+
+
+def matches_all(conditions: Sequence[Condition], record: Mapping[str, Any]) -> bool:
+    """Returns True if `record` satisfies every condition."""
+    return all(condition.matches(record) for condition in conditions)
+
+
+class _Column:
+    """One field of a columnar table.
+
+    `present` marks the rows that have the field, `null` those where it is null.
+    Nulls do not decide the column type: a numeric field with some nulls stays
+    numeric, and its nulls fail range comparisons as in `Condition.matches`.
+    """
+
+    def __init__(self, values: List[Any], present: np.ndarray):
+        self.present = present
+        self.null = present & np.fromiter((v is None for v in values), dtype=bool, count=len(values))
+        has_value = present & ~self.null
+        known_values = [v for v, p in zip(values, has_value) if p]
+        self.numeric = bool(known_values) and all(_is_number(v) for v in known_values)
+        self.integral = self.numeric and all(isinstance(v, int) for v in known_values)
+        # Only nulls (or nothing): range comparisons match no row instead of being rejected.
+        self.empty = not known_values
+        self._value_index: Optional[Dict[Any, np.ndarray]] = None
+        if self.numeric:
+            self.values = np.array([v if p else np.nan for v, p in zip(values, has_value)], dtype=np.float64)
+            order = np.argsort(self.values, kind="stable")  # NaN (missing or null) sorts last
+            self._order = order[: int(has_value.sum())]
+            self._sorted = self.values[self._order]
+        else:
+            self.values = np.empty(len(values), dtype=object)
+            self.values[:] = values
+
+    def select(self, op: str, value: Any) -> np.ndarray:
+        """Returns the (unsorted) row indices satisfying `column op value`."""
+        if self.numeric:
+            return self._select_numeric(op, value)
+        if op in _RANGE_OPS:
+            if self.empty:
+                return np.empty(0, dtype=np.int64)
+            raise QueryError(f"Operator '{op}' requires a numeric field.")
+        equal = self._index().get(_index_key(value), np.empty(0, dtype=np.int64))
+        if op == "==":
+            return equal
+        not_equal = np.flatnonzero(self.present)
+        return np.setdiff1d(not_equal, equal, assume_unique=True)
+
+    def _select_numeric(self, op: str, value: Any) -> np.ndarray:
+        if not _is_number(value):
+            if op == "==":
+                return np.flatnonzero(self.null) if value is None else np.empty(0, dtype=np.int64)
+            if op == "!=":
+                return self._order if value is None else np.flatnonzero(self.present)
+            raise QueryError(f"Operator '{op}' requires a numeric value.")
+        left = int(np.searchsorted(self._sorted, value, side="left"))
+        right = int(np.searchsorted(self._sorted, value, side="right"))
+        if op == "==":
+            return self._order[left:right]
+        if op == "!=":
+            return np.concatenate((self._order[:left], self._order[right:], np.flatnonzero(self.null)))
+        if op == ">":
+            return self._order[right:]
+        if op == ">=":
+            return self._order[left:]
+        if op == "<":
+            return self._order[:left]
+        return self._order[:right]
+
+    def _index(self) -> Dict[Any, np.ndarray]:
+        if self._value_index is None:
+            positions: Dict[Any, List[int]] = {}
+            for i, (value, present) in enumerate(zip(self.values, self.present)):
+                if present:
+                    key = _index_key(value)
+                    if key is not None:
+                        positions.setdefault(key, []).append(i)
+            self._value_index = {key: np.array(rows, dtype=np.int64) for key, rows in positions.items()}
+        return self._value_index
+
+    def take(self, rows: np.ndarray) -> List[Any]:
+        values = self.values[rows].tolist()
+        if self.integral:
+            values = [int(v) if v == v else None for v in values]
+        elif self.numeric:
+            values = [v if v == v else None for v in values]  # NaN marks a null
+        return values
+
+
+def _index_key(value: Any) -> Any:
+    # Keeps True/1 and False/0 apart, and skips unhashable values such as lists.
+    try:
+        hash(value)
+    except TypeError:
+        return None
+    return (type(value) is bool, value)
+
+
+class ColumnarTable:
+    """A read-only columnar copy of a list of records."""
+
+    def __init__(self, columns: Dict[str, _Column], length: int):
+        self.columns = columns
+        self.length = length
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the column arrays and sorted indexes (values of object columns are shared)."""
+        total = 0
+        for column in self.columns.values():
+            total += column.values.nbytes + column.present.nbytes + column.null.nbytes
+            if column.numeric:
+                total += column._order.nbytes + column._sorted.nbytes
+        return total
+
+    @classmethod
+    def from_records(cls, records: Sequence[Mapping[str, Any]]) -> "ColumnarTable":
+        """Builds the columnar copy of `records`."""
+        names: Dict[str, None] = {}
+        for record in records:
+            names.update(dict.fromkeys(record))
+        columns = {}
+        for name in names:
+            present = np.fromiter((name in record for record in records), dtype=bool, count=len(records))
+            values = [record.get(name) for record in records]
+            columns[name] = _Column(values, present)
+        return cls(columns, len(records))
+
+    def query(self, conditions: Sequence[Condition], fields: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+        """Returns the matching rows, restricted to `fields`, in their original order.
+
+        Args:
+            conditions (Sequence[Condition]): Conditions that must all hold.
+            fields (Optional[Iterable[str]]): The fields to return, or None for all of them.
+
+        Returns:
+            list: The matching rows. Fields a row does not have are omitted.
+
+        Raises:
+            QueryError: If a condition or requested field is not a column of the table.
+        """
+        check_fields(conditions, fields, self.columns)
+        rows: Optional[np.ndarray] = None
+        for condition in conditions:
+            column = self.columns[condition.field]
+            selected = column.select(condition.op, condition.value)
+            rows = selected if rows is None else np.intersect1d(rows, selected, assume_unique=True)
+            if rows.size == 0:
+                break
+        if rows is None:
+            rows = np.arange(self.length)
+        else:
+            rows = np.sort(rows)
+
+        names = list(self.columns) if fields is None else list(dict.fromkeys(fields))
+
+        result: List[Dict[str, Any]] = [{} for _ in range(rows.size)]
+        for name in names:
+            column = self.columns[name]
+            present = column.present[rows].tolist()
+            for row, value, has_value in zip(result, column.take(rows), present):
+                if has_value:
+                    row[name] = value
+        return result
@@ -1,40 +1,303 @@
+import asyncio
+import copy
+import functools
 import json
 import logging
-from typing import Dict, Any
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Any, List, Optional, Set, Tuple, TypeVar, Union
 
 from google.adk.tools import ToolContext
 
+from abac_demo import policy
+from abac_demo.tools import columnar, pagination, snapshot
+from abac_demo.tools.datastore_cache import DatastoreCache
+from abac_demo.tools.projection import compile_projection, field_set_projection
+
 # Configure logging
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+# Directory holding the '{name}_data.json' (or record-oriented '{name}_data.jsonl') datastore files.
+DATA_DIR: str = os.getenv("ABAC_DATA_DIR", "abac_demo/data")
+
+# Process-wide cache of parsed datastore files, shared by every tool call.
+datastore_cache = DatastoreCache()
+
+# Size of the thread pool that runs datastore reads for `get_datastore_content_async`.
+IO_WORKERS: int = int(os.getenv("ABAC_DATASTORE_IO_WORKERS", "4"))
+
+_io_executor: Optional[ThreadPoolExecutor] = None
+_io_executor_lock = threading.Lock()
+
+
+def _get_io_executor() -> ThreadPoolExecutor:
+    """Returns the shared datastore I/O pool, creating it on first use."""
+    global _io_executor
+    if _io_executor is None:
+        with _io_executor_lock:
+            if _io_executor is None:
+                _io_executor = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="abac-datastore-io")
+    return _io_executor
+
+
+async def run_in_io_pool(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Runs a blocking datastore call on the shared I/O pool and awaits its result."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_io_executor(), functools.partial(fn, *args, **kwargs))
+
+
+def _load_json(file_path: str) -> Any:
+    """Parses a datastore JSON file."""
+    with open(file_path, 'r') as f:
+        return json.load(f)
+
+
+# One lock per datastore file serializes writers; readers never take it.
+_writer_locks: Dict[str, threading.Lock] = {}
+_writer_locks_guard = threading.Lock()
+
+
+def _writer_lock(file_path: str) -> threading.Lock:
+    with _writer_locks_guard:
+        return _writer_locks.setdefault(file_path, threading.Lock())
+
+
+def _write_json_atomically(file_path: str, content: Any) -> None:
+    """Writes `content` to a temporary file in the same directory and renames it over `file_path`.
+
+    The rename is atomic, so concurrent readers see either the old or the new file,
+    never a partially written one.
+    """
+    directory = os.path.dirname(file_path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".json")
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(content, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def update_datastore(
+    datastore_name: str,
+    update: Union[Dict[str, Any], Callable[[Dict[str, Any]], Dict[str, Any]]],
+) -> Dict[str, Any]:
+    """Publishes a new snapshot of a JSON datastore without pausing readers.
+
+    The new content is built off to the side, written to disk with an atomic rename,
+    and swapped into the cache in one step. Calls already reading the datastore
+    finish on the snapshot they started with; later calls see the new one.
+
+    Args:
+        datastore_name (str): The name of the datastore to update (e.g., 'marketing', 'sales').
+        update (Union[dict, Callable]): The complete new content, or a function that
+            receives a private deep copy of the current content and returns the new content.
+
+    Returns:
+        dict: The status of the update or an error message.
+    """
+    file_path = os.path.join(DATA_DIR, f'{datastore_name}_data.json')
+    logger.info(f"Updating datastore: '{datastore_name}'")
+    try:
+        with _writer_lock(file_path):
+            if callable(update):
+                current = datastore_cache.get(file_path, _load_json)
+                content = update(copy.deepcopy(current))
+            else:
+                content = copy.deepcopy(update)
+            if not isinstance(content, dict) or 'full' not in content:
+                return {"status": "error", "message": "Datastore content must be an object with a 'full' section."}
+            _write_json_atomically(file_path, content)
+            datastore_cache.publish(file_path, content)
+        logger.info(f"Published new snapshot of datastore: '{datastore_name}'")
+        return {"status": "success"}
+    except FileNotFoundError:
+        logger.error(f"Datastore file '{file_path}' not found for datastore: '{datastore_name}'")
+        return {"status": "error", "message": f"Datastore '{datastore_name}' not found."}
+    except Exception as e:
+        logger.error(f"An unexpected error occurred while updating datastore '{datastore_name}': {e}")
+        return {"status": "error", "message": str(e)}
+
 
-def get_datastore_content(datastore_name: str, access_level: str, tool_context: ToolContext) -> Dict[str, Any]:
+# (snapshot path, snapshot source signature, JSON signature) combinations already warned about.
+_stale_snapshots_warned: Set[Tuple[str, pagination.Signature, pagination.Signature]] = set()
+
+
+def _fresh_snapshot(snapshot_path: str, json_path: str) -> Optional[snapshot.SnapshotReader]:
+    """Returns the datastore's binary snapshot, or None if it is missing, unreadable or stale.
+
+    A snapshot is stale when the JSON file it was compiled from has since changed. If the
+    JSON file is gone, the snapshot is used as is.
+    """
+    try:
+        reader = datastore_cache.get(snapshot_path, snapshot.open_snapshot)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable snapshot '{snapshot_path}': {e}")
+        return None
+    try:
+        source_signature = pagination.file_signature(json_path)
+    except FileNotFoundError:
+        return reader
+    if source_signature != reader.source_signature:
+        key = (snapshot_path, reader.source_signature, source_signature)
+        if key not in _stale_snapshots_warned:
+            _stale_snapshots_warned.add(key)
+            logger.warning(f"Snapshot '{snapshot_path}' is stale; falling back to '{json_path}'.")
+        return None
+    return reader
+
+
+def _select_view(file_path: str, data: Dict[str, Any], decision: policy.Decision) -> Any:
+    """Returns the field set a decision grants from a parsed datastore file.
+
+    Field sets are either stored as their own copy or projected from 'full' (see
+    `field_set_projection`). A projected view is built once per loaded file and shares
+    its values with the 'full' record.
+
+    Raises:
+        KeyError: If the datastore has neither a stored copy nor a 'full' record to project.
+    """
+    project = field_set_projection(data, decision.field_set, decision.fields)
+    if project is None:
+        return data[decision.field_set]
+    full = data['full']
+    return datastore_cache.derive(file_path, data, ('view', project), lambda _: project(full))
+
+
+def _query_view(
+    file_path: str,
+    data: Dict[str, Any],
+    decision: policy.Decision,
+    view: Any,
+    conditions: List[columnar.Condition],
+    fields: Optional[List[str]],
+) -> List[Dict[str, Any]]:
+    """Runs a filter/projection over the columnar copy of a permitted record view.
+
+    The copy is memoized under the decision's field set and fields, which fully
+    determine `view`, so a table is never served to a caller granted other fields.
+
+    Raises:
+        QueryError: If the view is not a list of records or the query references unknown fields.
+    """
+    def build(_: Any) -> columnar.ColumnarTable:
+        if not isinstance(view, list) or not all(isinstance(record, dict) for record in view):
+            raise columnar.QueryError("Filters and field selection require a record-oriented datastore.")
+        return columnar.ColumnarTable.from_records(view)
+
+    table = datastore_cache.derive(file_path, data, ('columnar', decision.field_set, decision.fields), build)
+    return table.query(conditions, fields)
+
+
+def get_datastore_content(
+    datastore_name: str,
+    access_level: str,
+    tool_context: ToolContext,
+    agent_type: Optional[str] = None,
+    page_size: Optional[int] = None,
+    cursor: Optional[str] = None,
+    filters: Optional[str] = None,
+    fields: Optional[List[str]] = None,
+) -> Dict[str, Any]:
     """Fetches content from the specified datastore based on the user's access level.
 
+    The access decision is looked up in the compiled ABAC policy (`abac_demo.policy.active_policy`).
+    A fresh binary snapshot ('{name}_data.snap', see `abac_demo.tools.snapshot`) is
+    preferred over parsing the JSON file. Record-oriented '{name}_data.jsonl' datastores, used when no '{name}_data.json' exists,
+    are always paginated and read lazily. JSON datastores whose content is a list of
+    records are paginated when `page_size` or `cursor` is given.
+
+    `filters` and `fields` are evaluated over the permitted view only, so a caller
+    can neither read nor filter on fields its access level does not grant. For JSON
+    datastores they run against a columnar copy built once per loaded file (see
+    `abac_demo.tools.columnar`). For '{name}_data.jsonl' datastores they are checked
+    against the policy's fields before streaming; a field set that grants every field
+    cannot be checked up front, so unknown fields there just match nothing.
+
     Args:
         datastore_name (str): The name of the datastore to access (e.g., 'marketing', 'sales').
         access_level (str): The user's access level ('employee' or 'manager').
         tool_context (ToolContext): The tool context.
+        agent_type (Optional[str]): The calling agent's type, if known (e.g., 'marketing', 'sales').
+        page_size (Optional[int]): The maximum number of records to return.
+        cursor (Optional[str]): The 'next_cursor' returned with the previous page.
+        filters (Optional[str]): A filter such as "campaign == 'Q1_Launch' and budget > 50000".
+        fields (Optional[List[str]]): The fields to return for each record.
 
     Returns:
-        dict: The datastore content or an error message.
+        dict: The datastore content or an error message. Paginated responses also
+            carry 'next_cursor', which is None on the last page.
     """
     logger.info(f"Attempting to fetch content from datastore: '{datastore_name}' with access level: '{access_level}'")
     try:
-        file_path = f'abac_demo/data/{datastore_name}_data.json'
-        with open(file_path, 'r') as f:
-            data = json.load(f)
-        
-        if access_level == 'manager':
-            logger.info(f"Access granted for manager level for datastore: '{datastore_name}'")
-            return {"status": "success", "data": data['full']}
-        elif access_level == 'employee':
-            logger.info(f"Access granted for employee level for datastore: '{datastore_name}'")
-            return {"status": "success", "data": data['limited']}
+        file_path = os.path.join(DATA_DIR, f'{datastore_name}_data.json')
+        records_path = os.path.join(DATA_DIR, f'{datastore_name}_data.jsonl')
+        snapshot_path = os.path.join(DATA_DIR, f'{datastore_name}_data.snap')
+        streamed = not os.path.exists(file_path) and os.path.exists(records_path)
+        reader: Optional[snapshot.SnapshotReader] = None
+        if streamed:
+            file_path = records_path
         else:
+            reader = _fresh_snapshot(snapshot_path, file_path)
+            if reader is None:
+                data = datastore_cache.get(file_path, _load_json)
+
+        active_policy = policy.active_policy
+        if not active_policy.knows_value("access_level", access_level):
             logger.warning(f"Invalid access level '{access_level}' provided for datastore: '{datastore_name}'")
             return {"status": "error", "message": "Invalid access level."}
 
+        decision = active_policy.evaluate(
+            {"access_level": access_level, "agent_type": agent_type}, datastore_name, "read"
+        )
+        if not decision.allowed:
+            logger.warning(f"Access denied for {access_level} level to datastore: '{datastore_name}' ({decision.reason})")
+            return {"status": "error", "message": f"Access denied to datastore '{datastore_name}'."}
+
+        logger.info(f"Access granted for {access_level} level for datastore: '{datastore_name}' ({decision.reason})")
+        conditions = columnar.parse_filters(filters)
+        if streamed:
+            # Records are read lazily, so queries are checked against the policy's fields up
+            # front, as the columnar copy checks them for JSON datastores.
+            if decision.fields is not None:
+                columnar.check_fields(conditions, fields, decision.fields)
+            predicate = (lambda record: columnar.matches_all(conditions, record)) if conditions else None
+            page = pagination.read_jsonl_page(
+                file_path, page_size, cursor, compile_projection(decision.fields), predicate
+            )
+            records = page.records if fields is None else compile_projection(fields)(page.records)
+            return {"status": "success", "data": records, "next_cursor": page.next_cursor}
+
+        if reader is not None and reader.has_section(decision.field_set, decision.fields):
+            file_path, data = snapshot_path, reader
+            view = reader.section(decision.field_set)
+        else:
+            if reader is not None:
+                logger.info(f"Snapshot of datastore '{datastore_name}' predates the current policy; reading JSON.")
+                data = datastore_cache.get(file_path, _load_json)
+            view = _select_view(file_path, data, decision)
+        if conditions or fields is not None:
+            view = _query_view(file_path, data, decision, view, conditions, fields)
+        if (page_size is None and cursor is None) or not isinstance(view, list):
+            return {"status": "success", "data": view}
+        page = pagination.page_sequence(view, page_size, cursor, pagination.file_signature(file_path))
+        return {"status": "success", "data": page.records, "next_cursor": page.next_cursor}
+
+    except columnar.QueryError as e:
+        logger.warning(f"Rejected query for datastore '{datastore_name}': {e}")
+        return {"status": "error", "message": str(e)}
+    except pagination.CursorError as e:
+        logger.warning(f"Rejected cursor for datastore '{datastore_name}': {e}")
+        return {"status": "error", "message": str(e)}
     except FileNotFoundError:
         logger.error(f"Datastore file '{file_path}' not found for datastore: '{datastore_name}'")
         return {"status": "error", "message": f"Datastore '{datastore_name}' not found."}
@@ -47,3 +310,32 @@ def get_datastore_content(datastore_name: str, access_level: str, tool_context:
     except Exception as e:
         logger.error(f"An unexpected error occurred while accessing datastore '{datastore_name}': {e}")
         return {"status": "error", "message": str(e)}
+
+
+async def get_datastore_content_async(
+    datastore_name: str,
+    access_level: str,
+    tool_context: ToolContext,
+    agent_type: Optional[str] = None,
+    page_size: Optional[int] = None,
+    cursor: Optional[str] = None,
+    filters: Optional[str] = None,
+    fields: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """Async variant of `get_datastore_content` that keeps file I/O off the event loop.
+
+    The read, parse and projection run on a bounded thread pool (`ABAC_DATASTORE_IO_WORKERS`
+    threads), so a slow disk stalls only the calling session. Arguments and result are the
+    same as `get_datastore_content`.
+    """
+    return await run_in_io_pool(
+        get_datastore_content,
+        datastore_name,
+        access_level,
+        tool_context,
+        agent_type=agent_type,
+        page_size=page_size,
+        cursor=cursor,
+        filters=filters,
+        fields=fields,
+    )
@@ -0,0 +1,252 @@
+"""A process-wide, mtime-aware cache for parsed datastore files."""
+import itertools
+import logging
+import os
+import sys
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Upper bound on the combined on-disk size of all cached datastores plus the
+# estimated memory of the values derived from them (see `estimate_size`). The
+# file size is used as a cheap proxy for the memory held by the parsed content.
+DEFAULT_MAX_BYTES: int = int(os.getenv("ABAC_DATASTORE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+DEFAULT_MAX_ENTRIES: int = int(os.getenv("ABAC_DATASTORE_CACHE_MAX_ENTRIES", "128"))
+
+# (st_mtime_ns, st_size) of the file the cached content was parsed from.
+Signature = Tuple[int, int]
+
+_MISSING = object()
+
+
+def estimate_size(value: Any) -> int:
+    """Estimates the memory a value derived from cached content adds on top of it.
+
+    Derived values share their leaf values with the content, so only new containers
+    are counted: a list of records is charged for the list and each record dict.
+    Objects that report `nbytes` (e.g. columnar tables) are charged that.
+    """
+    nbytes = getattr(value, "nbytes", None)
+    if isinstance(nbytes, int):
+        return nbytes
+    items = value.values() if isinstance(value, dict) else value if isinstance(value, (list, tuple)) else ()
+    return sys.getsizeof(value) + sum(sys.getsizeof(item) for item in items if isinstance(item, (dict, list, tuple)))
+
+
+@dataclass
+class CachedDatastore:
+    """A parsed datastore file together with the file signature it was read from."""
+    path: str
+    signature: Signature
+    data: Any
+    size: int
+    # Values computed from `data` (e.g. projected views), dropped together with the entry.
+    derived: Dict[Hashable, Any] = field(default_factory=dict)
+    # Estimated memory of `derived`, charged to the cache's byte bound with `size`.
+    derived_bytes: int = 0
+    # Tick of the last lookup that returned this entry; the smallest is evicted first.
+    last_used: int = 0
+
+    @property
+    def charge(self) -> int:
+        return self.size + self.derived_bytes
+
+
+class DatastoreCache:
+    """An LRU cache of parsed datastore files, revalidated against the file's mtime and size.
+
+    Each lookup costs a single `os.stat`. The file is parsed again only when its
+    signature changes, and least recently used entries are evicted once either the
+    byte or the entry bound is exceeded. Cached content is shared between callers
+    and must be treated as read-only.
+
+    Hits take no lock: they read the entry table, which is only ever changed by
+    swapping whole entries under the lock, and stamp the entry with a tick from an
+    atomic counter. Eviction picks the entry with the oldest stamp, so the LRU order
+    is approximate between concurrent hits.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._entries: Dict[str, CachedDatastore] = {}
+        # Signature of the last version of each file that failed to load, so it is not retried.
+        self._failed: Dict[str, Signature] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        # next() on an itertools.count is atomic, so lock-free hits can take ticks. Every hit
+        # takes one tick and every other tick is taken under the lock, so hits can be counted
+        # exactly as all ticks minus the others.
+        self._ticks = itertools.count(1)
+        self._locked_ticks = 0
+        self._misses = 0
+        self._reloads = 0
+        self._evictions = 0
+
+    def get(self, path: str, loader: Callable[[str], Any]) -> Any:
+        """Returns the parsed content of `path`, calling `loader(path)` only when the file changed.
+
+        Hits take no lock. Each entry is an immutable snapshot that is swapped in as a whole, so a reader keeps whichever snapshot it
+        fetched even if a newer one is published meanwhile. If reloading a changed file
+        fails (e.g. it is being rewritten in place), the last good snapshot keeps being
+        served, and that version of the file is not parsed again until it changes.
+
+        Args:
+            path (str): The datastore file to read.
+            loader (Callable[[str], Any]): Parses the file at the given path.
+
+        Returns:
+            Any: The parsed content.
+
+        Raises:
+            FileNotFoundError: If the file does not exist. Errors raised by `loader`
+                are propagated when there is no earlier snapshot, and nothing is cached.
+        """
+        stat = os.stat(path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        entry = self._entries.get(path)
+        if entry is not None and (entry.signature == signature or self._failed.get(path) == signature):
+            entry.last_used = next(self._ticks)
+            return entry.data
+
+        # Parse outside the lock so a slow file does not block lookups of other datastores.
+        try:
+            data = loader(path)
+        except Exception as e:
+            if entry is None:
+                raise
+            with self._lock:
+                self._failed[path] = signature
+            logger.error(f"Reloading datastore '{path}' failed ({e}); serving the previous snapshot until it changes.")
+            return entry.data
+
+        with self._lock:
+            if entry is None:
+                self._misses += 1
+            else:
+                self._reloads += 1
+                logger.info(f"Datastore '{path}' changed on disk; reloaded.")
+            self._store(CachedDatastore(path=path, signature=signature, data=data, size=stat.st_size))
+        return data
+
+    def publish(self, path: str, data: Any) -> None:
+        """Installs `data` as the current snapshot of `path`, which must already be written to disk.
+
+        Used after an atomic file replace so readers switch to the new content without
+        parsing the file again.
+        """
+        stat = os.stat(path)
+        with self._lock:
+            self._store(CachedDatastore(path=path, signature=(stat.st_mtime_ns, stat.st_size), data=data, size=stat.st_size))
+
+    def derive(self, path: str, data: Any, key: Hashable, build: Callable[[Any], Any]) -> Any:
+        """Returns `build(data)`, memoized on the cache entry `data` was loaded into.
+
+        The memoized value lives exactly as long as the cached content it was built
+        from, so a reload or eviction discards it, and its estimated size counts
+        towards `max_bytes`. If `data` is no longer the cached content for `path`, or
+        memoizing the value would push the entry past `max_bytes`, the value is built
+        without being memoized.
+
+        Args:
+            path (str): The datastore file `data` was read from.
+            data (Any): Content previously returned by `get`.
+            key (Hashable): Identifies the derived value among others for the same entry.
+            build (Callable[[Any], Any]): Computes the derived value from `data`.
+
+        Returns:
+            Any: The derived value.
+        """
+        entry = self._entries.get(path)
+        if entry is not None and entry.data is data:
+            value = entry.derived.get(key, _MISSING)
+            if value is not _MISSING:
+                return value
+        # Build outside the lock; if two callers race, the first value stored wins.
+        value = build(data)
+        if entry is None or entry.data is not data:
+            return value
+        # A section of the content itself (e.g. an identity projection) costs nothing extra.
+        sections = data.values() if isinstance(data, dict) else ()
+        size = 0 if value is data or any(value is section for section in sections) else estimate_size(value)
+        with self._lock:
+            if key in entry.derived:
+                return entry.derived[key]
+            if self._entries.get(path) is not entry or entry.charge + size > self.max_bytes:
+                return value
+            entry.derived[key] = value
+            entry.derived_bytes += size
+            self._bytes += size
+            entry.last_used = self._tick()
+            self._evict()
+        return value
+
+    def _tick(self) -> int:
+        """Takes a tick that is not a hit. Caller holds the lock."""
+        self._locked_ticks += 1
+        return next(self._ticks)
+
+    def _store(self, entry: CachedDatastore) -> None:
+        """Inserts an entry and evicts least recently used entries past the bounds. Caller holds the lock."""
+        if entry.size > self.max_bytes:
+            self._discard(entry.path)
+            logger.warning(f"Datastore '{entry.path}' ({entry.size} bytes) exceeds the cache bound; not cached.")
+            return
+        self._failed.pop(entry.path, None)
+        previous = self._entries.get(entry.path)
+        entry.last_used = self._tick()
+        self._entries[entry.path] = entry
+        self._bytes += entry.charge - (previous.charge if previous is not None else 0)
+        self._evict()
+
+    def _evict(self) -> None:
+        """Evicts least recently used entries until both bounds hold. Caller holds the lock."""
+        while self._bytes > self.max_bytes or len(self._entries) > self.max_entries:
+            path = min(self._entries, key=lambda candidate: self._entries[candidate].last_used)
+            evicted = self._entries.pop(path)
+            self._bytes -= evicted.charge
+            self._evictions += 1
+            logger.info(f"Evicted datastore '{path}' from cache.")
+
+    def _discard(self, path: str) -> Optional[CachedDatastore]:
+        """Removes an entry if present. Caller holds the lock."""
+        self._failed.pop(path, None)
+        entry = self._entries.pop(path, None)
+        if entry is not None:
+            self._bytes -= entry.charge
+        return entry
+
+    def invalidate(self, path: str) -> None:
+        """Drops the cached content for `path`, if any."""
+        with self._lock:
+            self._discard(path)
+
+    def clear(self) -> None:
+        """Drops all cached content and resets the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._failed.clear()
+            self._bytes = 0
+            self._ticks = itertools.count(1)
+            self._locked_ticks = 0
+            self._misses = self._reloads = self._evictions = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Returns the cache counters.
+
+        Returns:
+            dict: Hits, misses, reloads, evictions, and the current entry and byte counts
+                (file sizes plus the estimated size of derived values).
+        """
+        with self._lock:
+            return {
+                "hits": self._tick() - self._locked_ticks,
+                "misses": self._misses,
+                "reloads": self._reloads,
+                "evictions": self._evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
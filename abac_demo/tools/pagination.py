@@ -0,0 +1,141 @@
+"""Cursor-based pagination over datastore records, including lazily read JSON Lines datastores."""
+import base64
+import json
+import os
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+DEFAULT_PAGE_SIZE: int = int(os.getenv("ABAC_DEFAULT_PAGE_SIZE", "100"))
+MAX_PAGE_SIZE: int = int(os.getenv("ABAC_MAX_PAGE_SIZE", "1000"))
+
+# (st_mtime_ns, st_size) of the datastore file a cursor was issued for.
+Signature = Tuple[int, int]
+
+
+class CursorError(ValueError):
+    """Raised when a cursor is malformed or was issued for a different version of the datastore."""
+
+
+@dataclass
+class Page:
+    """One page of records and the cursor for the next page (None on the last page)."""
+    records: List[Any]
+    next_cursor: Optional[str]
+
+
+def file_signature(path: str) -> Signature:
+    """Returns the (mtime_ns, size) signature of a file."""
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def encode_cursor(position: int, signature: Signature) -> str:
+    """Encodes a position (record index or byte offset) into an opaque cursor."""
+    payload = json.dumps({"p": position, "s": list(signature)}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode()
+
+
+def decode_cursor(cursor: Optional[str], signature: Signature) -> int:
+    """Decodes a cursor into a position, checking it belongs to the current file version.
+
+    Args:
+        cursor (Optional[str]): The cursor, or None for the first page.
+        signature (Signature): The current signature of the datastore file.
+
+    Returns:
+        int: The position to resume from.
+
+    Raises:
+        CursorError: If the cursor is malformed or the datastore changed since it was issued.
+    """
+    if not cursor:
+        return 0
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        position, issued_for = int(payload["p"]), tuple(payload["s"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise CursorError("Invalid cursor.") from e
+    if issued_for != tuple(signature) or position < 0:
+        raise CursorError("Cursor is stale; the datastore changed. Restart from the first page.")
+    return position
+
+
+def clamp_page_size(page_size: Optional[int]) -> int:
+    """Returns the effective page size, defaulting and capping it.
+
+    Raises:
+        ValueError: If `page_size` is smaller than 1.
+    """
+    if page_size is None:
+        return DEFAULT_PAGE_SIZE
+    if page_size < 1:
+        raise ValueError("page_size must be at least 1.")
+    return min(page_size, MAX_PAGE_SIZE)
+
+
+def page_sequence(
+    records: Sequence[Any], page_size: Optional[int], cursor: Optional[str], signature: Signature
+) -> Page:
+    """Returns one page of an in-memory sequence of records.
+
+    Args:
+        records (Sequence[Any]): The records to page through.
+        page_size (Optional[int]): The number of records per page.
+        cursor (Optional[str]): The cursor returned with the previous page, or None.
+        signature (Signature): The signature of the file the records were read from.
+
+    Returns:
+        Page: The requested page.
+    """
+    size = clamp_page_size(page_size)
+    start = decode_cursor(cursor, signature)
+    end = start + size
+    next_cursor = encode_cursor(end, signature) if end < len(records) else None
+    return Page(records=list(records[start:end]), next_cursor=next_cursor)
+
+
+def read_jsonl_page(
+    path: str,
+    page_size: Optional[int],
+    cursor: Optional[str],
+    project: Callable[[Any], Any],
+    predicate: Optional[Callable[[Any], bool]] = None,
+) -> Page:
+    """Reads one page of records from a JSON Lines file without loading the rest of it.
+
+    The cursor is the byte offset of the next unread line, so each call seeks straight
+    to it and memory use is bounded by the page size rather than the file size.
+
+    Args:
+        path (str): The JSON Lines file, one record per line.
+        page_size (Optional[int]): The number of records per page.
+        cursor (Optional[str]): The cursor returned with the previous page, or None.
+        project (Callable[[Any], Any]): Applied to each record before it is returned.
+        predicate (Optional[Callable[[Any], bool]]): If given, only projected records
+            for which it returns True are returned.
+
+    Returns:
+        Page: The requested page.
+
+    Raises:
+        FileNotFoundError: If the file does not exist.
+        CursorError: If the cursor is malformed or stale.
+        json.JSONDecodeError: If a line is not valid JSON.
+    """
+    size = clamp_page_size(page_size)
+    signature = file_signature(path)
+    offset = decode_cursor(cursor, signature)
+    records: List[Any] = []
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        while len(records) < size:
+            line = f.readline()
+            if not line:
+                return Page(records=records, next_cursor=None)
+            if line.strip():
+                record = project(json.loads(line))
+                if predicate is None or predicate(record):
+                    records.append(record)
+        offset = f.tell()
+        at_end = not f.read(1)
+    return Page(records=records, next_cursor=None if at_end else encode_cursor(offset, signature))
@@ -0,0 +1,74 @@
+"""Field projections used to serve restricted views of a single stored copy of a datastore."""
+import functools
+from typing import AbstractSet, Any, Callable, Iterable, Mapping, Optional, Tuple
+
+Projection = Callable[[Any], Any]
+
+
+def _identity(value: Any) -> Any:
+    return value
+
+
+@functools.lru_cache(maxsize=256)
+def _compile(fields: Optional[Tuple[str, ...]]) -> Projection:
+    if fields is None:
+        return _identity
+
+    def project_record(record: Any) -> Any:
+        # Values are shared with the source record; only the containing dict is new.
+        return {key: record[key] for key in fields if key in record}
+
+    def project(value: Any) -> Any:
+        if isinstance(value, dict):
+            return project_record(value)
+        if isinstance(value, list):
+            return [project_record(record) if isinstance(record, dict) else record for record in value]
+        return value
+
+    return project
+
+
+def compile_projection(fields: Optional[Iterable[str]]) -> Projection:
+    """Returns a function that keeps only `fields` of a record or a list of records.
+
+    Projections are compiled once per distinct field set and reused. The projected
+    records share their values with the source, so no deep copy is made.
+
+    Args:
+        fields (Optional[Iterable[str]]): The fields to keep, or None to keep every field.
+
+    Returns:
+        Projection: The projection function. With `fields=None` it returns its input unchanged.
+    """
+    if fields is None:
+        return _compile(None)
+    if isinstance(fields, str):
+        fields = (fields,)
+    return _compile(tuple(sorted(set(fields))))
+
+
+def field_set_projection(
+    content: Mapping[str, Any], field_set: str, fields: Optional[AbstractSet[str]]
+) -> Optional[Projection]:
+    """Returns the projection that derives `field_set` from a datastore's 'full' record.
+
+    Datastores may store each field set as its own copy (legacy layout, e.g. 'full' and
+    'limited'), or store only 'full' and derive the other field sets by projection. In
+    the single-copy layout an optional 'field_masks' section can narrow, but never widen,
+    the policy's field list for a field set.
+
+    Args:
+        content (Mapping[str, Any]): The parsed datastore file.
+        field_set (str): The field set to serve.
+        fields (Optional[AbstractSet[str]]): The policy's fields for it, or None for every field.
+
+    Returns:
+        Optional[Projection]: The projection to apply to content['full'], or None if the
+            datastore stores `field_set` as its own copy.
+    """
+    if field_set in content:
+        return None
+    mask = content.get('field_masks', {}).get(field_set)
+    if mask is not None:
+        fields = set(mask) if fields is None else fields.intersection(mask)
+    return compile_projection(fields)
@@ -0,0 +1,188 @@
+"""Compact binary snapshots of ABAC datastores for fast cold starts.
+
+`compile_snapshot` turns a `{name}_data.json` datastore into `{name}_data.snap`,
+which holds each of the datastore's field sets already split out (stored copies
+as-is, other field sets projected from 'full' with the policy's field lists) and
+serialized with `marshal`, plus an index of where each section lives. Readers
+`mmap` the file so that only the pages of the section they serve are read;
+`marshal.loads` still builds a full in-memory copy of that section. This is
+much faster than parsing the whole JSON document, but it is not zero-copy.
+
+A snapshot records the mtime and size of the JSON file it was compiled from and
+the policy fields used for every projected section. `get_datastore_content`
+ignores it, and parses the JSON instead, when either no longer matches. Because
+`marshal` data is specific to the Python version, snapshots also record the
+interpreter version and are ignored under a different one.
+
+Usage:
+    python -m abac_demo.tools.snapshot [--data-dir abac_demo/data] [datastore ...]
+"""
+import argparse
+import glob
+import json
+import logging
+import marshal
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from typing import Any, Dict, FrozenSet, List, Mapping, Optional, Tuple
+
+from abac_demo.tools.projection import field_set_projection
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+MAGIC = b"ABACSNP1"
+_HEADER_LENGTH = struct.Struct("<I")
+_PYTHON_TAG = f"{sys.implementation.name}-{sys.version_info[0]}.{sys.version_info[1]}-marshal{marshal.version}"
+
+# (st_mtime_ns, st_size) of the JSON file a snapshot was compiled from.
+Signature = Tuple[int, int]
+
+
+class SnapshotError(ValueError):
+    """Raised when a snapshot file is corrupt or was written by an incompatible interpreter."""
+
+
+def _sorted_fields(fields: Optional[FrozenSet[str]]) -> Optional[List[str]]:
+    return None if fields is None else sorted(fields)
+
+
+def compile_snapshot(
+    json_path: str, snapshot_path: str, field_sets: Mapping[str, Optional[FrozenSet[str]]]
+) -> Dict[str, Any]:
+    """Compiles a JSON datastore into a binary snapshot.
+
+    Args:
+        json_path (str): The source `{name}_data.json` file.
+        snapshot_path (str): Where to write the snapshot. It is replaced atomically.
+        field_sets (Mapping[str, Optional[FrozenSet[str]]]): The policy's field sets for
+            this datastore, mapping each name to its fields (None for every field).
+
+    Returns:
+        dict: The snapshot header that was written.
+    """
+    stat = os.stat(json_path)
+    with open(json_path, 'r') as f:
+        content = json.load(f)
+
+    sections: Dict[str, Dict[str, Any]] = {}
+    blobs: List[bytes] = []
+    offset = 0
+    for field_set, fields in field_sets.items():
+        project = field_set_projection(content, field_set, fields)
+        value = content[field_set] if project is None else project(content['full'])
+        blob = marshal.dumps(value)
+        sections[field_set] = {
+            "offset": offset,
+            "length": len(blob),
+            "stored": project is None,
+            "policy_fields": _sorted_fields(fields),
+        }
+        blobs.append(blob)
+        offset += len(blob)
+
+    header = {
+        "python": _PYTHON_TAG,
+        "source": [stat.st_mtime_ns, stat.st_size],
+        "sections": sections,
+    }
+    header_bytes = json.dumps(header).encode()
+
+    directory = os.path.dirname(snapshot_path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".snap")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(MAGIC)
+            f.write(_HEADER_LENGTH.pack(len(header_bytes)))
+            f.write(header_bytes)
+            for blob in blobs:
+                f.write(blob)
+        os.replace(tmp_path, snapshot_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    logger.info(f"Compiled snapshot '{snapshot_path}' with sections {sorted(sections)}.")
+    return header
+
+
+class SnapshotReader:
+    """A memory-mapped snapshot whose sections are deserialized (copied) on first use."""
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            raise SnapshotError(f"'{path}' is not an ABAC snapshot.")
+        start = len(MAGIC) + _HEADER_LENGTH.size
+        (header_length,) = _HEADER_LENGTH.unpack_from(self._mmap, len(MAGIC))
+        try:
+            header = json.loads(self._mmap[start:start + header_length])
+        except ValueError as e:
+            raise SnapshotError(f"Corrupt snapshot header in '{path}'.") from e
+        if header.get("python") != _PYTHON_TAG:
+            raise SnapshotError(f"Snapshot '{path}' was written by {header.get('python')}, not {_PYTHON_TAG}.")
+        self.path = path
+        self.source_signature: Signature = tuple(header["source"])
+        self._sections: Dict[str, Dict[str, Any]] = header["sections"]
+        self._data_start = start + header_length
+        self._loaded: Dict[str, Any] = {}
+
+    def has_section(self, field_set: str, fields: Optional[FrozenSet[str]]) -> bool:
+        """Returns True if the snapshot holds `field_set` compiled for the given policy fields."""
+        section = self._sections.get(field_set)
+        if section is None:
+            return False
+        return section["stored"] or section["policy_fields"] == _sorted_fields(fields)
+
+    def section(self, field_set: str) -> Any:
+        """Returns the deserialized content of a field set section (memoized).
+
+        Only the section's pages of the mapping are touched, but the returned value is a
+        regular Python object built from them, not a view into the file.
+        """
+        try:
+            return self._loaded[field_set]
+        except KeyError:
+            pass
+        section = self._sections[field_set]
+        start = self._data_start + section["offset"]
+        with memoryview(self._mmap) as view, view[start:start + section["length"]] as blob:
+            value = marshal.loads(blob)
+        self._loaded[field_set] = value
+        return value
+
+
+def open_snapshot(path: str) -> SnapshotReader:
+    """Opens a snapshot file. Used as the loader for `DatastoreCache`."""
+    return SnapshotReader(path)
+
+
+def main() -> None:
+    from abac_demo import policy
+
+    parser = argparse.ArgumentParser(description="Compile ABAC datastores into binary snapshots.")
+    parser.add_argument("--data-dir", default=os.getenv("ABAC_DATA_DIR", "abac_demo/data"))
+    parser.add_argument("datastores", nargs="*", help="Datastore names (default: every *_data.json).")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    names = args.datastores or sorted(
+        os.path.basename(path)[:-len("_data.json")] for path in glob.glob(os.path.join(args.data_dir, "*_data.json"))
+    )
+    for name in names:
+        field_sets = policy.active_policy.field_sets.get(name)
+        if field_sets is None:
+            logger.warning(f"Skipping datastore '{name}': it is not declared in the ABAC policy.")
+            continue
+        compile_snapshot(
+            os.path.join(args.data_dir, f"{name}_data.json"),
+            os.path.join(args.data_dir, f"{name}_data.snap"),
+            field_sets,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Measures event-loop latency while many sessions read ABAC datastores concurrently.
+
+A heartbeat coroutine sleeps for 1 ms in a loop and records how late it wakes up,
+which is the delay every other session on the loop would see. Sessions read a
+datastore either through the blocking `get_datastore_content` (called directly from
+a coroutine, as a sync tool would be) or through `get_datastore_content_async`.
+The cache is cleared before each read so every call pays the file read and parse.
+
+Usage:
+    python -m benchmarks.abac_async --records 100000 --sessions 32
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import tempfile
+import time
+from typing import Any, Dict, List
+from unittest.mock import MagicMock, patch
+
+from abac_demo.tools import datastore
+
+HEARTBEAT_SECONDS = 0.001
+
+
+async def heartbeat(lags: List[float], stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(HEARTBEAT_SECONDS)
+        lags.append((time.perf_counter() - start - HEARTBEAT_SECONDS) * 1000)
+
+
+async def session(use_async: bool, reads: int) -> None:
+    context = MagicMock()
+    for _ in range(reads):
+        datastore.datastore_cache.clear()
+        if use_async:
+            await datastore.get_datastore_content_async("marketing", "employee", context)
+        else:
+            datastore.get_datastore_content("marketing", "employee", context)
+        await asyncio.sleep(0)
+
+
+async def run(use_async: bool, sessions: int, reads: int) -> Dict[str, float]:
+    lags: List[float] = []
+    stop = asyncio.Event()
+    beat = asyncio.create_task(heartbeat(lags, stop))
+    start = time.perf_counter()
+    await asyncio.gather(*[session(use_async, reads) for _ in range(sessions)])
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await beat
+    lags.sort()
+    return {
+        "wall_s": elapsed,
+        "lag_p50_ms": statistics.median(lags) if lags else 0.0,
+        "lag_p99_ms": lags[int(len(lags) * 0.99)] if lags else 0.0,
+        "lag_max_ms": lags[-1] if lags else 0.0,
+        "heartbeats": float(len(lags)),
+    }
+
+
+def write_datastore(directory: str, records: int) -> None:
+    content: Dict[str, Any] = {
+        "full": [{"id": i, "campaigns": [f"c{i % 97}"], "budget": i} for i in range(records)],
+    }
+    with open(os.path.join(directory, "marketing_data.json"), "w") as f:
+        json.dump(content, f)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--records", type=int, default=100_000)
+    parser.add_argument("--sessions", type=int, default=32)
+    parser.add_argument("--reads", type=int, default=2, help="Reads per session.")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    datastore.datastore_cache.max_bytes = 1 << 40
+    columns = ["wall_s", "lag_p50_ms", "lag_p99_ms", "lag_max_ms", "heartbeats"]
+    print(f"{'path':<6} " + " ".join(f"{c:>12}" for c in columns))
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        write_datastore(tmp_dir, args.records)
+        with patch.object(datastore, "DATA_DIR", tmp_dir):
+            for name, use_async in (("sync", False), ("async", True)):
+                row = asyncio.run(run(use_async, args.sessions, args.reads))
+                print(f"{name:<6} " + " ".join(f"{row[c]:>12.2f}" for c in columns))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""Compares the duplicated 'full'/'limited' datastore layout with the single-copy projected layout.
+
+For each size, both layouts are written to a temporary directory and served through
+`get_datastore_content`. The report covers file size, cold latency (parse and serve),
+warm latency (served from the cache, where projected views are memoized per loaded
+file) and the memory the cache holds afterwards: `{level}_mb` after serving one access
+level from an empty cache, and `held_mb` after serving both. These figures include the
+parsed file and the memoized projected views, measured with tracemalloc.
+
+Usage:
+    python -m benchmarks.abac_projection --sizes 10000 100000 1000000
+"""
+import argparse
+import gc
+import json
+import logging
+import os
+import statistics
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List
+from unittest.mock import MagicMock, patch
+
+from abac_demo.tools import datastore
+
+LIMITED_FIELDS = ["campaigns"]
+
+
+def make_records(count: int) -> List[Dict[str, Any]]:
+    return [
+        {"id": i, "campaigns": [f"campaign_{i % 97}"], "budget": 1000 + i, "owner": f"owner_{i % 13}"}
+        for i in range(count)
+    ]
+
+
+def write_layouts(directory: str, records: List[Dict[str, Any]]) -> Dict[str, str]:
+    limited = [{key: record[key] for key in LIMITED_FIELDS} for record in records]
+    layouts = {
+        "duplicated": {"full": records, "limited": limited},
+        "single_copy": {"full": records},
+    }
+    paths = {}
+    for name, content in layouts.items():
+        layout_dir = os.path.join(directory, name)
+        os.makedirs(layout_dir, exist_ok=True)
+        path = os.path.join(layout_dir, "marketing_data.json")
+        with open(path, "w") as f:
+            json.dump(content, f)
+        paths[name] = path
+    return paths
+
+
+def held_memory(levels: List[str], context: Any) -> int:
+    """Returns the memory still allocated after serving `levels` from an empty cache."""
+    datastore.datastore_cache.clear()
+    gc.collect()
+    tracemalloc.start()
+    for level in levels:
+        response = datastore.get_datastore_content("marketing", level, context)
+        assert response["status"] == "success", response
+        del response
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    datastore.datastore_cache.clear()
+    return current
+
+
+def time_call(fn: Callable[[], Any], repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def bench_layout(path: str, repeat: int) -> Dict[str, float]:
+    context = MagicMock()
+    row: Dict[str, float] = {"file_mb": os.path.getsize(path) / 1e6}
+    with patch.object(datastore, "DATA_DIR", os.path.dirname(path)):
+        for level in ("manager", "employee"):
+            row[f"{level}_mb"] = held_memory([level], context) / 1e6
+        row["held_mb"] = held_memory(["manager", "employee"], context) / 1e6
+        for level in ("manager", "employee"):
+            def cold():
+                datastore.datastore_cache.clear()
+                datastore.get_datastore_content("marketing", level, context)
+
+            def warm():
+                datastore.get_datastore_content("marketing", level, context)
+
+            row[f"{level}_cold_ms"] = time_call(cold, repeat)
+            warm()
+            row[f"{level}_warm_ms"] = time_call(warm, repeat)
+    datastore.datastore_cache.clear()
+    return row
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+
+    datastore.datastore_cache.max_bytes = 1 << 40
+    columns = [
+        "file_mb", "manager_mb", "employee_mb", "held_mb",
+        "manager_cold_ms", "manager_warm_ms", "employee_cold_ms", "employee_warm_ms",
+    ]
+    print(f"{'records':>9} {'layout':<12} " + " ".join(f"{c:>17}" for c in columns))
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            paths = write_layouts(tmp_dir, make_records(size))
+            for layout, path in paths.items():
+                row = bench_layout(path, args.repeat)
+                print(f"{size:>9} {layout:<12} " + " ".join(f"{row[c]:>17.2f}" for c in columns))
+
+
+if __name__ == "__main__":
+    main()
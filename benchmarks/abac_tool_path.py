@@ -0,0 +1,196 @@
+"""Benchmarks the ABAC tool path and checks the results against a saved baseline.
+
+Each scenario drives either `get_datastore_content` ("tool") or
+`abac_demo.agent.tool_wrapper` ("wrapper", which also resolves the caller's
+attributes) over a synthetic single-copy datastore, for both access levels and
+at several levels of thread concurrency. The datastore cache stays enabled, so
+the numbers describe the warm, steady-state path; pass --cold to clear the cache
+before every call and measure file reads and parsing instead.
+
+Every datastore size runs in a fresh worker process, so the reported peak RSS
+(`ru_maxrss`) covers that size alone. Within a size the figure is the peak so far.
+
+Usage:
+    python -m benchmarks.abac_tool_path --sizes 1000 10000 100000 --save-baseline
+    python -m benchmarks.abac_tool_path --sizes 1000 10000 100000 --compare
+"""
+import argparse
+import concurrent.futures
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+from unittest.mock import MagicMock, patch
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baselines", "abac_tool_path.json")
+LEVELS = ("employee", "manager")
+PATHS = ("tool", "wrapper")
+COLUMNS = ("p50_ms", "p99_ms", "throughput_rps", "peak_rss_mb")
+# Metrics where a larger value is a regression; throughput regresses when it drops.
+HIGHER_IS_WORSE = {"p50_ms": True, "p99_ms": True, "throughput_rps": False, "peak_rss_mb": True}
+# Latency changes smaller than this are timer noise on the warm path, whatever their ratio.
+LATENCY_NOISE_FLOOR_MS = 0.1
+
+
+def write_datastore(directory: str, records: int) -> None:
+    content: Dict[str, Any] = {
+        "full": [
+            {"id": i, "campaigns": [f"c{i % 97}"], "budget": i * 10, "owner": f"user{i % 1000}"}
+            for i in range(records)
+        ],
+    }
+    with open(os.path.join(directory, "marketing_data.json"), "w") as f:
+        json.dump(content, f)
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def drive(call: Callable[[], Dict[str, Any]], requests: int, concurrency: int, before: Optional[Callable[[], None]]) -> Dict[str, float]:
+    """Issues `requests` calls from `concurrency` threads and summarizes their latency."""
+    latencies: List[float] = []
+    lock = threading.Lock()
+    per_thread = [requests // concurrency + (1 if i < requests % concurrency else 0) for i in range(concurrency)]
+    start_barrier = threading.Barrier(concurrency + 1)
+
+    def worker(count: int) -> None:
+        own: List[float] = []
+        start_barrier.wait()
+        for _ in range(count):
+            if before is not None:
+                before()
+            start = time.perf_counter()
+            result = call()
+            own.append((time.perf_counter() - start) * 1000)
+            if result.get("status") != "success":
+                raise RuntimeError(f"Tool call failed: {result}")
+        with lock:
+            latencies.extend(own)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [pool.submit(worker, count) for count in per_thread]
+        start_barrier.wait()
+        start = time.perf_counter()
+        for future in futures:
+            future.result()
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "p50_ms": percentile(latencies, 0.50),
+        "p99_ms": percentile(latencies, 0.99),
+        "throughput_rps": len(latencies) / elapsed if elapsed else 0.0,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def run_size(size: int, requests: int, concurrencies: List[int], cold: bool) -> Dict[str, Dict[str, float]]:
+    """Runs every scenario for one datastore size. Executed in a fresh worker process."""
+    logging.disable(logging.INFO)
+    from abac_demo import agent
+    from abac_demo.tools import datastore
+
+    datastore.datastore_cache.max_bytes = 1 << 40
+    before = datastore.datastore_cache.clear if cold else None
+    results: Dict[str, Dict[str, float]] = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        write_datastore(tmp_dir, size)
+        with patch.object(datastore, "DATA_DIR", tmp_dir):
+            for path in PATHS:
+                for level in LEVELS:
+                    context = MagicMock()
+                    context.state = {"user:agent_type": "marketing", "user:access_level": level}
+                    if path == "tool":
+                        call = lambda: datastore.get_datastore_content("marketing", level, context)
+                    else:
+                        call = lambda: agent.tool_wrapper(context)
+                    call()  # Warm-up: loads the file and builds the projected view.
+                    for concurrency in concurrencies:
+                        results[f"{path}/{level}/{size}/c{concurrency}"] = drive(call, requests, concurrency, before)
+    return results
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], tolerance: float) -> List[str]:
+    """Returns one message per metric that is worse than the baseline by more than `tolerance`."""
+    regressions = []
+    for scenario, row in results.items():
+        reference = baseline.get(scenario)
+        if reference is None:
+            continue
+        for metric, higher_is_worse in HIGHER_IS_WORSE.items():
+            old, new = reference.get(metric), row[metric]
+            if not old:
+                continue
+            if metric.endswith("_ms") and new - old < LATENCY_NOISE_FLOOR_MS:
+                continue
+            change = (new - old) / old if higher_is_worse else (old - new) / old
+            if change > tolerance:
+                regressions.append(f"{scenario} {metric}: {old:.2f} -> {new:.2f} ({change:+.0%} worse)")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=2_000, help="Calls per scenario.")
+    parser.add_argument("--cold", action="store_true", help="Clear the datastore cache before every call.")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline file to save or compare against.")
+    parser.add_argument("--save-baseline", action="store_true", help="Write the results to the baseline file.")
+    parser.add_argument("--compare", action="store_true", help="Fail if the results regress from the baseline.")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="Allowed relative regression (default 50%%).")
+    args = parser.parse_args()
+    if args.compare and not args.save_baseline and not os.path.exists(args.baseline):
+        parser.error(f"no baseline at {args.baseline}; record one with --save-baseline first.")
+
+    results: Dict[str, Dict[str, float]] = {}
+    spawn = multiprocessing.get_context("spawn")
+    for size in args.sizes:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=1, mp_context=spawn) as pool:
+            results.update(pool.submit(run_size, size, args.requests, args.concurrency, args.cold).result())
+
+    print(f"{'scenario':<32} " + " ".join(f"{c:>15}" for c in COLUMNS))
+    for scenario, row in results.items():
+        print(f"{scenario:<32} " + " ".join(f"{row[c]:>15.2f}" for c in COLUMNS))
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump({
+                "machine": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+                "options": {"requests": args.requests, "cold": args.cold},
+                "results": results,
+            }, f, indent=2, sort_keys=True)
+        print(f"Saved baseline to {args.baseline}")
+
+    if args.compare:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        if baseline.get("options") != {"requests": args.requests, "cold": args.cold}:
+            print(f"Warning: baseline was recorded with options {baseline.get('options')}.")
+        regressions = compare(results, baseline["results"], args.tolerance)
+        for message in regressions:
+            print(f"REGRESSION {message}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.tolerance:.0%} of the baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""Compares model_armor_callback latency with a client per call and a pooled client.
+
+Starts a local stand-in for the Model Armor gRPC service that answers every
+SanitizeUserPrompt with "no match" (optionally after --server-latency-ms), then
+runs the real `model_armor_callback` against it:
+
+- per-call: the pool is emptied before every call, so each call creates a new
+  client and channel and connects, as the callback did before pooling;
+- pooled: one warmed-up client and channel serve every call.
+
+The stand-in uses a plaintext channel, so the per-call numbers leave out the TLS
+handshake and token fetch that a real endpoint adds; the real gap is larger.
+
+Usage:
+    python -m benchmarks.model_armor_client --calls 500 [--server-latency-ms 2]
+"""
+import argparse
+import asyncio
+import functools
+import logging
+import statistics
+import time
+from typing import Dict, List
+from unittest.mock import MagicMock, patch
+
+import grpc
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest
+from google.auth.credentials import AnonymousCredentials
+from google.cloud import modelarmor_v1
+from google.cloud.modelarmor_v1.services.model_armor.transports import ModelArmorGrpcAsyncIOTransport
+from google.genai import types as genai_types
+
+from model_armor_demo.client_pool import KEEPALIVE_OPTIONS, ModelArmorClientPool
+
+SERVICE = "google.cloud.modelarmor.v1.ModelArmor"
+
+
+async def start_stand_in_server(latency_ms: float) -> "tuple[grpc.aio.Server, str]":
+    """Starts a local SanitizeUserPrompt server and returns it with its address."""
+
+    async def sanitize_user_prompt(request, context):
+        if latency_ms:
+            await asyncio.sleep(latency_ms / 1000)
+        return modelarmor_v1.SanitizeUserPromptResponse(
+            sanitization_result=modelarmor_v1.SanitizationResult(
+                filter_match_state=modelarmor_v1.FilterMatchState.NO_MATCH_FOUND
+            )
+        )
+
+    handler = grpc.method_handlers_generic_handler(SERVICE, {
+        "SanitizeUserPrompt": grpc.unary_unary_rpc_method_handler(
+            sanitize_user_prompt,
+            request_deserializer=modelarmor_v1.SanitizeUserPromptRequest.deserialize,
+            response_serializer=modelarmor_v1.SanitizeUserPromptResponse.serialize,
+        ),
+    })
+    server = grpc.aio.server()
+    server.add_generic_rpc_handlers((handler,))
+    port = server.add_insecure_port("127.0.0.1:0")
+    await server.start()
+    return server, f"127.0.0.1:{port}"
+
+
+def plaintext_client(api_endpoint: str) -> modelarmor_v1.ModelArmorAsyncClient:
+    channel = grpc.aio.insecure_channel(api_endpoint, options=KEEPALIVE_OPTIONS)
+    return modelarmor_v1.ModelArmorAsyncClient(
+        credentials=AnonymousCredentials(),
+        transport=functools.partial(ModelArmorGrpcAsyncIOTransport, channel=channel),
+        client_options={"api_endpoint": api_endpoint},
+    )
+
+
+def summarize(latencies: List[float]) -> Dict[str, float]:
+    latencies = sorted(latencies)
+    return {
+        "p50_ms": statistics.median(latencies),
+        "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+        "mean_ms": statistics.fmean(latencies),
+    }
+
+
+async def run(calls: int, server_latency_ms: float) -> None:
+    from model_armor_demo import agent
+
+    server, address = await start_stand_in_server(server_latency_ms)
+    pool = ModelArmorClientPool(client_factory=plaintext_client)
+    context = MagicMock(spec=CallbackContext)
+    request = LlmRequest(contents=[genai_types.Content(parts=[genai_types.Part(text="Summarize the quarterly report")])])
+    results = {}
+    try:
+        with patch.object(agent, "client_pool", pool), patch.object(agent, "MODEL_ARMOR_API_ENDPOINT", address), \
+                patch.object(agent, "GOOGLE_CLOUD_PROJECT_ID", "benchmark"):
+            for mode in ("per-call", "pooled"):
+                await pool.close()
+                if mode == "pooled":
+                    await pool.warm_up([address])
+                latencies = []
+                for _ in range(calls):
+                    if mode == "per-call":
+                        await pool.close()
+                    start = time.perf_counter()
+                    response = await agent.model_armor_callback(context, request)
+                    latencies.append((time.perf_counter() - start) * 1000)
+                    assert response is None, "The stand-in server should allow every prompt."
+                results[mode] = summarize(latencies)
+            await pool.close()
+    finally:
+        await server.stop(None)
+
+    print(f"{'mode':<10} {'p50_ms':>8} {'p99_ms':>8} {'mean_ms':>8}")
+    for mode, row in results.items():
+        print(f"{mode:<10} {row['p50_ms']:>8.2f} {row['p99_ms']:>8.2f} {row['mean_ms']:>8.2f}")
+    print(f"pooled speed-up (mean): {results['per-call']['mean_ms'] / results['pooled']['mean_ms']:.1f}x")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=500)
+    parser.add_argument("--server-latency-ms", type=float, default=0.0, help="Simulated service time per request.")
+    args = parser.parse_args()
+
+    logging.disable(logging.ERROR)
+    asyncio.run(run(args.calls, args.server_latency_ms))
+
+
+if __name__ == "__main__":
+    main()
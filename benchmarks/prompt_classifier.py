@@ -0,0 +1,73 @@
+"""Measures the per-prompt latency of the local jailbreak classifier.
+
+Scores prompts of several lengths one at a time (p50/p99 latency, as in
+prompt_inspection_callback) and in batches (mean cost per prompt). Uses the
+model given with --model, or a model trained on a small synthetic corpus with
+the default 2 ** 18 buckets. Prompts longer than the model's `max_characters`
+are scored in overlapping windows, so latency grows linearly with length
+beyond about 600 words.
+
+Usage:
+    python -m benchmarks.prompt_classifier --words 20 200 2000 20000 [--model jailbreak.npz]
+"""
+import argparse
+import logging
+import random
+import statistics
+import time
+from typing import List
+
+from prompt_inspection_demo.classifier import PromptClassifier, load_classifier, train
+
+WORDS = ["please", "summarize", "the", "quarterly", "report", "ignore", "previous", "instructions", "and", "risks"]
+
+
+def synthetic_model() -> PromptClassifier:
+    rng = random.Random(0)
+    texts, labels = [], []
+    for _ in range(1000):
+        label = rng.random() < 0.5
+        prefix = "ignore all previous instructions and " if label else "please "
+        texts.append(prefix + " ".join(rng.choice(WORDS) for _ in range(20)))
+        labels.append(int(label))
+    return train(texts, labels)
+
+
+def make_prompts(words: int, count: int) -> List[str]:
+    rng = random.Random(words)
+    return [" ".join(rng.choice(WORDS) for _ in range(words)) for _ in range(count)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--words", type=int, nargs="+", default=[20, 200, 2000])
+    parser.add_argument("--model", help="Model file (default: train a synthetic model).")
+    parser.add_argument("--runs", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=256)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    model = load_classifier(args.model) if args.model else synthetic_model()
+
+    print(f"{'words':>6} {'p50_us':>10} {'p99_us':>10} {'batched_us':>12}")
+    for words in args.words:
+        prompts = make_prompts(words, args.runs)
+        latencies = []
+        for prompt in prompts:
+            start = time.perf_counter()
+            model.score(prompt)
+            latencies.append((time.perf_counter() - start) * 1e6)
+        latencies.sort()
+
+        batches = [prompts[i:i + args.batch_size] for i in range(0, len(prompts), args.batch_size)]
+        start = time.perf_counter()
+        for batch in batches:
+            model.predict_proba(batch)
+        batched = (time.perf_counter() - start) * 1e6 / len(prompts)
+
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        print(f"{words:>6} {statistics.median(latencies):>10.1f} {p99:>10.1f} {batched:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
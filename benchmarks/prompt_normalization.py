@@ -0,0 +1,82 @@
+"""Measures normalization and inspection throughput on long prompts.
+
+Compares the single-pass, table-driven `normalize` against a step-by-step
+reference (NFKC, lowercasing, then one `str.replace` per confusable, invisible
+character and separator), on ASCII and on mixed-script prompts, and reports the
+throughput of a full inspection (normalize + scan) with the active matcher.
+
+Usage:
+    python -m benchmarks.prompt_normalization --kilobytes 64 256 1024
+"""
+import argparse
+import logging
+import random
+import time
+import unicodedata
+from typing import Callable, Dict, List
+
+from prompt_inspection_demo.normalize import CONFUSABLES, normalize
+
+WORDS = ["please", "summarize", "the", "quarterly", "report", "for", "our", "team", "and", "list", "risks"]
+# Obfuscated words that match no default rule, so inspection scans the whole prompt.
+OBFUSCATED = ["ѕеcurе", "r e p o r t", "qu4rt3rly", "te​a­m", "ｒｅｐｏｒｔ", "café"]
+REFERENCE_DROPPED = ["​", "‌", "‍", "­", "﻿", " ", "\t", "\n", ".", ",", "-", "_", "*", "/", "?", ":", ";", "'", '"']
+
+
+def reference_normalize(text: str) -> str:
+    """Step-by-step equivalent of a subset of `normalize`, one pass per step."""
+    text = unicodedata.normalize("NFKC", text).lower()
+    for source, target in CONFUSABLES.items():
+        text = text.replace(source, target)
+    for dropped in REFERENCE_DROPPED:
+        text = text.replace(dropped, "")
+    return text
+
+
+def make_prompt(kilobytes: int, mixed: bool, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    pieces: List[str] = []
+    size = 0
+    while size < kilobytes * 1024:
+        word = rng.choice(OBFUSCATED) if mixed and rng.random() < 0.1 else rng.choice(WORDS)
+        pieces.append(word)
+        size += len(word) + 1
+    return " ".join(pieces)
+
+
+def throughput(fn: Callable[[str], object], text: str, min_seconds: float = 0.5) -> float:
+    """Returns MB/s of characters processed."""
+    runs = 0
+    start = time.perf_counter()
+    while True:
+        fn(text)
+        runs += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            return runs * len(text) / elapsed / 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--kilobytes", type=int, nargs="+", default=[64, 256, 1024])
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    from prompt_inspection_demo.rules import active_matcher
+
+    columns = ["normalize", "reference", "inspect"]
+    print(f"{'prompt':<14} " + " ".join(f"{c + ' MB/s':>16}" for c in columns))
+    for kilobytes in args.kilobytes:
+        for mixed in (False, True):
+            text = make_prompt(kilobytes, mixed)
+            row: Dict[str, float] = {
+                "normalize": throughput(normalize, text),
+                "reference": throughput(reference_normalize, text),
+                "inspect": throughput(active_matcher.search, text),
+            }
+            label = f"{kilobytes}KB {'mixed' if mixed else 'ascii'}"
+            print(f"{label:<14} " + " ".join(f"{row[c]:>16.1f}" for c in columns))
+
+
+if __name__ == "__main__":
+    main()
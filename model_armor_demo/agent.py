@@ -1,6 +1,9 @@
+import asyncio
+import collections
 import os
 import logging
-from typing import Optional
+import time
+from typing import Counter, Optional
 
 from google.adk.agents import Agent
 
@@ -12,6 +15,13 @@ from google.adk.agents.callback_context import CallbackContext
 from google.adk.models import LlmRequest, LlmResponse
 from google.cloud import modelarmor_v1
 from google.genai import types as genai_types
+from model_armor_demo import resilience
+from model_armor_demo.client_pool import client_pool
+from model_armor_demo.singleflight import sanitize_flights
+from model_armor_demo.speculative import SpeculativeGemini
+from model_armor_demo.verdict_cache import prompt_digest, sanitize_cache
+from prompt_inspection_demo import pii, rules
+from prompt_inspection_demo.verdict_cache import verdict_cache
 
 # Set the GOOGLE_CLOUD_PROJECT environment variable
 GOOGLE_CLOUD_PROJECT_ID: str = os.getenv("GOOGLE_CLOUD_PROJECT", "")
@@ -20,6 +30,23 @@ if not GOOGLE_CLOUD_PROJECT_ID:
 
 GOOGLE_CLOUD_LOCATION: str = os.getenv("GOOGLE_CLOUD_LOCATION", "us-central1")
 TEMPLATE_ID = "ma-all-low"
+MODEL_ARMOR_API_ENDPOINT: str = f"modelarmor.{GOOGLE_CLOUD_LOCATION}.rep.googleapis.com"
+
+# What to do when Model Armor fails, times out or its circuit is open: 'block' the request
+# (fail closed), 'open' to let it through (fail open), or 'local' to use the local PII detector
+# and prompt inspection rules.
+MODEL_ARMOR_FALLBACK: str = os.getenv("MODEL_ARMOR_FALLBACK", "block").lower()
+
+# Trips on Model Armor error rate or latency; see model_armor_demo.resilience.
+breaker = resilience.CircuitBreaker()
+# Latency of each sanitize_user_prompt attempt, and of whole checks (cache, coalescing, retries).
+rpc_latency = resilience.LatencyHistogram()
+check_latency = resilience.LatencyHistogram()
+# deadline_exceeded, errors, circuit_open and hedged counts.
+check_outcomes: Counter[str] = collections.Counter()
+
+# Opt-in: start the supervisor's model call while Model Armor checks the prompt, holding its output until the verdict.
+MODEL_ARMOR_SPECULATIVE: bool = os.getenv("MODEL_ARMOR_SPECULATIVE", "false").lower() == "true"
 
 # Worker Agent
 worker_agent = Agent(
@@ -30,39 +57,191 @@ worker_agent = Agent(
     # tools=[handle_sensitive_data],
 )
 
+def _local_pii_response(prompt_text: str) -> Optional[LlmResponse]:
+    """Returns a blocked response if the local detector finds a blocking kind of PII or secret in the prompt."""
+    finding = pii.detect_blocking(prompt_text)
+    if finding is None:
+        return None
+    logger.warning(f"Local PII detection blocked request containing {finding.kind}: '{finding.redacted(prompt_text)}'")
+    return LlmResponse(
+        content=genai_types.Content(
+            parts=[
+                genai_types.Part(
+                    text="Blocked by Model Armor: Request contains sensitive information."
+                )
+            ]
+        ),
+        custom_metadata={"model_armor_tier": "local", "pii_kind": finding.kind},
+    )
+
+async def _sanitize_prompt(client, template_name: str, digest: bytes, prompt_text: str, deadline: float) -> int:
+    """Calls sanitize_user_prompt, caches a reusable verdict and returns the filter match state.
+
+    Attempts are hedged after the recent p95 latency and retried after transient errors,
+    each with the time left until `deadline` (event loop time) as its gRPC timeout.
+    The circuit breaker records one outcome per call, however many attempts it took.
+    """
+    prompt_data = modelarmor_v1.DataItem(text=prompt_text)
+    request = modelarmor_v1.SanitizeUserPromptRequest(
+        name=template_name,
+        user_prompt_data=prompt_data,
+    )
+    loop = asyncio.get_running_loop()
+    attempts = 0
+
+    async def attempt():
+        nonlocal attempts
+        attempts += 1
+        started = time.perf_counter()
+        response = await client.sanitize_user_prompt(request=request, timeout=max(deadline - loop.time(), 0.001))
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        rpc_latency.observe(elapsed_ms)
+        logger.info(f"Model Armor scan completed in {elapsed_ms:.1f} ms.")
+        return response
+
+    started = time.perf_counter()
+    try:
+        response = await resilience.hedged(attempt, hedge_delay=rpc_latency.hedge_delay(), deadline=deadline)
+    except Exception:
+        breaker.record(False, (time.perf_counter() - started) * 1000)
+        raise
+    else:
+        breaker.record(True, (time.perf_counter() - started) * 1000)
+    finally:
+        if attempts > 1:
+            check_outcomes["hedged"] += 1
+    sanitize_cache.put(template_name, digest, response.sanitization_result)
+    return response.sanitization_result.filter_match_state
+
+def _local_inspection_response(prompt_text: str) -> Optional[LlmResponse]:
+    """Returns a blocked response if the local PII detector or prompt inspection rules flag the prompt."""
+    blocked = _local_pii_response(prompt_text)
+    if blocked is not None:
+        return blocked
+    match = verdict_cache.search(rules.active_matcher, prompt_text)
+    if match is None:
+        return None
+    logger.warning(f"Local inspection blocked request due to rule '{match.rule.id}'.")
+    return LlmResponse(
+        content=genai_types.Content(
+            parts=[
+                genai_types.Part(
+                    text="Blocked by Model Armor: Request contains sensitive information."
+                )
+            ]
+        ),
+        custom_metadata={"model_armor_tier": "local", "rule": match.rule.id},
+    )
+
+
+def _fallback_response(prompt_text: str, reason: str) -> Optional[LlmResponse]:
+    """Applies MODEL_ARMOR_FALLBACK when Model Armor gave no verdict."""
+    if MODEL_ARMOR_FALLBACK == "local":
+        logger.warning(f"Model Armor unavailable ({reason}); using local inspection instead.")
+        return _local_inspection_response(prompt_text) if prompt_text else None
+    if MODEL_ARMOR_FALLBACK == "open":
+        logger.warning(f"Model Armor unavailable ({reason}); failing open.")
+        return None
+    return LlmResponse(
+        content=genai_types.Content(
+            parts=[
+                genai_types.Part(
+                    text="An error occurred during safety check. Please try again or contact support."
+                )
+            ]
+        )
+    )
+
+
+def _prompt_text(llm_request: LlmRequest) -> str:
+    """Returns the text of the request's last content, assumed to be the user's prompt."""
+    prompt_text = ""
+    if llm_request.contents and llm_request.contents[-1].parts:
+        for part in llm_request.contents[-1].parts:
+            if part.text:
+                prompt_text += part.text
+    return prompt_text
+
+
+async def _speculative_check(llm_request: LlmRequest) -> Optional[LlmResponse]:
+    return await model_armor_check(_prompt_text(llm_request))
+
 # Model Armor Callback
 async def model_armor_callback(
     callback_context: CallbackContext, llm_request: LlmRequest
 ) -> Optional[LlmResponse]:
-    """Intercepts and blocks requests containing sensitive information."""
+    """Intercepts and blocks requests containing sensitive information.
+
+    Prompts are first checked by the local PII/secret detector, which blocks obvious
+    leaks without a round trip to Model Armor. Complete Model Armor verdicts are
+    cached for a TTL, so identical prompts are not sent again, and concurrent
+    identical prompts share a single in-flight call.
+
+    Each Model Armor check has a MODEL_ARMOR_DEADLINE_MS budget, slow calls are
+    hedged, and a circuit breaker stops calling Model Armor while it is failing or
+    slow. When no verdict is available, MODEL_ARMOR_FALLBACK decides: 'block'
+    (default), 'open', or 'local' inspection.
+
+    With MODEL_ARMOR_SPECULATIVE enabled, only the local tier runs here; the Model
+    Armor check runs concurrently with the model call (see SpeculativeGemini).
+    """
+    prompt_text = _prompt_text(llm_request)
+
+    if pii.ENABLED and prompt_text:
+        blocked = _local_pii_response(prompt_text)
+        if blocked is not None:
+            return blocked
+
+    if MODEL_ARMOR_SPECULATIVE:
+        return None # The supervisor's SpeculativeGemini model runs model_armor_check alongside the model call.
+    return await model_armor_check(prompt_text)
+
+
+async def model_armor_check(prompt_text: str) -> Optional[LlmResponse]:
+    """Checks a prompt with Model Armor.
+
+    Args:
+        prompt_text (str): The user's prompt.
+
+    Returns:
+        Optional[LlmResponse]: A blocked or error response, or None if the prompt may proceed.
+    """
     if not GOOGLE_CLOUD_PROJECT_ID:
         logger.warning("Model Armor skipped: GOOGLE_CLOUD_PROJECT environment variable not set.")
         return None # Allow request to proceed if project ID is missing
 
     try:
-        # Use GOOGLE_CLOUD_LOCATION for the API endpoint
-        api_endpoint = f"modelarmor.{GOOGLE_CLOUD_LOCATION}.rep.googleapis.com"
-        client = modelarmor_v1.ModelArmorAsyncClient(client_options={"api_endpoint": api_endpoint})
-
-        # Assuming the last content part is the user's text prompt
-        prompt_text = ""
-        if llm_request.contents and llm_request.contents[-1].parts:
-            for part in llm_request.contents[-1].parts:
-                if part.text:
-                    prompt_text += part.text
-        
+        # Long-lived client for the GOOGLE_CLOUD_LOCATION endpoint, shared by all calls
+        client = client_pool.get(MODEL_ARMOR_API_ENDPOINT)
+
         if not prompt_text:
             logger.warning("Model Armor received empty prompt text.")
             return None
 
-        prompt_data = modelarmor_v1.DataItem(text=prompt_text)
-        request = modelarmor_v1.SanitizeUserPromptRequest(
-            name=f"projects/{GOOGLE_CLOUD_PROJECT_ID}/locations/{GOOGLE_CLOUD_LOCATION}/templates/{TEMPLATE_ID}",
-            user_prompt_data=prompt_data,
-        )
-        response = await client.sanitize_user_prompt(request=request)
+        template_name = f"projects/{GOOGLE_CLOUD_PROJECT_ID}/locations/{GOOGLE_CLOUD_LOCATION}/templates/{TEMPLATE_ID}"
+        digest = prompt_digest(prompt_text)
+        match_state = sanitize_cache.get(template_name, digest)
+        if match_state is not None:
+            source = "cache"
+            logger.info(f"Model Armor verdict reused from cache for prompt: '{prompt_text[:50]}...'")
+        elif not breaker.allow():
+            check_outcomes["circuit_open"] += 1
+            return _fallback_response(prompt_text, "circuit open")
+        else:
+            source = "remote"
+            budget = resilience.DEADLINE_MS / 1000
+            deadline = asyncio.get_running_loop().time() + budget
+            started = time.perf_counter()
+            # Concurrent callbacks for the same prompt share one call; each waits at most its own budget.
+            match_state = await asyncio.wait_for(
+                sanitize_flights.do(
+                    (template_name, digest), lambda: _sanitize_prompt(client, template_name, digest, prompt_text, deadline)
+                ),
+                timeout=budget,
+            )
+            check_latency.observe((time.perf_counter() - started) * 1000)
 
-        if response.sanitization_result.filter_match_state == 2: # FilterMatchState.BLOCKED
+        if match_state == 2: # FilterMatchState.BLOCKED
             logger.warning(f"Model Armor blocked request due to sensitive information. Prompt: '{prompt_text}'")
             return LlmResponse(
                 content=genai_types.Content(
@@ -71,27 +250,40 @@ async def model_armor_callback(
                             text="Blocked by Model Armor: Request contains sensitive information."
                         )
                     ]
-                )
+                ),
+                custom_metadata={"model_armor_tier": source},
             )
-        logger.info(f"Model Armor scan successful. Prompt: '{prompt_text[:50]}...' Status: {response.sanitization_result.filter_match_state}")
+        logger.info(f"Model Armor scan successful. Prompt: '{prompt_text[:50]}...' Status: {match_state}")
         return None # Allow request to proceed
+    except asyncio.TimeoutError:
+        check_outcomes["deadline_exceeded"] += 1
+        logger.error(f"Model Armor check exceeded its {resilience.DEADLINE_MS:.0f} ms deadline.")
+        return _fallback_response(prompt_text, "deadline exceeded")
     except Exception as e:
+        check_outcomes["errors"] += 1
         logger.error(f"Error during Model Armor sanitization: {e}")
-        # Depending on policy, you might block here or allow to proceed
-        return LlmResponse(
-            content=genai_types.Content(
-                parts=[
-                    genai_types.Part(
-                        text="An error occurred during safety check. Please try again or contact support."
-                    )
-                ]
-            )
-        )
+        return _fallback_response(prompt_text, "error")
+
+
+def model_armor_metrics() -> str:
+    """Returns Model Armor breaker state, latency histograms and counters in the Prometheus text format."""
+    cache = sanitize_cache.stats()
+    flights = sanitize_flights.stats()
+    return resilience.metrics_text(
+        breaker,
+        {"rpc_latency": rpc_latency, "check_latency": check_latency},
+        counters={
+            **{f"{name}_total": value for name, value in sorted(check_outcomes.items())},
+            "cache_hits_total": cache["hits"],
+            "cache_misses_total": cache["misses"],
+            "coalesced_total": flights["coalesced"],
+        },
+    )
 
 # Supervisor Agent
 supervisor_agent = Agent(
     name="supervisor_agent",
-    model="gemini-2.5-flash",
+    model=SpeculativeGemini(model="gemini-2.5-flash", check=_speculative_check) if MODEL_ARMOR_SPECULATIVE else "gemini-2.5-flash",
     instruction="You are a supervisor agent. You delegate tasks to the worker agent.",
     description="An agent that delegates tasks.",
     sub_agents=[worker_agent],
@@ -99,3 +291,10 @@ supervisor_agent = Agent(
 )
 
 root_agent: Agent = supervisor_agent
+
+# When loaded by a running server (e.g. `adk web`), connect to Model Armor before the first request.
+try:
+    if GOOGLE_CLOUD_PROJECT_ID:
+        client_pool.start_warm_up([MODEL_ARMOR_API_ENDPOINT])
+except RuntimeError:
+    pass # No running event loop: the first request connects instead.
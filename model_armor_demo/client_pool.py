@@ -0,0 +1,146 @@
+"""Process-wide pool of long-lived Model Armor clients.
+
+Creating a `ModelArmorAsyncClient` opens a new gRPC channel, so a client per
+call pays DNS, TCP and TLS setup and an auth-token fetch before every sanitize
+request. The pool keeps one client per API endpoint instead:
+
+- Channels are created with HTTP/2 keep-alive pings, so idle connections
+  survive between bursts of traffic instead of being dropped by proxies.
+- `warm_up` connects the channel and refreshes the credentials ahead of the
+  first request. The agent schedules it when it is loaded by a running server.
+- `close` (or `shutdown`, registered with `atexit`) closes every channel.
+
+gRPC asyncio channels are bound to the event loop that created them, so clients
+are pooled per (endpoint, event loop); clients of closed loops are dropped.
+"""
+import asyncio
+import atexit
+import functools
+import logging
+import os
+from typing import Any, Callable, Dict, Iterable, Set, Tuple
+
+import google.auth.transport.requests
+from google.cloud import modelarmor_v1
+from google.cloud.modelarmor_v1.services.model_armor.transports import ModelArmorGrpcAsyncIOTransport
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+KEEPALIVE_SECONDS: int = int(os.getenv("MODEL_ARMOR_KEEPALIVE_SECONDS", "30"))
+WARMUP_TIMEOUT_SECONDS: float = float(os.getenv("MODEL_ARMOR_WARMUP_TIMEOUT_SECONDS", "5"))
+
+# HTTP/2 pings keep idle connections open; permitting them without active calls
+# matters because the callback's traffic is bursty.
+KEEPALIVE_OPTIONS = [
+    ("grpc.keepalive_time_ms", KEEPALIVE_SECONDS * 1000),
+    ("grpc.keepalive_timeout_ms", 10000),
+    ("grpc.keepalive_permit_without_calls", 1),
+    ("grpc.http2.max_pings_without_data", 0),
+]
+
+
+def _keepalive_channel(host: str, **kwargs: Any):
+    kwargs["options"] = list(kwargs.get("options") or []) + KEEPALIVE_OPTIONS
+    return ModelArmorGrpcAsyncIOTransport.create_channel(host, **kwargs)
+
+
+def create_client(api_endpoint: str) -> modelarmor_v1.ModelArmorAsyncClient:
+    """Creates a Model Armor client whose channel sends keep-alive pings."""
+    return modelarmor_v1.ModelArmorAsyncClient(
+        transport=functools.partial(ModelArmorGrpcAsyncIOTransport, channel=_keepalive_channel),
+        client_options={"api_endpoint": api_endpoint},
+    )
+
+
+class ModelArmorClientPool:
+    """One long-lived client per API endpoint and event loop.
+
+    Args:
+        client_factory (Callable[[str], Any]): Creates a client for an API endpoint.
+    """
+
+    def __init__(self, client_factory: Callable[[str], Any] = create_client):
+        self.client_factory = client_factory
+        self._clients: Dict[Tuple[str, asyncio.AbstractEventLoop], Any] = {}
+        self.created = 0
+        # Strong references to running warm-up tasks, so they are not garbage-collected early.
+        self._warm_up_tasks: Set[asyncio.Task] = set()
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+    def get(self, api_endpoint: str) -> Any:
+        """Returns the client for `api_endpoint` on the running event loop, creating it if needed."""
+        loop = asyncio.get_running_loop()
+        client = self._clients.get((api_endpoint, loop))
+        if client is None:
+            for key in [key for key in self._clients if key[1].is_closed()]:
+                del self._clients[key]
+            client = self.client_factory(api_endpoint)
+            self._clients[(api_endpoint, loop)] = client
+            self.created += 1
+            logger.info(f"Created pooled Model Armor client for {api_endpoint}.")
+        return client
+
+    async def warm_up(self, api_endpoints: Iterable[str], timeout: float = WARMUP_TIMEOUT_SECONDS) -> None:
+        """Connects the channels and refreshes the credentials of `api_endpoints`.
+
+        Failures are logged, not raised: the first request then connects as usual.
+        """
+        for api_endpoint in api_endpoints:
+            client = self.get(api_endpoint)
+            transport = client.transport
+            try:
+                credentials = getattr(transport, "_credentials", None)
+                if credentials is not None and not credentials.valid:
+                    await asyncio.to_thread(credentials.refresh, google.auth.transport.requests.Request())
+                await asyncio.wait_for(transport.grpc_channel.channel_ready(), timeout)
+                logger.info(f"Warmed up Model Armor channel to {api_endpoint}.")
+            except Exception as e:
+                logger.warning(f"Model Armor warm-up for {api_endpoint} failed: {e}")
+
+    def start_warm_up(self, api_endpoints: Iterable[str]) -> asyncio.Task:
+        """Schedules `warm_up` on the running event loop and keeps the task until it finishes.
+
+        Returns:
+            asyncio.Task: The warm-up task.
+        """
+        task = asyncio.get_running_loop().create_task(self.warm_up(list(api_endpoints)))
+        self._warm_up_tasks.add(task)
+        task.add_done_callback(self._warm_up_done)
+        return task
+
+    def _warm_up_done(self, task: asyncio.Task) -> None:
+        self._warm_up_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Model Armor warm-up failed: {task.exception()}")
+
+    async def close(self) -> None:
+        """Closes the clients of the running event loop."""
+        loop = asyncio.get_running_loop()
+        for key in [key for key in self._clients if key[1] is loop]:
+            client = self._clients.pop(key)
+            try:
+                await client.transport.close()
+            except Exception as e:
+                logger.warning(f"Error closing Model Armor client for {key[0]}: {e}")
+
+    def shutdown(self) -> None:
+        """Closes every pooled client whose event loop can still run; for use at exit."""
+        for (api_endpoint, loop), client in list(self._clients.items()):
+            del self._clients[(api_endpoint, loop)]
+            if loop.is_closed():
+                continue
+            try:
+                if loop.is_running():
+                    asyncio.run_coroutine_threadsafe(client.transport.close(), loop)
+                else:
+                    loop.run_until_complete(client.transport.close())
+            except Exception as e:
+                logger.warning(f"Error closing Model Armor client for {api_endpoint}: {e}")
+
+
+# The pool used by model_armor_callback.
+client_pool = ModelArmorClientPool()
+atexit.register(client_pool.shutdown)
@@ -0,0 +1,305 @@
+"""Deadlines, hedged retries, a circuit breaker and latency metrics for Model Armor.
+
+A slow or flapping Model Armor region must not stall every session:
+
+- Each check has a deadline budget (`MODEL_ARMOR_DEADLINE_MS`); the RPC's gRPC
+  timeout is the remaining budget, so an attempt never outlives its caller.
+- `hedged` starts a second attempt when the first has not answered within the
+  recent p`MODEL_ARMOR_HEDGE_PERCENTILE` latency, or right away when it failed
+  with a transient error, and returns whichever attempt succeeds first. No
+  attempt is started once the deadline has passed.
+- `CircuitBreaker` opens when, over the last `window` calls, the error rate or
+  the share of calls slower than `slow_call_ms` reaches its threshold. While it
+  is open, checks skip Model Armor and apply the fallback policy at once; after
+  `open_seconds` a single probe decides whether to close it again.
+
+`metrics_text` exports the breaker state and the latency histograms in the
+Prometheus text format.
+"""
+import asyncio
+import bisect
+import os
+import threading
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Sequence, Set, Tuple, Type, TypeVar, Union
+
+from google.api_core import exceptions as api_exceptions
+
+T = TypeVar("T")
+
+DEADLINE_MS: float = float(os.getenv("MODEL_ARMOR_DEADLINE_MS", "1500"))
+HEDGE_PERCENTILE: float = float(os.getenv("MODEL_ARMOR_HEDGE_PERCENTILE", "95"))
+MAX_ATTEMPTS: int = int(os.getenv("MODEL_ARMOR_MAX_ATTEMPTS", "2"))
+# Never hedge sooner than this, however fast recent calls were.
+HEDGE_MIN_MS: float = float(os.getenv("MODEL_ARMOR_HEDGE_MIN_MS", "50"))
+
+# Errors worth another attempt; anything else (bad request, permission denied) fails at once.
+RETRYABLE_ERRORS: Tuple[Type[BaseException], ...] = (
+    api_exceptions.ServiceUnavailable,
+    api_exceptions.DeadlineExceeded,
+    api_exceptions.InternalServerError,
+    api_exceptions.TooManyRequests,
+    api_exceptions.Aborted,
+    ConnectionError,
+    asyncio.TimeoutError,
+)
+
+DEFAULT_BUCKETS_MS: Tuple[float, ...] = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class LatencyHistogram:
+    """Cumulative latency histogram, plus a window of recent samples for percentiles.
+
+    Args:
+        buckets_ms (Sequence[float]): Upper bounds of the histogram buckets, ascending.
+        window (int): Number of recent samples kept for `percentile`.
+    """
+
+    def __init__(self, buckets_ms: Sequence[float] = DEFAULT_BUCKETS_MS, window: int = 512):
+        self.buckets_ms = tuple(buckets_ms)
+        self._counts = [0] * (len(self.buckets_ms) + 1) # The last bucket is +Inf.
+        self._sum_ms = 0.0
+        self._recent: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, latency_ms: float) -> None:
+        with self._lock:
+            self._counts[bisect.bisect_left(self.buckets_ms, latency_ms)] += 1
+            self._sum_ms += latency_ms
+            self._recent.append(latency_ms)
+
+    def percentile(self, q: float, min_samples: int = 20) -> Optional[float]:
+        """Returns the q-th percentile of recent samples, or None with fewer than `min_samples`."""
+        with self._lock:
+            if len(self._recent) < min_samples:
+                return None
+            samples = sorted(self._recent)
+        return samples[min(len(samples) - 1, int(len(samples) * q / 100))]
+
+    def hedge_delay(self, q: float = HEDGE_PERCENTILE, floor_ms: float = HEDGE_MIN_MS) -> Optional[float]:
+        """Returns the hedging delay in seconds: the q-th percentile latency, at least `floor_ms`.
+
+        None (no hedging) while there are too few samples or when q is 0.
+        """
+        if q <= 0:
+            return None
+        latency_ms = self.percentile(q)
+        return None if latency_ms is None else max(latency_ms, floor_ms) / 1000
+
+    def clear(self) -> None:
+        with self._lock:
+            self._counts = [0] * (len(self.buckets_ms) + 1)
+            self._sum_ms = 0.0
+            self._recent.clear()
+
+    def snapshot(self) -> Dict[str, object]:
+        """Returns cumulative bucket counts keyed by upper bound, the count and the sum."""
+        with self._lock:
+            cumulative, total = {}, 0
+            for bound, count in zip(self.buckets_ms + (float("inf"),), self._counts):
+                total += count
+                cumulative[bound] = total
+            return {"buckets": cumulative, "count": total, "sum_ms": self._sum_ms}
+
+
+class CircuitBreaker:
+    """A count-based circuit breaker that trips on error rate or slow-call rate.
+
+    Args:
+        window (int): Number of recent calls considered.
+        min_calls (int): Calls needed in the window before the breaker can trip.
+        error_rate (float): Share of failed calls that opens the breaker.
+        slow_call_ms (float): Calls slower than this count as slow.
+        slow_rate (float): Share of slow calls that opens the breaker.
+        open_seconds (float): How long the breaker stays open before a probe is let through.
+        clock (Callable[[], float]): Monotonic time source.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(
+        self,
+        window: int = int(os.getenv("MODEL_ARMOR_BREAKER_WINDOW", "20")),
+        min_calls: int = int(os.getenv("MODEL_ARMOR_BREAKER_MIN_CALLS", "10")),
+        error_rate: float = float(os.getenv("MODEL_ARMOR_BREAKER_ERROR_RATE", "0.5")),
+        slow_call_ms: float = float(os.getenv("MODEL_ARMOR_BREAKER_SLOW_MS", "1000")),
+        slow_rate: float = float(os.getenv("MODEL_ARMOR_BREAKER_SLOW_RATE", "0.5")),
+        open_seconds: float = float(os.getenv("MODEL_ARMOR_BREAKER_OPEN_SECONDS", "30")),
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.slow_call_ms = slow_call_ms
+        self.slow_rate = slow_rate
+        self.open_seconds = open_seconds
+        self.clock = clock
+        self._outcomes: Deque[Tuple[bool, bool]] = deque(maxlen=window) # (failed, slow)
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._probing = False
+        self._probe_started = 0.0
+        self._times_opened = 0
+        self._rejected = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == self.OPEN and self.clock() - self._opened_at >= self.open_seconds:
+            self._state = self.HALF_OPEN
+            self._probing = False
+        return self._state
+
+    def allow(self) -> bool:
+        """Returns True if a call may go to Model Armor now."""
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return True
+            # One probe at a time decides whether to close; a probe that never reports back expires.
+            if state == self.HALF_OPEN and (not self._probing or self.clock() - self._probe_started >= self.open_seconds):
+                self._probing = True
+                self._probe_started = self.clock()
+                return True
+            self._rejected += 1
+            return False
+
+    def record(self, success: bool, latency_ms: float) -> None:
+        """Records the outcome of a call let through by `allow`."""
+        with self._lock:
+            state = self._current_state()
+            slow = latency_ms >= self.slow_call_ms
+            if state == self.HALF_OPEN:
+                self._probing = False
+                if success and not slow:
+                    self._state = self.CLOSED
+                    self._outcomes.clear()
+                else:
+                    self._open()
+                return
+            self._outcomes.append((not success, slow))
+            if state == self.CLOSED and len(self._outcomes) >= self.min_calls:
+                failed = sum(1 for outcome in self._outcomes if outcome[0]) / len(self._outcomes)
+                slowed = sum(1 for outcome in self._outcomes if outcome[1]) / len(self._outcomes)
+                if failed >= self.error_rate or slowed >= self.slow_rate:
+                    self._open()
+
+    def _open(self) -> None:
+        self._state = self.OPEN
+        self._opened_at = self.clock()
+        self._times_opened += 1
+        self._outcomes.clear()
+
+    def reset(self) -> None:
+        """Closes the breaker and forgets all recorded calls."""
+        with self._lock:
+            self._state = self.CLOSED
+            self._outcomes.clear()
+            self._probing = False
+            self._times_opened = self._rejected = 0
+
+    def stats(self) -> Dict[str, Union[str, int, float]]:
+        """Returns the state, error and slow rates over the window, and open/reject counters."""
+        with self._lock:
+            calls = len(self._outcomes)
+            return {
+                "state": self._current_state(),
+                "calls": calls,
+                "error_rate": sum(1 for o in self._outcomes if o[0]) / calls if calls else 0.0,
+                "slow_rate": sum(1 for o in self._outcomes if o[1]) / calls if calls else 0.0,
+                "times_opened": self._times_opened,
+                "rejected": self._rejected,
+            }
+
+
+async def hedged(
+    attempt: Callable[[], Awaitable[T]],
+    hedge_delay: Optional[float],
+    max_attempts: int = MAX_ATTEMPTS,
+    retryable: Tuple[Type[BaseException], ...] = RETRYABLE_ERRORS,
+    deadline: Optional[float] = None,
+) -> T:
+    """Runs `attempt`, adding attempts when it is slow or fails transiently.
+
+    No attempt is added once `deadline` has passed: it would have no budget left.
+
+    Args:
+        attempt (Callable[[], Awaitable[T]]): Starts one attempt.
+        hedge_delay (Optional[float]): Seconds to wait for an answer before starting
+            another attempt, or None to add attempts only after transient failures.
+        max_attempts (int): The most attempts started in total.
+        retryable (Tuple[Type[BaseException], ...]): Errors after which another attempt is started.
+        deadline (Optional[float]): Event loop time after which no attempt is started.
+
+    Returns:
+        T: The result of the first attempt that succeeds.
+
+    Raises:
+        Exception: The last error, once no attempt is left to succeed.
+    """
+    loop = asyncio.get_running_loop()
+    pending: Set["asyncio.Future[T]"] = {asyncio.ensure_future(attempt())}
+    started = 1
+    last_error: Optional[BaseException] = None
+
+    def can_start() -> bool:
+        return started < max_attempts and (deadline is None or loop.time() < deadline)
+
+    try:
+        while pending:
+            timeout = hedge_delay if can_start() else None
+            done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done: # Slow: hedge with a parallel attempt.
+                if can_start():
+                    pending.add(asyncio.ensure_future(attempt()))
+                    started += 1
+                continue
+            for future in done:
+                error = future.exception()
+                if error is None:
+                    return future.result()
+                last_error = error
+                if isinstance(error, retryable) and can_start():
+                    pending.add(asyncio.ensure_future(attempt()))
+                    started += 1
+        raise last_error
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def metrics_text(
+    breaker: CircuitBreaker,
+    histograms: Dict[str, LatencyHistogram],
+    counters: Optional[Dict[str, float]] = None,
+    prefix: str = "model_armor",
+) -> str:
+    """Renders breaker state, latency histograms and counters in the Prometheus text format."""
+    lines: List[str] = []
+    stats = breaker.stats()
+    lines.append(f"# TYPE {prefix}_circuit_state gauge")
+    for state in (CircuitBreaker.CLOSED, CircuitBreaker.OPEN, CircuitBreaker.HALF_OPEN):
+        lines.append(f'{prefix}_circuit_state{{state="{state}"}} {int(stats["state"] == state)}')
+    for name in ("error_rate", "slow_rate"):
+        lines.append(f"# TYPE {prefix}_circuit_{name} gauge")
+        lines.append(f"{prefix}_circuit_{name} {stats[name]}")
+    for name in ("times_opened", "rejected"):
+        lines.append(f"# TYPE {prefix}_circuit_{name}_total counter")
+        lines.append(f"{prefix}_circuit_{name}_total {stats[name]}")
+    for name, histogram in histograms.items():
+        snapshot = histogram.snapshot()
+        metric = f"{prefix}_{name}_ms"
+        lines.append(f"# TYPE {metric} histogram")
+        for bound, count in snapshot["buckets"].items():
+            le = "+Inf" if bound == float("inf") else f"{bound:g}"
+            lines.append(f'{metric}_bucket{{le="{le}"}} {count}')
+        lines.append(f"{metric}_sum {snapshot['sum_ms']}")
+        lines.append(f"{metric}_count {snapshot['count']}")
+    for name, value in (counters or {}).items():
+        lines.append(f"# TYPE {prefix}_{name} counter")
+        lines.append(f"{prefix}_{name} {value}")
+    return "\n".join(lines) + "\n"
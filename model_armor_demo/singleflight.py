@@ -0,0 +1,76 @@
+"""Coalescing of concurrent identical calls ("singleflight").
+
+When many sessions send the same prompt within a few milliseconds, only the
+first caller for a key starts the call; the others await the same task and
+share its result or exception. Each waiter awaits the task through
+`asyncio.shield`, so a cancelled waiter stops waiting without cancelling the
+shared call that other waiters, and the verdict cache, depend on. The key is
+released as soon as the call finishes, so later callers start a new call (or hit
+the verdict cache).
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple, TypeVar, Union
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time and shares its outcome with every caller."""
+
+    def __init__(self):
+        # Tasks are bound to their event loop, so keys are per loop.
+        self._calls: Dict[Tuple[asyncio.AbstractEventLoop, Hashable], "asyncio.Task[Any]"] = {}
+        self._calls_started = 0
+        self._coalesced = 0
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """Returns the result of `fn()`, or of the identical call already in flight for `key`.
+
+        Args:
+            key (Hashable): Identifies calls whose results are interchangeable.
+            fn (Callable[[], Awaitable[T]]): Starts the call; only invoked if none is in flight.
+
+        Returns:
+            T: The shared result. An exception raised by the shared call is raised to every caller.
+        """
+        loop_key = (asyncio.get_running_loop(), key)
+        task = self._calls.get(loop_key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[loop_key] = task
+            self._calls_started += 1
+            task.add_done_callback(lambda done: self._release(loop_key, done))
+        else:
+            self._coalesced += 1
+        return await asyncio.shield(task)
+
+    def _release(self, loop_key: Tuple[asyncio.AbstractEventLoop, Hashable], task: "asyncio.Task[Any]") -> None:
+        if self._calls.get(loop_key) is task:
+            del self._calls[loop_key]
+        # Mark the outcome as retrieved, in case every waiter was cancelled.
+        if not task.cancelled() and task.exception() is not None:
+            logger.debug(f"Shared call for {loop_key[1]!r} failed: {task.exception()}")
+
+    def stats(self) -> Dict[str, Union[int, float]]:
+        """Returns calls started, callers coalesced onto an in-flight call, and calls in flight."""
+        callers = self._calls_started + self._coalesced
+        return {
+            "calls": self._calls_started,
+            "coalesced": self._coalesced,
+            "coalesced_rate": self._coalesced / callers if callers else 0.0,
+            "in_flight": len(self._calls),
+        }
+
+    def clear_stats(self) -> None:
+        self._calls_started = self._coalesced = 0
+
+
+# Coalesces identical in-flight sanitize_user_prompt calls in model_armor_callback.
+sanitize_flights = SingleFlight()
@@ -0,0 +1,90 @@
+"""Speculative execution of the Model Armor check alongside the model call.
+
+With a `before_model_callback`, the model call starts only after the Model
+Armor round trip, so the two latencies add up. `SpeculativeGemini` starts both
+at once instead:
+
+- the model response is generated (or streamed) into a buffer while the check
+  runs, and nothing is released until the verdict arrives;
+- if the check returns a response (the prompt is blocked, or the check failed
+  under a blocking policy), the model call is cancelled and only that response
+  is returned;
+- otherwise the buffered chunks are released and the rest of the stream is
+  passed through, so time to first token drops by the check's latency for the
+  clean majority of prompts.
+
+The model still receives blocked prompts; only its output is withheld. That is
+why the mode is opt-in (`MODEL_ARMOR_SPECULATIVE`).
+"""
+import asyncio
+import logging
+import time
+from typing import AsyncGenerator, Awaitable, Callable, Optional
+
+from google.adk.models import LlmRequest, LlmResponse
+from google.adk.models.google_llm import Gemini
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+class SpeculativeGemini(Gemini):
+    """A Gemini model that runs a safety check concurrently with each model call.
+
+    Attributes:
+        check (Callable[[LlmRequest], Awaitable[Optional[LlmResponse]]]): Returns a
+            response to send instead of the model's, or None to release the model's output.
+    """
+
+    check: Optional[Callable[[LlmRequest], Awaitable[Optional[LlmResponse]]]] = None
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        if self.check is None:
+            async for llm_response in super().generate_content_async(llm_request, stream):
+                yield llm_response
+            return
+
+        started = time.perf_counter()
+        buffer: "asyncio.Queue[object]" = asyncio.Queue()
+        responses = super().generate_content_async(llm_request, stream)
+
+        async def produce() -> None:
+            try:
+                async for llm_response in responses:
+                    await buffer.put(llm_response)
+            except Exception as e:
+                await buffer.put(e)
+            finally:
+                await responses.aclose()
+                await buffer.put(_DONE)
+
+        producer = asyncio.ensure_future(produce())
+        check = asyncio.ensure_future(self.check(llm_request))
+        try:
+            verdict = await check
+            held = buffer.qsize()
+            logger.info(
+                f"Speculative check finished after {(time.perf_counter() - started) * 1000:.1f} ms "
+                f"with {held} model response(s) held back."
+            )
+            if verdict is not None:
+                producer.cancel()
+                logger.warning("Speculative check blocked the prompt; cancelled the model call.")
+                yield verdict
+                return
+            while True:
+                item = await buffer.get()
+                if item is _DONE:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            for task in (check, producer):
+                if not task.done():
+                    task.cancel()
+            await asyncio.gather(check, producer, return_exceptions=True)
@@ -1,22 +1,129 @@
 """A tool for handling sensitive data."""
+import hashlib
 import logging
-from typing import Dict
+import os
+from typing import Any, Dict, Iterable, Iterator
+
+from prompt_inspection_demo import rules
+from prompt_inspection_demo.streaming import StreamInspector
+from prompt_inspection_demo.verdict_cache import verdict_cache
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
-def handle_sensitive_data(data: str) -> Dict[str, str]:
+# Payloads longer than this many characters are handled in streaming mode.
+STREAMING_THRESHOLD: int = int(os.getenv("SENSITIVE_DATA_STREAMING_THRESHOLD", "65536"))
+CHUNK_SIZE: int = int(os.getenv("SENSITIVE_DATA_CHUNK_SIZE", "65536"))
+PREVIEW_CHARS = 32
+
+
+def iter_chunks(data: str, chunk_size: int = CHUNK_SIZE) -> Iterator[str]:
+    """Yields `data` in slices of at most `chunk_size` characters."""
+    for start in range(0, len(data), chunk_size):
+        yield data[start:start + chunk_size]
+
+
+class _PayloadSummary:
+    """Accumulates the loggable summary of a payload: size, chunk count, digest and preview."""
+
+    def __init__(self):
+        self._digest = hashlib.blake2b(digest_size=16)
+        self._preview = ""
+        self.characters = 0
+        self.chunks = 0
+
+    def update(self, chunk: str) -> None:
+        if len(self._preview) < PREVIEW_CHARS:
+            self._preview += chunk[:PREVIEW_CHARS - len(self._preview)]
+        self._digest.update(chunk.encode("utf-8", "surrogatepass"))
+        self.characters += len(chunk)
+        self.chunks += 1
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "characters": self.characters,
+            "chunks": self.chunks,
+            "digest": self._digest.hexdigest(),
+            "preview": self._preview + ("..." if self.characters > len(self._preview) else ""),
+        }
+
+    def __str__(self) -> str:
+        summary = self.as_dict()
+        return f"{summary['characters']} characters, digest {summary['digest']}, preview {summary['preview']!r}"
+
+
+def handle_sensitive_data_stream(chunks: Iterable[str]) -> Dict[str, Any]:
+    """Handles a payload delivered as a sequence of chunks.
+
+    Each chunk is scanned for sensitive content as it arrives, resuming the matcher
+    state of the previous chunk, so terms split across chunks are still caught.
+    Only a digest and a short preview of the payload are logged or returned, and
+    no more than one chunk is held at a time.
+
+    Args:
+        chunks (Iterable[str]): The payload, in order.
+
+    Returns:
+        dict: The status of the operation and a summary of the payload
+            (characters, chunks, digest, preview). Blocked payloads also report
+            the rule and the (0-based) chunk in which it matched.
+    """
+    inspector = StreamInspector(rules.active_matcher)
+    payload = _PayloadSummary()
+    matched_chunk = None
+    for chunk in chunks:
+        if matched_chunk is None and inspector.feed(chunk) is not None: # No further scanning after a match.
+            matched_chunk = payload.chunks
+        payload.update(chunk)
+
+    summary = payload.as_dict()
+    characters, chunk_count = payload.characters, payload.chunks
+    match = inspector.match
+    if match is not None:
+        logger.warning(
+            f"Sensitive data detected by rule '{match.rule.id}' in chunk {matched_chunk} of a "
+            f"{characters}-character payload (digest {summary['digest']}). Blocking operation."
+        )
+        return {
+            "status": "error",
+            "message": "This data is too sensitive to handle.",
+            "rule": match.rule.id,
+            "chunk": matched_chunk,
+            "summary": summary,
+        }
+    logger.info(f"Data handled successfully in {chunk_count} chunks: {characters} characters (digest {summary['digest']}).")
+    return {
+        "status": "success",
+        "data": f"Successfully handled {characters} characters of data (digest {summary['digest']}).",
+        "summary": summary,
+    }
+
+
+def handle_sensitive_data(data: str) -> Dict[str, Any]:
     """Handles sensitive data.
 
+    The data is checked against the prompt inspection rules. Verdicts come from the
+    shared verdict cache, so data that was already inspected is not scanned again.
+    Data longer than `STREAMING_THRESHOLD` characters is handled in streaming mode
+    instead (see `handle_sensitive_data_stream`): it is scanned chunk by chunk and
+    only a compact summary is returned. Either way, only a summary of the data
+    (size, digest and a short preview) is logged.
+
     Args:
         data (str): The sensitive data to handle.
 
     Returns:
         dict: A dictionary with the status of the operation.
     """
-    logger.info(f"handle_sensitive_data tool called with data: '{data}'")
-    if "sensitive" in data:
-        logger.warning(f"Sensitive data detected: '{data}'. Blocking operation.")
+    if len(data) > STREAMING_THRESHOLD:
+        logger.info(f"handle_sensitive_data tool called with {len(data)} characters; using streaming mode.")
+        return handle_sensitive_data_stream(iter_chunks(data))
+    payload = _PayloadSummary()
+    payload.update(data)
+    logger.info(f"handle_sensitive_data tool called with data ({payload}).")
+    match = verdict_cache.search(rules.active_matcher, data)
+    if match is not None:
+        logger.warning(f"Sensitive data detected by rule '{match.rule.id}' ({payload}). Blocking operation.")
         return {"status": "error", "message": "This data is too sensitive to handle."}
-    logger.info(f"Data handled successfully: '{data}'")
+    logger.info(f"Data handled successfully ({payload}).")
     return {"status": "success", "data": f"Successfully handled data: {data}"}
@@ -0,0 +1,161 @@
+"""A TTL cache of Model Armor verdicts, keyed by template and prompt hash.
+
+Retries, canned UI prompts and agent-loop repeats send identical prompts to
+`sanitize_user_prompt`. A verdict is cached under (template name, hash of the
+normalized prompt) for `MODEL_ARMOR_CACHE_TTL_SECONDS`, so a template change in
+Model Armor takes effect within one TTL.
+
+Only verdicts that are safe to reuse are cached: the invocation must have
+succeeded for every filter (a partial or failed invocation may have missed a
+match) and the result must be a definite match or no match. Prompts are
+normalized only by Unicode NFC and whitespace collapsing, which cannot change
+what Model Armor's filters see; case and punctuation are kept.
+
+Caching is turned off for the templates listed in
+`MODEL_ARMOR_CACHE_DISABLED_TEMPLATES` (template ids, comma separated), or at
+runtime with `disable`.
+"""
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Set, Tuple, Union
+
+from google.cloud import modelarmor_v1
+from prompt_inspection_demo.verdict_cache import content_digest
+
+DEFAULT_TTL_SECONDS: float = float(os.getenv("MODEL_ARMOR_CACHE_TTL_SECONDS", "300"))
+DEFAULT_MAX_ENTRIES: int = int(os.getenv("MODEL_ARMOR_CACHE_MAX_ENTRIES", "10000"))
+DISABLED_TEMPLATES: Set[str] = {
+    template.strip() for template in os.getenv("MODEL_ARMOR_CACHE_DISABLED_TEMPLATES", "").split(",") if template.strip()
+}
+
+_REUSABLE_STATES = (modelarmor_v1.FilterMatchState.NO_MATCH_FOUND, modelarmor_v1.FilterMatchState.MATCH_FOUND)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def prompt_digest(prompt: str) -> bytes:
+    """Returns the digest of `prompt` after NFC normalization and whitespace collapsing."""
+    return content_digest(_WHITESPACE.sub(" ", unicodedata.normalize("NFC", prompt)).strip())
+
+
+def is_reusable(result: Any) -> bool:
+    """Returns True if a SanitizationResult is a complete, definite verdict."""
+    return (
+        getattr(result, "invocation_result", None) == modelarmor_v1.InvocationResult.SUCCESS
+        and getattr(result, "filter_match_state", None) in _REUSABLE_STATES
+    )
+
+
+def _template_id(template_name: str) -> str:
+    return template_name.rsplit("/", 1)[-1]
+
+
+class SanitizeVerdictCache:
+    """A bounded, thread-safe LRU cache of filter match states that expire after a TTL.
+
+    Args:
+        ttl_seconds (float): How long a verdict is reused. 0 disables the cache.
+        max_entries (int): The most verdicts kept; the least recently used go first.
+        disabled_templates (Set[str]): Template ids (or full names) that are never cached.
+        clock (Callable[[], float]): Monotonic time source.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        disabled_templates: Optional[Set[str]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.disabled_templates: Set[str] = set(DISABLED_TEMPLATES if disabled_templates is None else disabled_templates)
+        self.clock = clock
+        # (template name, prompt digest) -> (expiry time, filter match state)
+        self._entries: "OrderedDict[Tuple[str, bytes], Tuple[float, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = self._misses = self._expired = self._evictions = self._uncacheable = 0
+
+    def enabled_for(self, template_name: str) -> bool:
+        """Returns True if verdicts of `template_name` are cached."""
+        return (
+            self.ttl_seconds > 0
+            and template_name not in self.disabled_templates
+            and _template_id(template_name) not in self.disabled_templates
+        )
+
+    def disable(self, template: str) -> None:
+        """Stops caching a template (by id or full name) and drops its cached verdicts."""
+        with self._lock:
+            self.disabled_templates.add(template)
+            for key in [key for key in self._entries if template in (key[0], _template_id(key[0]))]:
+                del self._entries[key]
+
+    def enable(self, template: str) -> None:
+        """Resumes caching a template disabled with `disable`."""
+        with self._lock:
+            self.disabled_templates.discard(template)
+
+    def get(self, template_name: str, digest: bytes) -> Optional[int]:
+        """Returns the cached filter match state for a prompt digest, or None."""
+        if not self.enabled_for(template_name):
+            return None
+        key = (template_name, digest)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= self.clock():
+                del self._entries[key]
+                self._expired += 1
+                entry = None
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[1]
+
+    def put(self, template_name: str, digest: bytes, result: Any) -> bool:
+        """Caches the verdict of a SanitizationResult if it is safe to reuse.
+
+        Returns:
+            bool: True if the verdict was cached.
+        """
+        if not self.enabled_for(template_name):
+            return False
+        with self._lock:
+            if not is_reusable(result):
+                self._uncacheable += 1
+                return False
+            key = (template_name, digest)
+            self._entries[key] = (self.clock() + self.ttl_seconds, int(result.filter_match_state))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+        return True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._hits = self._misses = self._expired = self._evictions = self._uncacheable = 0
+
+    def stats(self) -> Dict[str, Union[int, float]]:
+        """Returns hits, misses, hit_rate, expired, evictions, uncacheable and the number of entries."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+                "expired": self._expired,
+                "evictions": self._evictions,
+                "uncacheable": self._uncacheable,
+                "entries": len(self._entries),
+            }
+
+
+# The cache used by model_armor_callback.
+sanitize_cache = SanitizeVerdictCache()
@@ -1,6 +1,6 @@
 
 import logging
-from typing import Optional
+from typing import Optional, Tuple
 
 from google.adk.agents import Agent
 
@@ -11,41 +11,160 @@ logger = logging.getLogger(__name__)
 from google.adk.agents.callback_context import CallbackContext
 from google.adk.models import LlmRequest, LlmResponse
 from google.genai import types as genai_types
+from prompt_inspection_demo import classifier, pii, rules
+from prompt_inspection_demo.inspection import inspect_prompt
+from prompt_inspection_demo.session_state import SessionInspectionStore
+from prompt_inspection_demo.streaming import StreamInspectionStore
+from prompt_inspection_demo.verdict_cache import verdict_cache
 from model_armor_demo.tools.sensitive_tool import handle_sensitive_data
 
-# Worker Agent
-worker_agent = Agent(
-    name="worker_agent",
-    model="gemini-2.5-flash",
-    instruction="You are a worker agent. You can handle sensitive data.",
-    description="An agent that can handle sensitive data.",
-    tools=[handle_sensitive_data],
-)
+# Remembers what each session's prompts already scanned, so repeated model calls skip it.
+inspection_sessions = SessionInspectionStore(cache=verdict_cache)
+
+
+def _session_id(callback_context: CallbackContext) -> Optional[str]:
+    """Returns the id of the callback's session, or None if it has none."""
+    session = getattr(callback_context, "session", None)
+    session_id = getattr(session, "id", None)
+    return session_id if isinstance(session_id, str) else None
+
 
 # Prompt Inspection Callback (Renamed from model_armor_callback for clarity)
 def prompt_inspection_callback(
     callback_context: CallbackContext, llm_request: LlmRequest
 ) -> Optional[LlmResponse]:
-    """Intercepts and blocks requests containing the keyword 'sensitive'."""
+    """Intercepts and blocks requests matching any of the configured blocking rules.
+
+    The prompt is scanned once with the precompiled multi-pattern matcher, so the
+    cost does not grow with the number of rules. The id of the matched rule is
+    logged and returned in the blocked response's custom_metadata.
+
+    Within a session, prompt text that was already inspected is not scanned again,
+    and text that extends the previous prompt is scanned from where that scan ended.
+    Verdicts are shared with other sessions and with handle_sensitive_data through
+    the process-wide verdict cache. Prompts that pass the rules are also checked by
+    the local PII/secret detector, which blocks the kinds in LOCAL_PII_BLOCK_KINDS
+    and logs other findings redacted. Finally, if a model is configured, the local
+    jailbreak classifier scores the prompt.
+    """
     prompt_text = ""
     if llm_request.contents and llm_request.contents[-1].parts:
         for part in llm_request.contents[-1].parts:
             if part.text:
                 prompt_text += part.text
 
-    if "sensitive" in prompt_text.lower(): # Case-insensitive check
-        logger.warning(f"Prompt inspection blocked request due to 'sensitive' keyword. Prompt: '{prompt_text}'")
-        return LlmResponse(
-            content=genai_types.Content(
-                parts=[
-                    genai_types.Part(
-                        text="Blocked by Prompt Inspection: Request contains sensitive information."
-                    )
-                ]
-            )
+    session_id = _session_id(callback_context)
+    matcher = rules.active_matcher # One ruleset for the whole request, even if a reload lands meanwhile.
+    if session_id is None:
+        search = lambda text: verdict_cache.search(matcher, text) # Case-insensitive check
+    else:
+        search = lambda text: inspection_sessions.inspect(session_id, matcher, text)
+    verdict = inspect_prompt(prompt_text, matcher, search)
+    if verdict is None:
+        logger.info(f"Prompt inspection passed for prompt: '{prompt_text[:50]}...'")
+        return None
+
+    if verdict.score is not None:
+        logger.warning(
+            f"Prompt inspection blocked request scored {verdict.score:.3f} by classifier "
+            f"{classifier.active_classifier.version}. Prompt: '{prompt_text[:50]}...'"
+        )
+    elif verdict.rule_id.startswith("pii:"):
+        finding = pii.Finding(kind=verdict.rule_id[len("pii:"):], start=verdict.start, end=verdict.end)
+        logger.warning(f"Prompt inspection blocked request containing {finding.kind}: '{finding.redacted(prompt_text)}'")
+    else:
+        logger.warning(
+            f"Prompt inspection blocked request due to rule '{verdict.rule_id}' (ruleset revision {matcher.revision}). "
+            f"Prompt: '{prompt_text}'"
         )
-    logger.info(f"Prompt inspection passed for prompt: '{prompt_text[:50]}...'")
-    return None
+    return LlmResponse(
+        content=genai_types.Content(
+            parts=[
+                genai_types.Part(
+                    text="Blocked by Prompt Inspection: Request contains sensitive information."
+                )
+            ]
+        ),
+        custom_metadata={"prompt_inspection_rule": verdict.rule_id},
+    )
+
+# Matcher state of each response currently streaming, keyed by (invocation id, agent name).
+response_streams = StreamInspectionStore()
+
+RESPONSE_BLOCKED_MESSAGE = "Blocked by Response Inspection: Response contains sensitive information."
+
+
+def _stream_key(callback_context: CallbackContext) -> Optional[Tuple[str, str]]:
+    """Returns the key of the response stream a callback belongs to, or None if unknown."""
+    invocation_id = getattr(callback_context, "invocation_id", None)
+    if not isinstance(invocation_id, str):
+        return None
+    return (invocation_id, str(getattr(callback_context, "agent_name", "")))
+
+
+def _end_invocation(callback_context: CallbackContext) -> None:
+    """Stops the agent loop after the current response, so no tool or model call follows it."""
+    invocation_context = getattr(callback_context, "_invocation_context", None)
+    if invocation_context is None and hasattr(callback_context, "get_invocation_context"):
+        invocation_context = callback_context.get_invocation_context()
+    if invocation_context is not None:
+        invocation_context.end_invocation = True
+
+
+# Response Inspection Callback
+def response_inspection_callback(
+    callback_context: CallbackContext, llm_response: LlmResponse
+) -> Optional[LlmResponse]:
+    """Inspects model output, including streamed chunks, and withholds it once a rule matches.
+
+    Each partial chunk is scanned as it arrives, resuming from the matcher state
+    left by the previous chunk, so a term split across two chunks is still caught.
+    When a rule fires, the chunk is replaced by a blocked message, every later chunk
+    of the stream is replaced by an empty one, and the invocation is ended. The final
+    aggregated response of a stream is not rescanned.
+    """
+    response_text = ""
+    if llm_response.content and llm_response.content.parts:
+        for part in llm_response.content.parts:
+            if part.text:
+                response_text += part.text
+
+    key = _stream_key(callback_context)
+    newly_blocked = True
+    if key is not None and llm_response.partial:
+        inspector = response_streams.get(key, rules.active_matcher)
+        newly_blocked = inspector.match is None
+        match = inspector.feed(response_text)
+    else:
+        inspector = response_streams.finish(key) if key is not None else None
+        if inspector is not None:
+            newly_blocked = False
+            match = inspector.match # Already scanned chunk by chunk.
+        else:
+            match = rules.active_matcher.search(response_text) if response_text else None
+
+    if match is None:
+        return None
+    if newly_blocked:
+        logger.warning(f"Response inspection blocked model output due to rule '{match.rule.id}'.")
+        _end_invocation(callback_context)
+    parts = [genai_types.Part(text=RESPONSE_BLOCKED_MESSAGE)] if newly_blocked or not llm_response.partial else []
+    return LlmResponse(
+        content=genai_types.Content(role="model", parts=parts),
+        partial=llm_response.partial,
+        turn_complete=llm_response.turn_complete if llm_response.partial else True,
+        custom_metadata={"response_inspection_rule": match.rule.id},
+    )
+
+# Worker Agent
+worker_agent = Agent(
+    name="worker_agent",
+    model="gemini-2.5-flash",
+    instruction="You are a worker agent. You can handle sensitive data.",
+    description="An agent that can handle sensitive data.",
+    tools=[handle_sensitive_data],
+    after_model_callback=response_inspection_callback,
+)
 
 # Supervisor Agent
 supervisor_agent = Agent(
@@ -55,6 +174,7 @@ supervisor_agent = Agent(
     description="An agent that delegates tasks.",
     sub_agents=[worker_agent],
     before_model_callback=prompt_inspection_callback, # Updated callback name
+    after_model_callback=response_inspection_callback,
 )
 
 root_agent: Agent = supervisor_agent
@@ -0,0 +1,197 @@
+"""Offline batch inspection of prompt corpora.
+
+Streams a JSON Lines corpus, inspects every prompt with the same decision as
+`prompt_inspection_callback` (rules, local PII detector, jailbreak classifier;
+see `prompt_inspection_demo.inspection`), and writes one verdict per prompt plus aggregate
+statistics. Each corpus line is either a JSON string or an object holding the
+prompt under `--field` (default 'prompt') and, optionally, an 'id'.
+
+The corpus is read in chunks that are sharded across a process pool. At most
+`workers * 2` chunks are in flight and verdicts are written in input order as
+soon as their chunk finishes, so memory use depends on the chunk size, not on
+the corpus size.
+
+Usage:
+    python -m prompt_inspection_demo.batch corpus.jsonl -o verdicts.jsonl [--workers 8] [--rules rules.txt]
+"""
+import argparse
+import collections
+import concurrent.futures
+import itertools
+import json
+import logging
+import os
+import sys
+import time
+from typing import IO, Any, Counter, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from prompt_inspection_demo import rules
+from prompt_inspection_demo.inspection import inspect_prompt
+from prompt_inspection_demo.matcher import Matcher
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 1000
+
+# The matcher of the current worker process, set by _init_worker.
+_worker_matcher: Optional[Matcher] = None
+
+Chunk = List[Tuple[int, str]]
+
+
+def _load_matcher(rules_file: Optional[str]) -> None:
+    global _worker_matcher
+    _worker_matcher = rules.build_matcher(rules_file) if rules_file else rules.active_matcher
+
+
+def _init_worker(rules_file: Optional[str]) -> None:
+    logging.disable(logging.INFO)
+    _load_matcher(rules_file)
+
+
+def inspect_record(matcher: Matcher, line_number: int, line: str, field: str) -> Dict[str, Any]:
+    """Inspects one corpus line and returns its verdict record.
+
+    Args:
+        matcher (Matcher): The rule matcher used by the rules tier.
+        line_number (int): The 1-based line number in the corpus.
+        line (str): The raw JSON line.
+        field (str): The key holding the prompt in object lines.
+
+    Returns:
+        dict: {"line", "id", "blocked", "rule", "start", "end"}, or {"line", "error"}
+            if the line is not a valid corpus record. "rule" is the rule id, 'pii:<kind>'
+            or 'classifier:jailbreak'; classifier verdicts have no start and end.
+    """
+    try:
+        record = json.loads(line)
+    except ValueError as e:
+        return {"line": line_number, "error": f"Invalid JSON: {e}"}
+    if isinstance(record, str):
+        prompt, record_id = record, None
+    elif isinstance(record, dict) and isinstance(record.get(field), str):
+        prompt, record_id = record[field], record.get("id")
+    else:
+        return {"line": line_number, "error": f"Expected a string or an object with a string '{field}'."}
+
+    verdict = inspect_prompt(prompt, matcher)
+    return {
+        "line": line_number,
+        "id": record_id,
+        "blocked": verdict is not None,
+        "rule": verdict.rule_id if verdict else None,
+        "start": verdict.start if verdict else None,
+        "end": verdict.end if verdict else None,
+    }
+
+
+def _inspect_chunk(chunk: Chunk, field: str) -> List[Dict[str, Any]]:
+    return [inspect_record(_worker_matcher, line_number, line, field) for line_number, line in chunk]
+
+
+def _read_chunks(lines: Iterable[str], chunk_size: int) -> Iterator[Chunk]:
+    numbered = ((number, line) for number, line in enumerate(lines, start=1) if line.strip())
+    while True:
+        chunk = list(itertools.islice(numbered, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def inspect_corpus(
+    lines: Iterable[str],
+    output: IO[str],
+    workers: int = os.cpu_count() or 1,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    field: str = "prompt",
+    rules_file: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Inspects a stream of corpus lines and writes one verdict per line to `output`.
+
+    Args:
+        lines (Iterable[str]): The corpus lines. Blank lines are skipped.
+        output (IO[str]): Receives one JSON verdict per line, in input order.
+        workers (int): Worker processes. 0 inspects in the calling process.
+        chunk_size (int): Lines per task sent to a worker.
+        field (str): The key holding the prompt in object lines.
+        rules_file (Optional[str]): Rules to use instead of the active rules.
+
+    Returns:
+        dict: Aggregate statistics: prompts, blocked, clean, errors, per-rule counts,
+            elapsed seconds and prompts per second.
+    """
+    start = time.perf_counter()
+    totals: Counter[str] = collections.Counter()
+    by_rule: Counter[str] = collections.Counter()
+
+    def write(results: List[Dict[str, Any]]) -> None:
+        for result in results:
+            output.write(json.dumps(result) + "\n")
+            if "error" in result:
+                totals["errors"] += 1
+                continue
+            totals["prompts"] += 1
+            if result["blocked"]:
+                totals["blocked"] += 1
+                by_rule[result["rule"]] += 1
+
+    chunks = _read_chunks(lines, chunk_size)
+    if workers <= 0:
+        _load_matcher(rules_file)
+        for chunk in chunks:
+            write(_inspect_chunk(chunk, field))
+    else:
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=(rules_file,)
+        ) as pool:
+            in_flight: "collections.deque[concurrent.futures.Future]" = collections.deque()
+            for chunk in chunks:
+                if len(in_flight) >= workers * 2:
+                    write(in_flight.popleft().result())
+                in_flight.append(pool.submit(_inspect_chunk, chunk, field))
+            while in_flight:
+                write(in_flight.popleft().result())
+
+    elapsed = time.perf_counter() - start
+    return {
+        "prompts": totals["prompts"],
+        "blocked": totals["blocked"],
+        "clean": totals["prompts"] - totals["blocked"],
+        "errors": totals["errors"],
+        "by_rule": dict(by_rule.most_common()),
+        "elapsed_s": round(elapsed, 3),
+        "prompts_per_s": round(totals["prompts"] / elapsed, 1) if elapsed else 0.0,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Inspect a JSON Lines prompt corpus against the prompt inspection rules.")
+    parser.add_argument("corpus", help="JSON Lines corpus, or '-' for stdin.")
+    parser.add_argument("-o", "--output", default="-", help="Where to write per-prompt verdicts (default stdout).")
+    parser.add_argument("--stats", help="Also write the aggregate statistics to this JSON file.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes (0 = inline).")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--field", default="prompt", help="Key holding the prompt in object lines.")
+    parser.add_argument("--rules", help="Rules file (default: PROMPT_INSPECTION_RULES_FILE or the built-in rules).")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    corpus = sys.stdin if args.corpus == "-" else open(args.corpus, 'r', encoding='utf-8')
+    output = sys.stdout if args.output == "-" else open(args.output, 'w', encoding='utf-8')
+    try:
+        stats = inspect_corpus(corpus, output, args.workers, args.chunk_size, args.field, args.rules)
+    finally:
+        if corpus is not sys.stdin:
+            corpus.close()
+        if output is not sys.stdout:
+            output.close()
+
+    if args.stats:
+        with open(args.stats, 'w') as f:
+            json.dump(stats, f, indent=2)
+    print(json.dumps(stats, indent=2), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,425 @@
+"""Local jailbreak/prompt-injection classifier.
+
+Keyword rules miss paraphrased jailbreaks ("disregard what you were told
+before"). This classifier scores prompts with a logistic regression over hashed
+character n-grams, in NumPy on a single core:
+
+- Prompts are normalized with `prompt_inspection_demo.normalize` first, so
+  homoglyph, leetspeak and spacing tricks yield the same features as the plain text.
+- Every byte n-gram of the normalized UTF-8 text (3 to 5 bytes by default) is
+  hashed into one of `2 ** hash_bits` buckets with a vectorized rolling hash;
+  there is no vocabulary to store or look up.
+- The weights of the hashed n-grams are summed and scaled by one over the
+  square root of the number of n-grams, then passed through a sigmoid.
+
+Prompts longer than `max_characters` (4096 by default, recorded in the model
+metadata) are scored in windows of that many characters, each overlapping the
+next by a quarter, and the prompt gets the highest window score. Instructions hidden
+in the middle of a pasted document or behind filler are still seen, the cost of
+each window is bounded, and the cost of a prompt grows linearly with its length.
+
+A batch of prompts is featurized and scored with a handful of array operations,
+so scoring one prompt takes tens of microseconds and a batch costs little more
+per prompt. Models are trained with the `train` command and saved as a
+versioned `.npz` file:
+
+    python -m prompt_inspection_demo.classifier train labelled.jsonl -o jailbreak.npz
+    python -m prompt_inspection_demo.classifier score jailbreak.npz prompts.jsonl
+
+Training corpora are JSON Lines objects holding the prompt under 'prompt' and a
+0/1 (or true/false) 'label', where 1 marks a jailbreak or injection attempt.
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+from typing import IO, Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from prompt_inspection_demo.normalize import NORMALIZATION_VERSION, normalize
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Bump when the feature extraction or the file layout changes; older files are rejected.
+MODEL_FORMAT_VERSION = 3
+DEFAULT_HASH_BITS = 18
+DEFAULT_NGRAM_RANGE = (3, 5)
+# Longer prompts are scored in windows of this many characters, overlapping by a quarter.
+DEFAULT_MAX_CHARACTERS = 4096
+# Characters featurized at once by predict_proba; larger batches spill out of the CPU cache.
+BATCH_CHARACTERS = 16384
+
+_MULTIPLIER = np.uint64(0x100000001B3) # FNV-1a prime, used as the rolling hash base.
+_MIX = np.uint64(0x9E3779B97F4A7C15)    # Fibonacci hashing constant, spreads the high bits.
+
+
+def _ngram_hashes(data: np.ndarray, ngram_range: Tuple[int, int], hash_bits: int) -> Iterator[Tuple[int, np.ndarray]]:
+    """Yields (n, buckets) for each n in `ngram_range`; buckets[i] hashes data[i:i + n]."""
+    shift = np.uint64(64 - hash_bits)
+    rolling = np.zeros(len(data), dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        for n in range(1, ngram_range[1] + 1):
+            if n > len(data):
+                return
+            # Extending each hash by one byte drops the last start position.
+            rolling = rolling[:len(data) - n + 1] * _MULTIPLIER + data[n - 1:]
+            if n >= ngram_range[0]:
+                yield n, ((rolling + np.uint64(n)) * _MIX) >> shift
+
+
+class PromptClassifier:
+    """A hashed n-gram logistic regression model.
+
+    Args:
+        weights (np.ndarray): One float32 weight per hash bucket; its length must be a power of two.
+        bias (float): The intercept.
+        threshold (float): Probability at or above which a prompt is flagged.
+        ngram_range (Tuple[int, int]): Smallest and largest byte n-gram lengths.
+        metadata (Optional[Dict[str, Any]]): Training details saved with the model.
+        max_characters (int): Window size, in characters, for scoring long prompts.
+            Recorded in the metadata.
+    """
+
+    def __init__(
+        self,
+        weights: np.ndarray,
+        bias: float = 0.0,
+        threshold: float = 0.5,
+        ngram_range: Tuple[int, int] = DEFAULT_NGRAM_RANGE,
+        metadata: Optional[Dict[str, Any]] = None,
+        max_characters: int = DEFAULT_MAX_CHARACTERS,
+    ):
+        if len(weights) & (len(weights) - 1):
+            raise ValueError(f"The number of weights must be a power of two, got {len(weights)}.")
+        self.weights = np.ascontiguousarray(weights, dtype=np.float32)
+        self.bias = float(bias)
+        self.threshold = float(threshold)
+        self.ngram_range = (int(ngram_range[0]), int(ngram_range[1]))
+        self.hash_bits = len(weights).bit_length() - 1
+        self.max_characters = int(max_characters)
+        self.metadata: Dict[str, Any] = {**(metadata or {}), "max_characters": self.max_characters}
+        # Identifies the model in logs and verdict metadata.
+        self.version: str = hashlib.blake2b(
+            self.weights.tobytes() + json.dumps([self.bias, self.ngram_range, self.max_characters]).encode(),
+            digest_size=8,
+        ).hexdigest()
+
+    def windows(self, text: str) -> List[str]:
+        """Splits `text` into the windows that are scored.
+
+        A text of at most `max_characters` is a single window. Longer texts are cut
+        into `max_characters` windows starting every `3 / 4 * max_characters`
+        characters, the last one ending at the end of the text, so any span of up to
+        a quarter window lies wholly inside one of them.
+        """
+        size = self.max_characters
+        if len(text) <= size:
+            return [text]
+        stride = max(size - size // 4, 1)
+        starts = list(range(0, len(text) - size, stride)) + [len(text) - size]
+        return [text[start:start + size] for start in starts]
+
+    def features(self, texts: Sequence[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Returns the sparse feature matrix of `texts` as (rows, buckets, values).
+
+        The texts are hashed as one buffer, dropping the n-grams that span two texts.
+        Each text is featurized whole; `predict_proba` splits long prompts into
+        `windows` first. There is one entry per n-gram occurrence; repeated buckets add up. Values are
+        1 / sqrt(n-grams in the row), which keeps long prompts from dominating without
+        the sort that deduplicating buckets would need.
+        """
+        encoded = [normalize(text).encode("utf-8", "surrogatepass") for text in texts]
+        lengths = np.fromiter((len(item) for item in encoded), dtype=np.int64, count=len(encoded))
+        data = np.frombuffer(b"".join(encoded), dtype=np.uint8).astype(np.uint64)
+        rows, buckets = [], []
+        if len(encoded) == 1: # Nothing to drop; skips the masking for the common single-prompt case.
+            for _, hashed in _ngram_hashes(data, self.ngram_range, self.hash_bits):
+                rows.append(np.zeros(len(hashed), dtype=np.int64))
+                buckets.append(hashed.astype(np.int64))
+        else:
+            row_of = np.repeat(np.arange(len(encoded)), lengths)
+            end_of = np.repeat(np.cumsum(lengths), lengths)
+            positions = np.arange(len(data))
+            for n, hashed in _ngram_hashes(data, self.ngram_range, self.hash_bits):
+                within = positions[:len(hashed)] + n <= end_of[:len(hashed)]
+                rows.append(row_of[:len(hashed)][within])
+                buckets.append(hashed[within].astype(np.int64))
+        if not rows:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty, np.empty(0, dtype=np.float32)
+        rows_array = np.concatenate(rows)
+        counts = np.bincount(rows_array, minlength=len(texts))
+        scale = np.zeros(len(texts), dtype=np.float32)
+        np.divide(1.0, np.sqrt(counts), out=scale, where=counts > 0)
+        return rows_array, np.concatenate(buckets), scale[rows_array]
+
+    def predict_proba(self, texts: Sequence[str]) -> np.ndarray:
+        """Returns the probability that each prompt is a jailbreak or injection attempt.
+
+        Args:
+            texts (Sequence[str]): The prompts. Their windows are scored together, in
+                sub-batches of about `BATCH_CHARACTERS` characters that stay in cache.
+
+        Returns:
+            np.ndarray: One probability per prompt: that of its highest-scoring window.
+        """
+        if not texts:
+            return np.empty(0)
+        windows: List[str] = []
+        first_window = np.empty(len(texts), dtype=np.int64)
+        for i, text in enumerate(texts):
+            first_window[i] = len(windows)
+            windows.extend(self.windows(text))
+        logits = np.empty(len(windows))
+        start = 0
+        while start < len(windows):
+            stop, size = start + 1, len(windows[start])
+            while stop < len(windows) and size + len(windows[stop]) <= BATCH_CHARACTERS:
+                size += len(windows[stop])
+                stop += 1
+            row_ids, bucket_ids, values = self.features(windows[start:stop])
+            logits[start:stop] = np.bincount(row_ids, self.weights[bucket_ids] * values, minlength=stop - start)
+            start = stop
+        # Every prompt has at least one window, so the reduce segments are never empty.
+        logits = np.maximum.reduceat(logits, first_window)
+        return 1.0 / (1.0 + np.exp(-(logits + self.bias)))
+
+    def predict(self, texts: Sequence[str]) -> np.ndarray:
+        """Returns True for each prompt whose probability reaches the threshold."""
+        return self.predict_proba(texts) >= self.threshold
+
+    def score(self, text: str) -> float:
+        """Returns the probability that a single prompt is a jailbreak or injection attempt."""
+        return float(self.predict_proba([text])[0])
+
+    def save(self, path: str) -> None:
+        """Writes the model to a versioned `.npz` file."""
+        np.savez_compressed(
+            path,
+            format_version=np.array(MODEL_FORMAT_VERSION),
+            normalization_version=np.array(NORMALIZATION_VERSION),
+            weights=self.weights,
+            bias=np.array(self.bias),
+            threshold=np.array(self.threshold),
+            ngram_range=np.array(self.ngram_range),
+            metadata=np.array(json.dumps(self.metadata)),
+        )
+
+
+def load_classifier(path: str) -> PromptClassifier:
+    """Loads a model written by `PromptClassifier.save`.
+
+    Args:
+        path (str): The model file.
+
+    Returns:
+        PromptClassifier: The model.
+
+    Raises:
+        ValueError: If the file was written for a different feature extraction.
+    """
+    with np.load(path, allow_pickle=False) as model:
+        format_version = int(model["format_version"])
+        if format_version != MODEL_FORMAT_VERSION:
+            raise ValueError(f"Model '{path}' has format version {format_version}, expected {MODEL_FORMAT_VERSION}.")
+        normalization_version = int(model["normalization_version"])
+        if normalization_version != NORMALIZATION_VERSION:
+            raise ValueError(
+                f"Model '{path}' was trained with normalization version {normalization_version}, "
+                f"expected {NORMALIZATION_VERSION}. Retrain it."
+            )
+        metadata = json.loads(str(model["metadata"]))
+        classifier = PromptClassifier(
+            weights=model["weights"],
+            bias=float(model["bias"]),
+            threshold=float(model["threshold"]),
+            ngram_range=tuple(model["ngram_range"].tolist()),
+            metadata=metadata,
+            max_characters=int(metadata["max_characters"]),
+        )
+    logger.info(f"Loaded prompt classifier {classifier.version} from '{path}' (threshold {classifier.threshold}).")
+    return classifier
+
+
+def train(
+    texts: Sequence[str],
+    labels: Sequence[int],
+    hash_bits: int = DEFAULT_HASH_BITS,
+    ngram_range: Tuple[int, int] = DEFAULT_NGRAM_RANGE,
+    epochs: int = 200,
+    learning_rate: float = 2.0,
+    l2: float = 1e-5,
+    threshold: float = 0.5,
+    max_characters: int = DEFAULT_MAX_CHARACTERS,
+) -> PromptClassifier:
+    """Fits a classifier with full-batch gradient descent on the log loss.
+
+    Args:
+        texts (Sequence[str]): The training prompts.
+        labels (Sequence[int]): 1 for jailbreak/injection attempts, 0 for benign prompts.
+        hash_bits (int): log2 of the number of hash buckets.
+        ngram_range (Tuple[int, int]): Smallest and largest byte n-gram lengths.
+        epochs (int): Gradient descent steps.
+        learning_rate (float): Step size.
+        l2 (float): L2 regularization strength.
+        threshold (float): Decision threshold stored with the model.
+        max_characters (int): Scoring window size. Longer training prompts are
+            truncated to their first window, since a label covers the whole prompt.
+
+    Returns:
+        PromptClassifier: The trained model.
+    """
+    if len(texts) != len(labels) or not texts:
+        raise ValueError("Training needs the same, non-zero number of texts and labels.")
+    y = np.asarray(labels, dtype=np.float64)
+    classifier = PromptClassifier(
+        np.zeros(1 << hash_bits, dtype=np.float32), ngram_range=ngram_range, max_characters=max_characters
+    )
+    row_ids, bucket_ids, values = classifier.features([text[:max_characters] for text in texts])
+    # Training only touches the buckets that occur in the corpus.
+    used, bucket_ids = np.unique(bucket_ids, return_inverse=True)
+    weights = np.zeros(len(used))
+    bias = 0.0
+    for _ in range(epochs):
+        logits = np.bincount(row_ids, weights[bucket_ids] * values, minlength=len(texts)) + bias
+        error = 1.0 / (1.0 + np.exp(-logits)) - y
+        gradient = np.bincount(bucket_ids, error[row_ids] * values, minlength=len(used)) / len(texts)
+        weights -= learning_rate * (gradient + l2 * weights)
+        bias -= learning_rate * float(error.mean())
+    classifier.weights[used] = weights
+    return PromptClassifier(
+        classifier.weights,
+        bias=bias,
+        threshold=threshold,
+        ngram_range=ngram_range,
+        max_characters=max_characters,
+        metadata={
+            "examples": len(texts),
+            "positives": int(y.sum()),
+            "epochs": epochs,
+            "learning_rate": learning_rate,
+            "l2": l2,
+            "trained_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        },
+    )
+
+
+def evaluate(classifier: PromptClassifier, texts: Sequence[str], labels: Sequence[int]) -> Dict[str, float]:
+    """Returns accuracy, precision and recall of `classifier` on a labelled set."""
+    predicted = classifier.predict(texts)
+    actual = np.asarray(labels, dtype=bool)
+    true_positives = int((predicted & actual).sum())
+    return {
+        "examples": len(texts),
+        "accuracy": round(float((predicted == actual).mean()), 4) if len(texts) else 0.0,
+        "precision": round(true_positives / int(predicted.sum()), 4) if predicted.any() else 0.0,
+        "recall": round(true_positives / int(actual.sum()), 4) if actual.any() else 0.0,
+    }
+
+
+def read_labelled(lines: Iterable[str], field: str = "prompt") -> Tuple[List[str], List[int]]:
+    """Reads a JSON Lines corpus of {field: prompt, "label": 0/1} objects."""
+    texts, labels = [], []
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        if not isinstance(record, dict) or not isinstance(record.get(field), str) or "label" not in record:
+            raise ValueError(f"Line {line_number}: expected an object with a string '{field}' and a 'label'.")
+        texts.append(record[field])
+        labels.append(int(bool(record["label"])))
+    return texts, labels
+
+
+def _score_corpus(classifier: PromptClassifier, lines: Iterable[str], output: IO[str], field: str, batch_size: int) -> None:
+    batch: List[Tuple[Any, str]] = []
+
+    def flush() -> None:
+        for (record_id, _), probability in zip(batch, classifier.predict_proba([text for _, text in batch])):
+            output.write(json.dumps({
+                "id": record_id,
+                "score": round(float(probability), 6),
+                "flagged": bool(probability >= classifier.threshold),
+            }) + "\n")
+        batch.clear()
+
+    for line in lines:
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        if isinstance(record, str):
+            batch.append((None, record))
+        else:
+            batch.append((record.get("id"), record[field]))
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+
+
+# The model used by prompt_inspection_callback; the classifier tier is off unless a model is configured.
+MODEL_FILE = os.getenv("PROMPT_CLASSIFIER_MODEL")
+active_classifier: Optional[PromptClassifier] = load_classifier(MODEL_FILE) if MODEL_FILE else None
+if active_classifier is not None and os.getenv("PROMPT_CLASSIFIER_THRESHOLD"):
+    active_classifier.threshold = float(os.getenv("PROMPT_CLASSIFIER_THRESHOLD"))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Train or apply the local jailbreak/prompt-injection classifier.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    train_parser = commands.add_parser("train", help="Train a model on a labelled JSON Lines corpus.")
+    train_parser.add_argument("corpus", help="JSON Lines objects with a prompt and a 0/1 'label'.")
+    train_parser.add_argument("-o", "--output", required=True, help="Where to write the model (.npz).")
+    train_parser.add_argument("--validation", help="Labelled corpus to report accuracy, precision and recall on.")
+    train_parser.add_argument("--field", default="prompt", help="Key holding the prompt.")
+    train_parser.add_argument("--hash-bits", type=int, default=DEFAULT_HASH_BITS)
+    train_parser.add_argument("--ngram-range", type=int, nargs=2, default=list(DEFAULT_NGRAM_RANGE))
+    train_parser.add_argument("--epochs", type=int, default=200)
+    train_parser.add_argument("--learning-rate", type=float, default=2.0)
+    train_parser.add_argument("--l2", type=float, default=1e-5)
+    train_parser.add_argument("--threshold", type=float, default=0.5)
+    train_parser.add_argument("--max-characters", type=int, default=DEFAULT_MAX_CHARACTERS,
+                              help="Window size, in characters, for scoring long prompts.")
+
+    score_parser = commands.add_parser("score", help="Score a JSON Lines corpus with a trained model.")
+    score_parser.add_argument("model", help="Model file written by 'train'.")
+    score_parser.add_argument("corpus", help="JSON Lines corpus, or '-' for stdin.")
+    score_parser.add_argument("-o", "--output", default="-", help="Where to write per-prompt scores (default stdout).")
+    score_parser.add_argument("--field", default="prompt", help="Key holding the prompt in object lines.")
+    score_parser.add_argument("--batch-size", type=int, default=256)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    if args.command == "train":
+        with open(args.corpus, 'r', encoding='utf-8') as f:
+            texts, labels = read_labelled(f, args.field)
+        classifier = train(
+            texts, labels, hash_bits=args.hash_bits, ngram_range=tuple(args.ngram_range), epochs=args.epochs,
+            learning_rate=args.learning_rate, l2=args.l2, threshold=args.threshold, max_characters=args.max_characters,
+        )
+        classifier.metadata["training"] = evaluate(classifier, texts, labels)
+        if args.validation:
+            with open(args.validation, 'r', encoding='utf-8') as f:
+                classifier.metadata["validation"] = evaluate(classifier, *read_labelled(f, args.field))
+        classifier.save(args.output)
+        print(json.dumps({"model": args.output, "version": classifier.version, **classifier.metadata}, indent=2))
+    else:
+        classifier = load_classifier(args.model)
+        corpus = sys.stdin if args.corpus == "-" else open(args.corpus, 'r', encoding='utf-8')
+        output = sys.stdout if args.output == "-" else open(args.output, 'w', encoding='utf-8')
+        try:
+            _score_corpus(classifier, corpus, output, args.field, args.batch_size)
+        finally:
+            if corpus is not sys.stdin:
+                corpus.close()
+            if output is not sys.stdout:
+                output.close()
+
+
+if __name__ == "__main__":
+    main()
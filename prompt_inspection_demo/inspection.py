@@ -0,0 +1,64 @@
+"""The prompt inspection decision, shared by the callback and batch mode.
+
+A prompt is checked by the keyword rules, then by the local PII/secret detector,
+then by the jailbreak classifier if a model is configured. The first tier that
+flags the prompt decides the verdict. `prompt_inspection_callback` and the
+offline batch CLI both call `inspect_prompt`, so offline results match
+production.
+"""
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from prompt_inspection_demo import classifier, pii, rules
+from prompt_inspection_demo.matcher import Match, Matcher
+
+
+@dataclass(frozen=True)
+class Verdict:
+    """Why a prompt was blocked.
+
+    Attributes:
+        rule_id (str): The rule id, 'pii:<kind>' or 'classifier:jailbreak'.
+        start (Optional[int]): Start offset of the match, if the tier reports one.
+        end (Optional[int]): End offset of the match, if the tier reports one.
+        score (Optional[float]): The classifier score, for classifier verdicts.
+    """
+    rule_id: str
+    start: Optional[int] = None
+    end: Optional[int] = None
+    score: Optional[float] = None
+
+
+def inspect_prompt(
+    text: str,
+    matcher: Optional[Matcher] = None,
+    search: Optional[Callable[[str], Optional[Match]]] = None,
+) -> Optional[Verdict]:
+    """Runs every local inspection tier on a prompt.
+
+    Args:
+        text (str): The prompt.
+        matcher (Optional[Matcher]): The rule matcher (default: the active rules).
+        search (Optional[Callable[[str], Optional[Match]]]): Finds the rule match in
+            `text`, e.g. through a session's inspection state (default: `matcher.search`).
+
+    Returns:
+        Optional[Verdict]: The verdict of the first tier that flags the prompt, or None.
+    """
+    if not text:
+        return None
+    if matcher is None:
+        matcher = rules.active_matcher
+    match = search(text) if search is not None else matcher.search(text)
+    if match is not None:
+        return Verdict(rule_id=match.rule.id, start=match.start, end=match.end)
+    if pii.ENABLED:
+        finding = pii.detect_blocking(text)
+        if finding is not None:
+            return Verdict(rule_id=f"pii:{finding.kind}", start=finding.start, end=finding.end)
+    model = classifier.active_classifier
+    if model is not None:
+        score = model.score(text)
+        if score >= model.threshold:
+            return Verdict(rule_id="classifier:jailbreak", score=score)
+    return None
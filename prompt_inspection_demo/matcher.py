@@ -0,0 +1,156 @@
+"""Multi-pattern matching of prompts against a set of blocking rules.
+
+The rules are compiled once into an Aho-Corasick automaton: a trie of the
+normalized (by default, lowercased) patterns with failure links, so a text is
+normalized the same way and scanned one character at a time with no
+backtracking. Scan cost is linear in the length of the text, no matter how many
+rules are loaded.
+
+The automaton state is a plain int, so a scan can stop after any piece of text
+and resume later from the returned state. Patterns split across pieces (e.g.
+streamed chunks) are still found.
+"""
+import hashlib
+import json
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# The automaton state before any text has been scanned.
+ROOT = 0
+
+
+@dataclass(frozen=True)
+class Rule:
+    """A blocking rule: a term or phrase matched case-insensitively anywhere in the text."""
+    id: str
+    pattern: str
+
+
+@dataclass(frozen=True)
+class Match:
+    """A rule match. Offsets index the normalized text, counted from the start of the scan."""
+    rule: Rule
+    start: int
+    end: int
+
+
+class Matcher:
+    """An Aho-Corasick automaton compiled from a list of rules.
+
+    Args:
+        rules (Iterable[Rule]): The rules to match.
+        normalize (Callable[[str], str]): Applied to patterns and scanned text alike.
+            It must map each character independently, so scans can resume mid-text.
+        normalization (str): Identifies `normalize` in the ruleset version.
+        revision (int): The ruleset's position in the sequence of loaded rulesets,
+            assigned by `prompt_inspection_demo.rules` on each reload.
+    """
+
+    def __init__(
+        self,
+        rules: Iterable[Rule],
+        normalize: Callable[[str], str] = str.lower,
+        normalization: str = "lower",
+        revision: int = 0,
+    ):
+        self.rules: Tuple[Rule, ...] = tuple(rules)
+        self.revision = revision
+        self.normalize = normalize
+        # Identifies the ruleset, so cached verdicts are never reused across different rules.
+        self.version: str = hashlib.blake2b(
+            json.dumps([normalization, [[rule.id, rule.pattern] for rule in self.rules]]).encode(), digest_size=8
+        ).hexdigest()
+        goto: List[Dict[str, int]] = [{}]
+        # (rule, pattern length) for the rules recognized on reaching each state; the longest comes first.
+        output: List[Tuple[Tuple[Rule, int], ...]] = [()]
+        for rule in self.rules:
+            pattern = normalize(rule.pattern)
+            if not pattern:
+                raise ValueError(f"Rule '{rule.id}' has an empty pattern after normalization.")
+            state = ROOT
+            for char in pattern:
+                next_state = goto[state].get(char)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto[state][char] = next_state
+                    goto.append({})
+                    output.append(())
+                state = next_state
+            if not output[state]:  # The first rule for a duplicate pattern wins.
+                output[state] = ((rule, len(pattern)),)
+
+        fail = [ROOT] * len(goto)
+        queue = deque(goto[ROOT].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in goto[state].items():
+                queue.append(next_state)
+                fallback = fail[state]
+                while fallback != ROOT and char not in goto[fallback]:
+                    fallback = fail[fallback]
+                fail[next_state] = goto[fallback].get(char, ROOT)
+                output[next_state] = output[next_state] + output[fail[next_state]]
+
+        self._goto = goto
+        self._fail = fail
+        self._output = output
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    @property
+    def states(self) -> int:
+        """The number of automaton states."""
+        return len(self._goto)
+
+    def scan(self, text: str, state: int = ROOT, offset: int = 0) -> Tuple[int, Optional[Match]]:
+        """Scans `text` from `state` and stops at the first match.
+
+        Args:
+            text (str): The text to scan.
+            state (int): The state returned by the previous scan, or ROOT.
+            offset (int): The position of `text` within the whole scanned stream,
+                added to the reported match offsets.
+
+        Returns:
+            tuple: The automaton state after the scan and the first match, if any.
+                After a match the state is the one reached at the end of the match.
+        """
+        goto, fail, output = self._goto, self._fail, self._output
+        for index, char in enumerate(self.normalize(text)):
+            while True:
+                next_state = goto[state].get(char)
+                if next_state is not None:
+                    state = next_state
+                    break
+                if state == ROOT:
+                    break
+                state = fail[state]
+            if output[state]:
+                rule, length = output[state][0]
+                end = offset + index + 1
+                return state, Match(rule=rule, start=end - length, end=end)
+        return state, None
+
+    def search(self, text: str) -> Optional[Match]:
+        """Returns the first match in `text`, or None."""
+        return self.scan(text)[1]
+
+    def find_all(self, text: str) -> List[Match]:
+        """Returns every match in `text`, including overlapping ones, ordered by end offset."""
+        goto, fail, output = self._goto, self._fail, self._output
+        state = ROOT
+        matches = []
+        for index, char in enumerate(self.normalize(text)):
+            while True:
+                next_state = goto[state].get(char)
+                if next_state is not None:
+                    state = next_state
+                    break
+                if state == ROOT:
+                    break
+                state = fail[state]
+            for rule, length in output[state]:
+                matches.append(Match(rule=rule, start=index + 1 - length, end=index + 1))
+        return matches
@@ -0,0 +1,118 @@
+"""Obfuscation-aware normalization of text before rule matching.
+
+Simple keyword checks are bypassed with homoglyphs ("ѕеnѕitivе" in Cyrillic),
+zero-width characters, leetspeak ("s3n5it1ve") or spacing ("s e n s i t i v e").
+`normalize` maps every character to its canonical "skeleton" in one pass:
+
+1. NFKC compatibility folding (fullwidth, ligatures, mathematical letters) and
+   lowercasing, with accents and other combining marks dropped;
+2. confusable folding of common Cyrillic/Greek lookalikes and leetspeak digits
+   and symbols onto ASCII letters;
+3. stripping of invisible characters (format and control characters, variation
+   selectors, tag characters); and
+4. separator collapsing: whitespace, punctuation and symbols are removed, so
+   spaced-out or dotted words join up again.
+
+All four steps are precomputed per code point into a single translation table
+at import, so normalizing is one `str.translate` call (one `bytes.translate`
+for ASCII text). Text below U+20000, i.e. nearly all text, is translated with a
+flat list indexed by code point, which is several times faster than a dict. Rules are normalized with the same table, so a phrase rule such
+as "launch codes" matches "L4unch-c0des" and "launchcodes" alike. Matches can
+therefore span word boundaries; that trade-off favours blocking.
+"""
+import re
+import unicodedata
+from typing import Dict, List, Optional, Union
+
+# Bump when the mapping changes, so verdicts cached under the old mapping are not reused.
+NORMALIZATION_VERSION = 1
+
+# Lookalikes folded onto ASCII, applied after lowercasing.
+CONFUSABLES: Dict[str, str] = {
+    # Cyrillic
+    "а": "a", "в": "b", "е": "e", "ё": "e", "к": "k", "м": "m", "н": "h", "о": "o", "р": "p",
+    "с": "c", "т": "t", "у": "y", "х": "x", "ѕ": "s", "і": "i", "ї": "i", "ј": "j", "ԁ": "d",
+    "ԛ": "q", "ԝ": "w", "һ": "h", "ӏ": "i", "ɡ": "g",
+    # Greek
+    "α": "a", "β": "b", "ε": "e", "η": "n", "ι": "i", "κ": "k", "ν": "v", "ο": "o", "ρ": "p",
+    "τ": "t", "υ": "u", "χ": "x", "ω": "w",
+    # Latin lookalikes
+    "ı": "i", "ȷ": "j", "ℓ": "i", "ß": "ss", "æ": "ae", "œ": "oe", "ø": "o", "đ": "d", "ł": "i",
+    # Leetspeak; 'l' shares a skeleton with 'i' and '1'.
+    "0": "o", "1": "i", "l": "i", "!": "i", "|": "i", "3": "e", "4": "a", "@": "a", "5": "s",
+    "$": "s", "7": "t", "+": "t", "8": "b", "9": "g", "2": "z",
+}
+
+# Code point ranges outside the BMP that need entries (mathematical alphanumerics,
+# enclosed alphanumerics, tag characters and variation selectors supplement).
+_EXTRA_RANGES = ((0x1D400, 0x1D800), (0x1F100, 0x1F200), (0xE0000, 0xE0080), (0xE0100, 0xE01F0))
+
+# Dropped: separators (Z*), punctuation (P*), symbols (S*), controls and format
+# characters (Cc, Cf), combining marks (M*) and unassigned/private code points.
+_DROPPED_CATEGORIES = ("Z", "P", "S", "C", "M")
+
+
+def _fold_char(char: str) -> str:
+    if char in CONFUSABLES:
+        return CONFUSABLES[char]
+    if unicodedata.category(char).startswith(_DROPPED_CATEGORIES):
+        return ""
+    return char
+
+
+def _skeleton(char: str) -> str:
+    """Returns the normalized form of a single code point."""
+    if char in CONFUSABLES:
+        return CONFUSABLES[char]
+    folded = unicodedata.normalize("NFKD", unicodedata.normalize("NFKC", char)).lower()
+    return "".join(_fold_char(c) for c in folded)
+
+
+def _build_table() -> Dict[int, Optional[str]]:
+    table: Dict[int, Optional[str]] = {}
+    code_points = list(range(0x0, 0xD800)) + list(range(0xE000, 0x10000))
+    for start, stop in _EXTRA_RANGES:
+        code_points.extend(range(start, stop))
+    for code_point in code_points:
+        char = chr(code_point)
+        mapped = _skeleton(char)
+        if mapped != char:
+            table[code_point] = mapped or None
+    return table
+
+
+_TABLE: Dict[int, Optional[str]] = _build_table()
+# The same mapping as a flat list for code points below _FLAT_LIMIT (about 4 MB);
+# unmapped entries hold their own ordinal.
+_FLAT_LIMIT = 0x20000
+_FLAT_TABLE: List[Union[int, str, None]] = list(range(_FLAT_LIMIT))
+for _code_point, _mapped in _TABLE.items():
+    if _code_point < _FLAT_LIMIT:
+        _FLAT_TABLE[_code_point] = _mapped
+_ABOVE_FLAT_LIMIT = re.compile(f"[{chr(_FLAT_LIMIT)}-{chr(0x10FFFF)}]")
+# The same mapping as bytes.translate arguments, for the ASCII fast path. Every ASCII
+# character maps to at most one ASCII character, so the two paths agree.
+_ASCII_TABLE = bytes((_TABLE.get(b, chr(b)) or " ").encode()[0] for b in range(128)).ljust(256, b" ")
+_ASCII_DELETE = bytes(b for b in range(128) if _TABLE.get(b, chr(b)) is None)
+
+
+def normalize(text: str) -> str:
+    """Returns the normalized skeleton of `text` used for rule matching.
+
+    Args:
+        text (str): The text to normalize.
+
+    Returns:
+        str: The lowercased, folded text with invisible characters and separators removed.
+    """
+    if text.isascii():
+        return text.encode("ascii").translate(_ASCII_TABLE, _ASCII_DELETE).decode("ascii")
+    if _ABOVE_FLAT_LIMIT.search(text) is None:
+        return text.translate(_FLAT_TABLE)
+    return text.translate(_TABLE)
+
+
+def table_size() -> int:
+    """Returns the number of code points with a non-identity mapping."""
+    return len(_TABLE)
+
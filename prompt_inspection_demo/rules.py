@@ -0,0 +1,177 @@
+"""Blocking rules for prompt inspection.
+
+Rules default to the single term 'sensitive'. Set `PROMPT_INSPECTION_RULES_FILE`
+to load thousands of terms and phrases instead, either from:
+
+- a JSON file holding a list whose items are a pattern string or an
+  `{"id": ..., "pattern": ...}` object, or
+- a text file with one pattern per line (blank lines and lines starting with
+  `#` are skipped).
+
+Rules without an id use their pattern as the id. Patterns and inspected text are
+both normalized by `prompt_inspection_demo.normalize`, so obfuscated spellings of a
+pattern (homoglyphs, leetspeak, zero-width characters, inserted spaces) match too.
+
+A rules file is watched for changes every `PROMPT_INSPECTION_RULES_RELOAD_SECONDS`
+(default 2; 0 disables reloading). A changed file is compiled on a background
+thread and published by rebinding `active_matcher`, a single atomic assignment,
+with the next `revision` number. Callers read `active_matcher` once per request,
+so in-flight requests finish on the ruleset they started with and no request
+ever waits on compilation. A file that fails to load leaves the current ruleset
+in place.
+"""
+import json
+import logging
+import os
+import threading
+from typing import Callable, List, Optional, Tuple
+
+from prompt_inspection_demo.matcher import Matcher, Rule
+from prompt_inspection_demo.normalize import NORMALIZATION_VERSION, normalize
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+DEFAULT_RULES: List[Rule] = [Rule(id="sensitive-keyword", pattern="sensitive")]
+
+
+def load_rules(path: str) -> List[Rule]:
+    """Loads blocking rules from a JSON or text file.
+
+    Args:
+        path (str): Path to the rules file. Files ending in '.json' are parsed as JSON.
+
+    Returns:
+        list: The rules, in file order.
+
+    Raises:
+        ValueError: If a JSON rule entry is malformed.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.endswith(".json"):
+            entries = json.load(f)
+        else:
+            entries = [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+
+    rules = []
+    for index, entry in enumerate(entries):
+        if isinstance(entry, str):
+            rules.append(Rule(id=entry, pattern=entry))
+        elif isinstance(entry, dict) and isinstance(entry.get("pattern"), str):
+            rules.append(Rule(id=str(entry.get("id", entry["pattern"])), pattern=entry["pattern"]))
+        else:
+            raise ValueError(f"Invalid rule #{index} in '{path}': {entry!r}.")
+    return rules
+
+
+def build_matcher(path: Optional[str] = None, revision: int = 0) -> Matcher:
+    """Compiles the rules from `path`, or DEFAULT_RULES when no path is given."""
+    rules = load_rules(path) if path else DEFAULT_RULES
+    matcher = Matcher(
+        rules, normalize=normalize, normalization=f"skeleton-v{NORMALIZATION_VERSION}", revision=revision
+    )
+    logger.info(
+        f"Compiled {len(matcher)} prompt inspection rules into {matcher.states} automaton states "
+        f"(revision {revision}, version {matcher.version})."
+    )
+    return matcher
+
+
+RULES_FILE = os.getenv("PROMPT_INSPECTION_RULES_FILE")
+RELOAD_SECONDS = float(os.getenv("PROMPT_INSPECTION_RULES_RELOAD_SECONDS", "2"))
+
+# The matcher used by prompt_inspection_callback. Read it as `rules.active_matcher`
+# (not `from ... import active_matcher`) to see reloads.
+active_matcher: Matcher = build_matcher(RULES_FILE)
+
+_publish_lock = threading.Lock()
+
+
+def publish(matcher: Matcher) -> Matcher:
+    """Makes `matcher` the active ruleset, numbering it after the current one.
+
+    Args:
+        matcher (Matcher): A compiled ruleset.
+
+    Returns:
+        Matcher: The published matcher, with its `revision` set.
+    """
+    global active_matcher
+    with _publish_lock:
+        matcher.revision = active_matcher.revision + 1
+        active_matcher = matcher
+    logger.info(f"Activated prompt inspection ruleset revision {matcher.revision} ({len(matcher)} rules).")
+    return matcher
+
+
+def _file_signature(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class RulesetWatcher:
+    """Polls a rules file and publishes a recompiled ruleset whenever it changes.
+
+    Args:
+        path (str): The rules file to watch.
+        interval (float): Seconds between checks.
+        on_change (Callable[[Matcher], object]): Called with each newly compiled matcher.
+            Defaults to `publish`.
+    """
+
+    def __init__(self, path: str, interval: float = RELOAD_SECONDS, on_change: Callable[[Matcher], object] = publish):
+        self.path = path
+        self.interval = interval
+        self.on_change = on_change
+        self._signature = _file_signature(path)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def check_now(self) -> bool:
+        """Reloads the file if it changed since the last check.
+
+        Returns:
+            bool: True if a new ruleset was compiled and handed to `on_change`.
+        """
+        signature = _file_signature(self.path)
+        if signature is None or signature == self._signature:
+            return False
+        # Remember the signature even if loading fails, so a broken file is reported once,
+        # not on every poll; fixing the file changes the signature again.
+        self._signature = signature
+        try:
+            matcher = build_matcher(self.path)
+        except (OSError, ValueError) as e:
+            logger.error(f"Keeping the current prompt inspection ruleset; failed to reload '{self.path}': {e}")
+            return False
+        self.on_change(matcher)
+        return True
+
+    def start(self) -> None:
+        """Starts polling on a daemon thread."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="prompt-rules-watcher", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Stops polling and waits for an in-progress check to finish."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.check_now()
+            except Exception as e:
+                logger.error(f"Prompt inspection rules watcher error: {e}")
+
+
+watcher: Optional[RulesetWatcher] = None
+if RULES_FILE and RELOAD_SECONDS > 0:
+    watcher = RulesetWatcher(RULES_FILE)
+    watcher.start()
@@ -0,0 +1,135 @@
+"""Per-session prompt inspection state, so each model call scans only new content.
+
+An agent loop calls the model many times per invocation (once per tool round
+trip), and each call carries prompt text that was usually inspected already.
+For every session we keep:
+
+- the verdicts for prompt texts already scanned, keyed by a digest of the text,
+  so a repeated prompt is not scanned again; and
+- the matcher state at the end of the last clean prompt, so a prompt that
+  extends it (e.g. a growing transcript) is scanned from where the previous
+  scan stopped instead of from the start.
+
+Prompts a session has not seen are looked up in the shared verdict cache before
+being scanned, and new verdicts are added to it.
+
+Verdicts are only valid for the matcher that produced them, so a session's state
+is reset whenever the active matcher changes.
+"""
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from prompt_inspection_demo.matcher import ROOT, Match, Matcher
+from prompt_inspection_demo.verdict_cache import VerdictCache, content_digest
+
+DEFAULT_MAX_SESSIONS: int = int(os.getenv("PROMPT_INSPECTION_MAX_SESSIONS", "10000"))
+DEFAULT_MAX_DIGESTS: int = int(os.getenv("PROMPT_INSPECTION_MAX_DIGESTS_PER_SESSION", "256"))
+
+
+class InspectionState:
+    """The inspection state of one session."""
+
+    def __init__(self, matcher: Matcher, max_digests: int, cache: Optional[VerdictCache]):
+        self.matcher = matcher
+        self.max_digests = max_digests
+        self.cache = cache
+        self.lock = threading.Lock()
+        self.verdicts: "OrderedDict[bytes, Optional[Match]]" = OrderedDict()
+        self.prefix_length = 0
+        self.prefix_digest = b""
+        self.prefix_state = ROOT
+
+    def inspect(self, text: str) -> Tuple[Optional[Match], str, int]:
+        """Returns the verdict for `text`, how it was reached and the number of characters skipped.
+
+        Must be called with `lock` held.
+        """
+        digest = content_digest(text)
+        if digest in self.verdicts:
+            self.verdicts.move_to_end(digest)
+            return self.verdicts[digest], "repeats", len(text)
+
+        cached = self.cache.get(self.matcher, digest) if self.cache is not None else None
+        if cached is not None:
+            start, kind = len(text), "cached"
+            state, match = cached
+        else:
+            start, state, kind = 0, ROOT, "full_scans"
+            if 0 < self.prefix_length < len(text) and content_digest(text[:self.prefix_length]) == self.prefix_digest:
+                start, state, kind = self.prefix_length, self.prefix_state, "resumed"
+            state, match = self.matcher.scan(text[start:], state, offset=start)
+            if self.cache is not None:
+                self.cache.put(self.matcher, digest, (state, match))
+
+        self.verdicts[digest] = match
+        if len(self.verdicts) > self.max_digests:
+            self.verdicts.popitem(last=False)
+        if match is None:
+            self.prefix_length, self.prefix_digest, self.prefix_state = len(text), digest, state
+        return match, kind, start
+
+
+class SessionInspectionStore:
+    """A bounded, thread-safe LRU map from session id to its InspectionState."""
+
+    def __init__(
+        self,
+        max_sessions: int = DEFAULT_MAX_SESSIONS,
+        max_digests: int = DEFAULT_MAX_DIGESTS,
+        cache: Optional[VerdictCache] = None,
+    ):
+        self.max_sessions = max_sessions
+        self.max_digests = max_digests
+        self.cache = cache
+        self._sessions: "OrderedDict[str, InspectionState]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters: Dict[str, int] = dict.fromkeys(
+            ("repeats", "cached", "resumed", "full_scans", "scanned_chars", "skipped_chars"), 0
+        )
+
+    def inspect(self, session_id: str, matcher: Matcher, text: str) -> Optional[Match]:
+        """Inspects a session's prompt text, skipping content that was already scanned.
+
+        Args:
+            session_id (str): The session the prompt belongs to.
+            matcher (Matcher): The active matcher.
+            text (str): The prompt text.
+
+        Returns:
+            Optional[Match]: The first rule match, or None if the text is clean.
+        """
+        with self._lock:
+            state = self._sessions.get(session_id)
+            if state is None or state.matcher is not matcher:
+                state = InspectionState(matcher, self.max_digests, self.cache)
+                self._sessions[session_id] = state
+                if len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            else:
+                self._sessions.move_to_end(session_id)
+        # Sessions are scanned in parallel; only calls within one session are serialized.
+        with state.lock:
+            match, kind, skipped = state.inspect(text)
+        with self._lock:
+            self._counters[kind] += 1
+            self._counters["scanned_chars"] += len(text) - skipped
+            self._counters["skipped_chars"] += skipped
+        return match
+
+    def forget(self, session_id: str) -> None:
+        """Drops the state of a finished session."""
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._sessions.clear()
+            for key in self._counters:
+                self._counters[key] = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Returns scan counters: repeated and shared-cache prompts skipped, resumed and full scans, and characters scanned/skipped."""
+        with self._lock:
+            return dict(self._counters, sessions=len(self._sessions))
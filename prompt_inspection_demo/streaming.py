@@ -0,0 +1,79 @@
+"""Inspection of model output as it streams, one chunk at a time.
+
+A streamed response arrives as partial chunks followed by a final, aggregated
+response. Each chunk is scanned as it arrives, resuming from the matcher state
+left by the previous chunk, so a term split across a chunk boundary is still
+caught and nothing has to be buffered. Once a rule fires the stream stays
+blocked: later chunks, and the final response, are never released.
+"""
+import os
+import threading
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+from prompt_inspection_demo.matcher import ROOT, Match, Matcher
+
+DEFAULT_MAX_STREAMS: int = int(os.getenv("RESPONSE_INSPECTION_MAX_STREAMS", "10000"))
+
+
+class StreamInspector:
+    """Carries matcher state across the chunks of one response stream."""
+
+    def __init__(self, matcher: Matcher):
+        self.matcher = matcher
+        self.state = ROOT
+        self.offset = 0
+        self.match: Optional[Match] = None
+
+    def feed(self, text: str) -> Optional[Match]:
+        """Scans the next chunk of text.
+
+        Args:
+            text (str): The chunk's text.
+
+        Returns:
+            Optional[Match]: The match that blocked the stream, now or in an earlier
+                chunk, or None while the stream is clean.
+        """
+        if self.match is None and text:
+            self.state, self.match = self.matcher.scan(text, self.state, offset=self.offset)
+            self.offset += len(text)
+        return self.match
+
+
+class StreamInspectionStore:
+    """A bounded, thread-safe map from a stream key to its StreamInspector.
+
+    Streams that are never finished (e.g. a cancelled request) are evicted
+    least-recently-used first.
+    """
+
+    def __init__(self, max_streams: int = DEFAULT_MAX_STREAMS):
+        self.max_streams = max_streams
+        self._streams: "OrderedDict[Hashable, StreamInspector]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._streams)
+
+    def get(self, key: Hashable, matcher: Matcher) -> StreamInspector:
+        """Returns the inspector of an open stream, starting a new stream if needed."""
+        with self._lock:
+            inspector = self._streams.get(key)
+            if inspector is None:
+                inspector = StreamInspector(matcher)
+                self._streams[key] = inspector
+                if len(self._streams) > self.max_streams:
+                    self._streams.popitem(last=False)
+            else:
+                self._streams.move_to_end(key)
+            return inspector
+
+    def finish(self, key: Hashable) -> Optional[StreamInspector]:
+        """Closes a stream and returns its inspector, or None if no chunks were seen."""
+        with self._lock:
+            return self._streams.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._streams.clear()
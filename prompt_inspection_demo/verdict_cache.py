@@ -0,0 +1,102 @@
+"""A process-wide cache of inspection verdicts, keyed by content hash and ruleset version.
+
+Much of the traffic is repeated boilerplate, and the same strings reach both
+`prompt_inspection_callback` and `handle_sensitive_data`. Both look verdicts up
+here first, so an input is scanned once per ruleset rather than once per call.
+The end state of the scan is cached with the verdict, so a session can resume
+scanning from a cached prompt as if it had scanned it itself.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple, Union
+
+from prompt_inspection_demo.matcher import ROOT, Match, Matcher
+
+DEFAULT_MAX_ENTRIES: int = int(os.getenv("PROMPT_VERDICT_CACHE_MAX_ENTRIES", "50000"))
+
+# (automaton state at the end of the scan, first match or None)
+Verdict = Tuple[int, Optional[Match]]
+
+
+def content_digest(text: str) -> bytes:
+    """Returns a 128-bit digest of `text`."""
+    return hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+
+
+class VerdictCache:
+    """A bounded, thread-safe LRU cache of scan verdicts."""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, bytes], Verdict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, matcher: Matcher, digest: bytes) -> Optional[Verdict]:
+        """Returns the cached verdict for a content digest under `matcher`'s ruleset, if any."""
+        key = (matcher.version, digest)
+        with self._lock:
+            verdict = self._entries.get(key)
+            if verdict is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return verdict
+
+    def put(self, matcher: Matcher, digest: bytes, verdict: Verdict) -> None:
+        """Caches the verdict for a content digest under `matcher`'s ruleset."""
+        with self._lock:
+            self._entries[(matcher.version, digest)] = verdict
+            self._entries.move_to_end((matcher.version, digest))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def scan(self, matcher: Matcher, text: str, digest: Optional[bytes] = None) -> Verdict:
+        """Scans `text` from the start, or returns the cached verdict.
+
+        Args:
+            matcher (Matcher): The active matcher.
+            text (str): The text to inspect.
+            digest (Optional[bytes]): The text's content_digest, if already computed.
+
+        Returns:
+            Verdict: The automaton state at the end of the scan and the first match, if any.
+        """
+        if digest is None:
+            digest = content_digest(text)
+        verdict = self.get(matcher, digest)
+        if verdict is None:
+            verdict = matcher.scan(text, ROOT)
+            self.put(matcher, digest, verdict)
+        return verdict
+
+    def search(self, matcher: Matcher, text: str) -> Optional[Match]:
+        """Returns the first match in `text`, using the cached verdict when there is one."""
+        return self.scan(matcher, text)[1]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._hits = self._misses = self._evictions = 0
+
+    def stats(self) -> Dict[str, Union[int, float]]:
+        """Returns hits, misses, hit_rate, evictions and the number of cached entries."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+                "evictions": self._evictions,
+                "entries": len(self._entries),
+            }
+
+
+# The cache shared by prompt inspection and the sensitive data tool.
+verdict_cache = VerdictCache()
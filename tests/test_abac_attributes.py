@@ -0,0 +1,109 @@
+import unittest
+import json
+import os
+import tempfile
+from unittest.mock import MagicMock
+
+from abac_demo.attributes import AttributeResolver, FileAttributeProvider, TTLCache, build_resolver
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def _tool_context(user_id="alice", state=None):
+    context = MagicMock()
+    context.user_id = user_id
+    context.state = state if state is not None else {}
+    return context
+
+class TestTTLCache(unittest.TestCase):
+
+    def test_entries_expire(self):
+        clock = FakeClock()
+        cache = TTLCache(ttl=10, negative_ttl=1, clock=clock)
+        cache.set("a", {"x": 1})
+        cache.set("b", None)
+        clock.now = 5
+        self.assertEqual(cache.get("a"), {"x": 1})
+        self.assertEqual(cache.get("b", "missing"), "missing")
+        clock.now = 11
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.stats()["expirations"], 2)
+
+    def test_bounded_lru(self):
+        cache = TTLCache(max_entries=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), 1)
+
+    def test_get_or_load_caches_negative_results(self):
+        cache = TTLCache()
+        load = MagicMock(return_value=None)
+        self.assertIsNone(cache.get_or_load("unknown", load))
+        self.assertIsNone(cache.get_or_load("unknown", load))
+        load.assert_called_once()
+
+class TestAttributeResolver(unittest.TestCase):
+
+    def setUp(self):
+        self.provider = MagicMock()
+        self.provider.get_attributes.side_effect = lambda principal: {
+            "alice": {"agent_type": "marketing", "access_level": "manager"},
+            "bob": {"agent_type": "sales", "access_level": "employee"},
+        }.get(principal)
+        self.resolver = AttributeResolver(provider=self.provider)
+
+    def test_resolves_per_user_and_caches(self):
+        self.assertEqual(self.resolver.resolve(_tool_context("alice"))["access_level"], "manager")
+        self.assertEqual(self.resolver.resolve(_tool_context("bob"))["agent_type"], "sales")
+        self.resolver.resolve(_tool_context("alice"))
+        self.assertEqual(self.provider.get_attributes.call_count, 2)
+
+    def test_unknown_user_is_negatively_cached(self):
+        self.assertIsNone(self.resolver.resolve(_tool_context("mallory")))
+        self.assertIsNone(self.resolver.resolve(_tool_context("mallory")))
+        self.provider.get_attributes.assert_called_once_with("mallory")
+
+    def test_session_state_cannot_override_provider(self):
+        context = _tool_context("bob", {"user:agent_type": "marketing", "user:access_level": "manager"})
+        self.assertEqual(self.resolver.resolve(context), {"agent_type": "sales", "access_level": "employee"})
+        self.assertIsNone(self.resolver.resolve(_tool_context("mallory", {"user:agent_type": "sales", "user:access_level": "manager"})))
+
+    def test_session_state_without_provider(self):
+        resolver = AttributeResolver(defaults={"agent_type": "sales", "access_level": "manager"})
+        context = _tool_context("alice", {"user:agent_type": "marketing", "user:access_level": "employee"})
+        self.assertEqual(resolver.resolve(context), {"agent_type": "marketing", "access_level": "employee"})
+
+    def test_provider_errors_are_not_cached(self):
+        self.provider.get_attributes.side_effect = [RuntimeError("down"), {"agent_type": "sales", "access_level": "manager"}]
+        with self.assertRaises(RuntimeError):
+            self.resolver.resolve(_tool_context("carol"))
+        self.assertEqual(self.resolver.resolve(_tool_context("carol"))["access_level"], "manager")
+
+    def test_defaults_without_provider(self):
+        resolver = AttributeResolver(defaults={"agent_type": "sales", "access_level": "manager"})
+        self.assertEqual(resolver.resolve(_tool_context(None))["agent_type"], "sales")
+
+    def test_file_provider(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "attributes.json")
+            with open(path, "w") as f:
+                json.dump({"alice": {"agent_type": "marketing", "access_level": "employee"}}, f)
+            os.environ["ABAC_ATTRIBUTES_FILE"] = path
+            try:
+                resolver = build_resolver({"agent_type": "sales", "access_level": "manager"})
+            finally:
+                del os.environ["ABAC_ATTRIBUTES_FILE"]
+            self.assertIsInstance(resolver.provider, FileAttributeProvider)
+            self.assertEqual(resolver.resolve(_tool_context("alice"))["access_level"], "employee")
+            self.assertIsNone(resolver.resolve(_tool_context("bob")))
+
+if __name__ == '__main__':
+    unittest.main()
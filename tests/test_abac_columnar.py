@@ -0,0 +1,87 @@
+import unittest
+
+from abac_demo.tools.columnar import ColumnarTable, Condition, QueryError, matches_all, parse_filters
+
+class TestFilterParsing(unittest.TestCase):
+
+    def test_parses_conjunction(self):
+        conditions = parse_filters("campaign == 'Q1 and Q2' AND budget > 50000 and active == true")
+        self.assertEqual(conditions, [
+            Condition("campaign", "==", "Q1 and Q2"),
+            Condition("budget", ">", 50000),
+            Condition("active", "==", True),
+        ])
+
+    def test_empty_filter(self):
+        self.assertEqual(parse_filters(None), [])
+        self.assertEqual(parse_filters("  "), [])
+
+    def test_rejects_malformed_filters(self):
+        for expression in ("budget >", "budget > 1 or budget < 0", "__import__('os')", "budget > 'abc'"):
+            with self.assertRaises(QueryError, msg=expression):
+                parse_filters(expression)
+
+class TestColumnarTable(unittest.TestCase):
+
+    def setUp(self):
+        self.records = [
+            {"campaign": "Q1_Launch", "budget": 40000, "region": "EMEA"},
+            {"campaign": "Holiday_Promo", "budget": 75000},
+            {"campaign": "Q1_Launch", "budget": 90000, "region": "APAC"},
+            {"campaign": "Summer", "budget": 50000, "region": "EMEA"},
+        ]
+        self.table = ColumnarTable.from_records(self.records)
+
+    def query(self, expression, fields=None):
+        return self.table.query(parse_filters(expression), fields)
+
+    def test_equality_and_range(self):
+        self.assertEqual(self.query("campaign == 'Q1_Launch' and budget > 50000"), [self.records[2]])
+        self.assertEqual(self.query("budget >= 50000", ["budget"]), [{"budget": 75000}, {"budget": 90000}, {"budget": 50000}])
+        self.assertEqual(self.query("budget < 50000"), [self.records[0]])
+        self.assertEqual(self.query("budget <= 50000 and region == 'EMEA'"), [self.records[0], self.records[3]])
+
+    def test_not_equal_skips_missing_fields(self):
+        self.assertEqual(self.query("region != 'EMEA'"), [self.records[2]])
+        self.assertEqual(self.query("budget != 50000", ["campaign"]), [
+            {"campaign": "Q1_Launch"}, {"campaign": "Holiday_Promo"}, {"campaign": "Q1_Launch"},
+        ])
+
+    def test_results_match_row_predicate(self):
+        for expression in ("budget > 45000", "campaign == 'Q1_Launch'", "region != 'APAC' and budget < 80000"):
+            conditions = parse_filters(expression)
+            expected = [r for r in self.records if matches_all(conditions, r)]
+            self.assertEqual(self.table.query(conditions), expected, expression)
+
+    def test_missing_fields_are_omitted_and_ints_preserved(self):
+        rows = self.query(None, ["region", "budget"])
+        self.assertEqual(rows[1], {"budget": 75000})
+        self.assertIsInstance(rows[0]["budget"], int)
+
+    def test_nulls_match_streaming_path(self):
+        records = self.records + [
+            {"campaign": "Fall", "budget": None, "region": None},
+            {"campaign": None, "budget": 60000.5, "region": "EMEA"},
+            {"campaign": "Winter", "notes": None},
+        ]
+        table = ColumnarTable.from_records(records)
+        for expression in (
+            "budget > 50000", "budget <= 50000", "budget == 50000", "budget != 50000", "budget == null",
+            "budget != null", "budget != 'x'", "region == null", "region != 'EMEA'", "campaign != null",
+            "notes > 3", "notes == null", "campaign == 'Fall' and budget == null",
+        ):
+            conditions = parse_filters(expression)
+            expected = [r for r in records if matches_all(conditions, r)]
+            self.assertEqual(table.query(conditions), expected, expression)
+        self.assertEqual(table.query([], ["budget"])[4:6], [{"budget": None}, {"budget": 60000.5}])
+
+    def test_unknown_fields_are_rejected(self):
+        with self.assertRaises(QueryError):
+            self.query("owner == 'x'")
+        with self.assertRaises(QueryError):
+            self.query(None, ["owner"])
+        with self.assertRaises(QueryError):
+            self.query("campaign > 3")
+
+if __name__ == '__main__':
+    unittest.main()
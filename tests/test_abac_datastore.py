@@ -1,15 +1,24 @@
 import unittest
+import asyncio
 import os
 import json
+import threading
 from unittest.mock import MagicMock, patch
 
 # Assuming the project root is on the Python path for imports
-from abac_demo.tools.datastore import get_datastore_content
+from abac_demo.policy import compile_policy
+from abac_demo.tools.datastore import (
+    datastore_cache,
+    get_datastore_content,
+    get_datastore_content_async,
+    update_datastore,
+)
 
 class TestABACDatastore(unittest.TestCase):
 
     def setUp(self):
         self.mock_tool_context = MagicMock()
+        datastore_cache.clear()
         self.data_dir = "abac_demo/data"
         os.makedirs(self.data_dir, exist_ok=True)
 
@@ -53,6 +62,157 @@ class TestABACDatastore(unittest.TestCase):
         self.assertEqual(result["status"], "error")
         self.assertIn("Invalid access level", result["message"])
 
+    def test_single_copy_layout_is_projected(self):
+        records = [{"campaigns": ["Q1_Launch"], "budget": 50000}, {"campaigns": ["Holiday_Promo"], "budget": 75000}]
+        with open(os.path.join(self.data_dir, "marketing_data.json"), "w") as f:
+            json.dump({"full": records, "field_masks": {"limited": ["campaigns"]}}, f)
+        manager = get_datastore_content("marketing", "manager", self.mock_tool_context)
+        employee = get_datastore_content("marketing", "employee", self.mock_tool_context)
+        self.assertEqual(manager["data"], records)
+        self.assertEqual(employee["data"], [{"campaigns": ["Q1_Launch"]}, {"campaigns": ["Holiday_Promo"]}])
+
+    def test_single_copy_layout_uses_policy_fields_by_default(self):
+        with open(os.path.join(self.data_dir, "sales_data.json"), "w") as f:
+            json.dump({"full": self.sales_full_data}, f)
+        result = get_datastore_content("sales", "employee", self.mock_tool_context)
+        self.assertEqual(result["data"], self.sales_limited_data)
+
+    def test_field_masks_cannot_widen_policy(self):
+        with open(os.path.join(self.data_dir, "sales_data.json"), "w") as f:
+            json.dump({"full": self.sales_full_data, "field_masks": {"limited": ["deals", "value"]}}, f)
+        result = get_datastore_content("sales", "employee", self.mock_tool_context)
+        self.assertEqual(result["data"], self.sales_limited_data)
+
+    def test_jsonl_datastore_is_paginated_and_projected(self):
+        json_path = os.path.join(self.data_dir, "sales_data.json")
+        records_path = os.path.join(self.data_dir, "sales_data.jsonl")
+        os.rename(json_path, json_path + ".bak")
+        try:
+            with open(records_path, "w") as f:
+                for i in range(5):
+                    f.write(json.dumps({"deals": f"deal_{i}", "value": i}) + "\n")
+            first = get_datastore_content("sales", "employee", self.mock_tool_context, page_size=3)
+            self.assertEqual(first["data"], [{"deals": f"deal_{i}"} for i in range(3)])
+            second = get_datastore_content("sales", "employee", self.mock_tool_context, page_size=3, cursor=first["next_cursor"])
+            self.assertEqual(second["data"], [{"deals": f"deal_{i}"} for i in range(3, 5)])
+            self.assertIsNone(second["next_cursor"])
+        finally:
+            os.remove(records_path)
+            os.rename(json_path + ".bak", json_path)
+
+    def test_jsonl_datastore_rejects_unknown_fields_like_json(self):
+        json_path = os.path.join(self.data_dir, "sales_data.json")
+        records_path = os.path.join(self.data_dir, "sales_data.jsonl")
+        os.rename(json_path, json_path + ".bak")
+        try:
+            with open(records_path, "w") as f:
+                for i in range(3):
+                    f.write(json.dumps({"deals": f"deal_{i}", "value": i}) + "\n")
+            for kwargs in ({"filters": "value > 0"}, {"fields": ["deals", "value"]}, {"fields": ["owner"]}):
+                with self.subTest(**kwargs):
+                    result = get_datastore_content("sales", "employee", self.mock_tool_context, **kwargs)
+                    self.assertEqual(result["status"], "error")
+                    self.assertIn("Unknown field", result["message"])
+            result = get_datastore_content("sales", "employee", self.mock_tool_context, filters="deals == 'deal_1'", fields=["deals"])
+            self.assertEqual(result["data"], [{"deals": "deal_1"}])
+        finally:
+            os.remove(records_path)
+            os.rename(json_path + ".bak", json_path)
+
+    def test_json_record_list_is_paginated_on_request(self):
+        records = [{"deals": f"deal_{i}", "value": i} for i in range(4)]
+        with open(os.path.join(self.data_dir, "sales_data.json"), "w") as f:
+            json.dump({"full": records}, f)
+        result = get_datastore_content("sales", "manager", self.mock_tool_context, page_size=3)
+        self.assertEqual(result["data"], records[:3])
+        self.assertIsNotNone(result["next_cursor"])
+        result = get_datastore_content("sales", "manager", self.mock_tool_context, cursor="garbage")
+        self.assertEqual(result["status"], "error")
+        self.assertIn("Invalid cursor", result["message"])
+
+    def test_filters_run_over_permitted_fields_only(self):
+        records = [{"deals": "Enterprise_A", "value": 400000}, {"deals": "SMB_B", "value": 20000}]
+        with open(os.path.join(self.data_dir, "sales_data.json"), "w") as f:
+            json.dump({"full": records}, f)
+        manager = get_datastore_content("sales", "manager", self.mock_tool_context, filters="value > 100000", fields=["deals"])
+        self.assertEqual(manager["data"], [{"deals": "Enterprise_A"}])
+        employee = get_datastore_content("sales", "employee", self.mock_tool_context, filters="deals == 'SMB_B'")
+        self.assertEqual(employee["data"], [{"deals": "SMB_B"}])
+        leak = get_datastore_content("sales", "employee", self.mock_tool_context, filters="value > 100000")
+        self.assertEqual(leak["status"], "error")
+        self.assertIn("Unknown field", leak["message"])
+
+    def test_columnar_tables_are_keyed_by_field_set(self):
+        levels = {"intern": ("basic", ["name"]), "employee": ("pay", ["name", "salary"]), "manager": ("full", "*")}
+        three_levels = compile_policy({
+            "attributes": {"agent_type": ["sales"], "access_level": list(levels)},
+            "datastores": {"sales": {"field_sets": {field_set: fields for field_set, fields in levels.values()}}},
+            "actions": ["read"],
+            "rules": [
+                {"id": f"{level}-read", "effect": "allow", "subject": {"access_level": level},
+                 "datastores": "*", "actions": ["read"], "field_set": field_set}
+                for level, (field_set, _) in levels.items()
+            ],
+        })
+        records = [{"name": f"n{i}", "salary": 1000 + i, "ssn": f"000-{i}"} for i in range(2000)]
+        with open(os.path.join(self.data_dir, "sales_data.json"), "w") as f:
+            json.dump({"full": records}, f)
+        # Views that are built but not memoized are freed, and their ids get reused by other
+        # field sets' views; a constant id makes that collision deterministic.
+        with patch("abac_demo.policy.active_policy", three_levels), \
+                patch("abac_demo.tools.datastore.id", lambda obj: 0, create=True):
+            pay = get_datastore_content("sales", "employee", self.mock_tool_context, filters="name == 'n1'")
+            basic = get_datastore_content("sales", "intern", self.mock_tool_context, filters="name == 'n1'")
+        self.assertEqual(pay["data"], [{"name": "n1", "salary": 1001}])
+        self.assertEqual(basic["data"], [{"name": "n1"}])
+
+    def test_filters_require_record_datastore(self):
+        result = get_datastore_content("sales", "manager", self.mock_tool_context, filters="value > 1")
+        self.assertEqual(result["status"], "error")
+        self.assertIn("record-oriented", result["message"])
+
+    def test_update_publishes_new_snapshot(self):
+        before = get_datastore_content("marketing", "manager", self.mock_tool_context)["data"]
+        result = update_datastore("marketing", lambda content: {**content, "full": {**content["full"], "budget": 1}})
+        self.assertEqual(result["status"], "success")
+        after = get_datastore_content("marketing", "manager", self.mock_tool_context)["data"]
+        self.assertEqual(after["budget"], 1)
+        self.assertEqual(before, self.marketing_full_data)  # Earlier readers keep their snapshot.
+        with open(os.path.join(self.data_dir, "marketing_data.json")) as f:
+            self.assertEqual(json.load(f)["full"]["budget"], 1)
+        self.assertEqual(datastore_cache.stats()["reloads"], 0)
+
+    def test_update_rejects_invalid_content(self):
+        result = update_datastore("marketing", {"limited": {}})
+        self.assertEqual(result["status"], "error")
+        self.assertEqual(get_datastore_content("marketing", "manager", self.mock_tool_context)["data"], self.marketing_full_data)
+
+    def test_readers_never_fail_during_updates(self):
+        errors = []
+        stop = threading.Event()
+
+        def reader():
+            while not stop.is_set():
+                result = get_datastore_content("marketing", "manager", self.mock_tool_context)
+                if result["status"] != "success":
+                    errors.append(result)
+
+        threads = [threading.Thread(target=reader) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for i in range(50):
+            update_datastore("marketing", {"full": {"budget": i, "campaigns": ["x"] * i}, "limited": {}})
+        stop.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(get_datastore_content("marketing", "manager", self.mock_tool_context)["data"]["budget"], 49)
+
+    def test_cross_department_access_denied_by_policy(self):
+        result = get_datastore_content("sales", "manager", self.mock_tool_context, agent_type="marketing")
+        self.assertEqual(result["status"], "error")
+        self.assertIn("Access denied to datastore 'sales'", result["message"])
+
     @patch('abac_demo.tools.datastore.json.load')
     def test_json_decode_error(self, mock_json_load):
         mock_json_load.side_effect = json.JSONDecodeError("Expecting value", "doc", 0)
@@ -74,5 +234,48 @@ class TestABACDatastore(unittest.TestCase):
             self.assertEqual(result["status"], "error")
             self.assertIn("Generic error", result["message"])
 
+    def test_repeated_reads_are_served_from_cache(self):
+        with patch('abac_demo.tools.datastore.json.load', wraps=json.load) as mock_json_load:
+            first = get_datastore_content("marketing", "manager", self.mock_tool_context)
+            second = get_datastore_content("marketing", "employee", self.mock_tool_context)
+        self.assertEqual(first["data"], self.marketing_full_data)
+        self.assertEqual(second["data"], self.marketing_limited_data)
+        mock_json_load.assert_called_once()
+        self.assertEqual(datastore_cache.stats()["hits"], 1)
+
+class TestABACDatastoreAsync(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.mock_tool_context = MagicMock()
+        datastore_cache.clear()
+        self.data_dir = "abac_demo/data"
+        os.makedirs(self.data_dir, exist_ok=True)
+        self.full_data = {"budget": 100000, "campaigns": ["Q1_Launch"]}
+        with open(os.path.join(self.data_dir, "marketing_data.json"), "w") as f:
+            json.dump({"full": self.full_data}, f)
+
+    def tearDown(self):
+        os.remove(os.path.join(self.data_dir, "marketing_data.json"))
+        os.rmdir(self.data_dir)
+
+    async def test_async_read_matches_sync_and_runs_off_loop(self):
+        loop_thread = threading.get_ident()
+        read_threads = []
+        original_get = datastore_cache.get
+
+        def recording_get(*args, **kwargs):
+            read_threads.append(threading.get_ident())
+            return original_get(*args, **kwargs)
+
+        with patch.object(datastore_cache, 'get', side_effect=recording_get):
+            results = await asyncio.gather(*[
+                get_datastore_content_async("marketing", level, self.mock_tool_context)
+                for level in ("manager", "employee")
+            ])
+        self.assertEqual(results[0], {"status": "success", "data": self.full_data})
+        self.assertEqual(results[1], {"status": "success", "data": {"campaigns": ["Q1_Launch"]}})
+        self.assertTrue(read_threads)
+        self.assertNotIn(loop_thread, read_threads)
+
 if __name__ == '__main__':
     unittest.main()
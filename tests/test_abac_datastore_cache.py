@@ -0,0 +1,190 @@
+import unittest
+import json
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+
+from abac_demo.tools.datastore_cache import DatastoreCache, estimate_size
+
+
+def _load_json(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+class TestDatastoreCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+
+    def _write(self, name, content, mtime_ns=None):
+        path = os.path.join(self.tmp_dir.name, name)
+        with open(path, "w") as f:
+            json.dump(content, f)
+        if mtime_ns is not None:
+            os.utime(path, ns=(mtime_ns, mtime_ns))
+        return path
+
+    def test_hit_after_first_load(self):
+        cache = DatastoreCache()
+        path = self._write("a.json", {"x": 1})
+        loader = MagicMock(side_effect=_load_json)
+        self.assertEqual(cache.get(path, loader), {"x": 1})
+        self.assertEqual(cache.get(path, loader), {"x": 1})
+        loader.assert_called_once_with(path)
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["reloads"]), (1, 1, 0))
+
+    def test_reload_when_mtime_changes(self):
+        cache = DatastoreCache()
+        path = self._write("a.json", {"x": 1}, mtime_ns=1_000_000_000)
+        cache.get(path, _load_json)
+        self._write("a.json", {"x": 2}, mtime_ns=2_000_000_000)
+        self.assertEqual(cache.get(path, _load_json), {"x": 2})
+        self.assertEqual(cache.stats()["reloads"], 1)
+
+    def test_lru_eviction_by_entry_count(self):
+        cache = DatastoreCache(max_entries=2)
+        a = self._write("a.json", {"x": 1})
+        b = self._write("b.json", {"x": 2})
+        c = self._write("c.json", {"x": 3})
+        cache.get(a, _load_json)
+        cache.get(b, _load_json)
+        cache.get(a, _load_json)  # a becomes most recently used
+        cache.get(c, _load_json)  # evicts b
+        stats = cache.stats()
+        self.assertEqual(stats["evictions"], 1)
+        self.assertEqual(stats["entries"], 2)
+        cache.get(a, _load_json)
+        self.assertEqual(cache.stats()["hits"], 2)
+
+    def test_eviction_by_byte_bound(self):
+        a = self._write("a.json", {"x": "a" * 100})
+        b = self._write("b.json", {"x": "b" * 100})
+        cache = DatastoreCache(max_bytes=os.path.getsize(a) + 10)
+        cache.get(a, _load_json)
+        cache.get(b, _load_json)
+        self.assertEqual(cache.stats()["entries"], 1)
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_loader_errors_are_not_cached(self):
+        cache = DatastoreCache()
+        path = self._write("a.json", {"x": 1})
+        loader = MagicMock(side_effect=[ValueError("bad"), {"x": 1}])
+        with self.assertRaises(ValueError):
+            cache.get(path, loader)
+        self.assertEqual(cache.get(path, loader), {"x": 1})
+        self.assertEqual(cache.stats()["entries"], 1)
+
+    def test_derived_values_are_memoized_per_load(self):
+        cache = DatastoreCache()
+        path = self._write("a.json", {"x": 1}, mtime_ns=1_000_000_000)
+        data = cache.get(path, _load_json)
+        build = MagicMock(side_effect=lambda d: d["x"] + 1)
+        self.assertEqual(cache.derive(path, data, "plus_one", build), 2)
+        self.assertEqual(cache.derive(path, data, "plus_one", build), 2)
+        build.assert_called_once()
+        self._write("a.json", {"x": 5}, mtime_ns=2_000_000_000)
+        data = cache.get(path, _load_json)
+        self.assertEqual(cache.derive(path, data, "plus_one", build), 6)
+
+    def test_derived_values_count_towards_byte_bound(self):
+        a = self._write("a.json", {"full": [{"id": i, "name": f"n{i}"} for i in range(50)]})
+        b = self._write("b.json", {"x": 1})
+        project = lambda d: [{"id": record["id"]} for record in d["full"]]
+        view_size = estimate_size(project(_load_json(a)))
+        cache = DatastoreCache()
+        data = cache.get(a, _load_json)
+        self.assertIs(cache.derive(a, data, "full", lambda d: d["full"]), data["full"]) # A section: free.
+        self.assertEqual(cache.stats()["bytes"], os.path.getsize(a))
+
+        cache = DatastoreCache(max_bytes=os.path.getsize(a) + view_size // 2)
+        data = cache.get(a, _load_json)
+        build = MagicMock(side_effect=project)
+        cache.derive(a, data, "ids", build)
+        cache.derive(a, data, "ids", build)
+        self.assertEqual(build.call_count, 2) # Too large to memoize within the bound.
+
+        cache = DatastoreCache(max_bytes=os.path.getsize(a) + view_size + 1)
+        cache.get(b, _load_json)
+        data = cache.get(a, _load_json)
+        cache.derive(a, data, "ids", project)
+        stats = cache.stats()
+        self.assertEqual(stats["bytes"], os.path.getsize(a) + view_size)
+        self.assertEqual((stats["entries"], stats["evictions"]), (1, 1)) # b made room for the view.
+
+    def test_publish_installs_snapshot_without_reparsing(self):
+        cache = DatastoreCache()
+        path = self._write("a.json", {"x": 1})
+        cache.publish(path, {"x": 1})
+        loader = MagicMock(side_effect=_load_json)
+        self.assertEqual(cache.get(path, loader), {"x": 1})
+        loader.assert_not_called()
+
+    def test_failed_reload_serves_previous_snapshot(self):
+        cache = DatastoreCache()
+        path = self._write("a.json", {"x": 1}, mtime_ns=1_000_000_000)
+        cache.get(path, _load_json)
+        with open(path, "w") as f:
+            f.write('{"x": ')  # A half-written file.
+        self.assertEqual(cache.get(path, _load_json), {"x": 1})
+
+    def test_failed_reload_is_not_retried_until_the_file_changes(self):
+        cache = DatastoreCache()
+        path = self._write("a.json", {"x": 1}, mtime_ns=1_000_000_000)
+        cache.get(path, _load_json)
+        with open(path, "w") as f:
+            f.write('{"x": ')
+        os.utime(path, ns=(2_000_000_000, 2_000_000_000))
+        loader = MagicMock(side_effect=_load_json)
+        with self.assertLogs("abac_demo.tools.datastore_cache", "ERROR") as logs:
+            for _ in range(3):
+                self.assertEqual(cache.get(path, loader), {"x": 1})
+        self.assertEqual(loader.call_count, 1)
+        self.assertEqual(len(logs.records), 1)
+        self._write("a.json", {"x": 2}, mtime_ns=3_000_000_000)
+        self.assertEqual(cache.get(path, loader), {"x": 2})
+
+    def test_concurrent_hits_and_loads_keep_counts(self):
+        cache = DatastoreCache(max_entries=2)
+        paths = [self._write(f"{name}.json", {"x": name}) for name in "abc"]
+        for path in paths:
+            cache.get(path, _load_json)
+
+        def read(path):
+            for _ in range(200):
+                cache.get(path, _load_json)
+                cache.derive(path, cache.get(path, _load_json), "copy", dict)
+
+        with ThreadPoolExecutor(max_workers=6) as pool:
+            list(pool.map(read, paths * 2))
+        stats = cache.stats()
+        self.assertLessEqual(stats["entries"], 2)
+        self.assertEqual(stats["hits"] + stats["misses"] + stats["reloads"], 3 + 6 * 200 * 2)
+
+    def test_hits_take_no_lock(self):
+        cache = DatastoreCache()
+        path = self._write("a.json", {"x": 1})
+        data = cache.get(path, _load_json)
+        cache.derive(path, data, "copy", dict)
+        results = []
+        with cache._lock: # Held by a writer; readers must not wait for it.
+            reader = threading.Thread(target=lambda: results.append(
+                (cache.get(path, _load_json), cache.derive(path, data, "copy", dict))
+            ))
+            reader.start()
+            reader.join(timeout=5)
+            self.assertFalse(reader.is_alive())
+        self.assertEqual(results, [({"x": 1}, {"x": 1})])
+        self.assertEqual(cache.stats()["hits"], 1)
+
+    def test_missing_file_raises(self):
+        cache = DatastoreCache()
+        with self.assertRaises(FileNotFoundError):
+            cache.get(os.path.join(self.tmp_dir.name, "missing.json"), _load_json)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import unittest
+import json
+import os
+import tempfile
+
+from abac_demo.tools.pagination import (
+    CursorError,
+    MAX_PAGE_SIZE,
+    decode_cursor,
+    encode_cursor,
+    file_signature,
+    page_sequence,
+    read_jsonl_page,
+)
+
+def _identity(record):
+    return record
+
+class TestPagination(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.path = os.path.join(self.tmp_dir.name, "records.jsonl")
+        self.records = [{"id": i, "secret": i * 10} for i in range(25)]
+        with open(self.path, "w") as f:
+            for record in self.records:
+                f.write(json.dumps(record) + "\n")
+
+    def test_jsonl_pages_cover_all_records(self):
+        seen, cursor = [], None
+        while True:
+            page = read_jsonl_page(self.path, 10, cursor, _identity)
+            seen.extend(page.records)
+            cursor = page.next_cursor
+            if cursor is None:
+                break
+        self.assertEqual(seen, self.records)
+
+    def test_jsonl_page_applies_projection(self):
+        page = read_jsonl_page(self.path, 2, None, lambda r: {"id": r["id"]})
+        self.assertEqual(page.records, [{"id": 0}, {"id": 1}])
+
+    def test_exact_final_page_has_no_cursor(self):
+        page = read_jsonl_page(self.path, 25, None, _identity)
+        self.assertEqual(len(page.records), 25)
+        self.assertIsNone(page.next_cursor)
+
+    def test_stale_cursor_is_rejected(self):
+        page = read_jsonl_page(self.path, 5, None, _identity)
+        with open(self.path, "a") as f:
+            f.write(json.dumps({"id": 99}) + "\n")
+        os.utime(self.path, ns=(1, 1))
+        with self.assertRaises(CursorError):
+            read_jsonl_page(self.path, 5, page.next_cursor, _identity)
+
+    def test_malformed_cursor_is_rejected(self):
+        with self.assertRaises(CursorError):
+            decode_cursor("not-a-cursor", (0, 0))
+
+    def test_page_sequence(self):
+        signature = file_signature(self.path)
+        page = page_sequence(self.records, 20, None, signature)
+        self.assertEqual(page.records, self.records[:20])
+        page = page_sequence(self.records, 20, page.next_cursor, signature)
+        self.assertEqual(page.records, self.records[20:])
+        self.assertIsNone(page.next_cursor)
+
+    def test_page_size_is_capped_and_validated(self):
+        records = list(range(MAX_PAGE_SIZE + 5))
+        page = page_sequence(records, MAX_PAGE_SIZE * 2, None, (0, 0))
+        self.assertEqual(len(page.records), MAX_PAGE_SIZE)
+        with self.assertRaises(ValueError):
+            page_sequence(records, 0, None, (0, 0))
+
+    def test_cursor_round_trip(self):
+        self.assertEqual(decode_cursor(encode_cursor(42, (1, 2)), (1, 2)), 42)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import unittest
+import copy
+import json
+import os
+import tempfile
+
+from abac_demo.policy import DEFAULT_POLICY, PolicyError, compile_policy, load_policy
+
+class TestABACPolicy(unittest.TestCase):
+
+    def setUp(self):
+        self.policy = compile_policy(DEFAULT_POLICY)
+
+    def test_manager_reads_full(self):
+        decision = self.policy.evaluate({"access_level": "manager"}, "marketing")
+        self.assertTrue(decision.allowed)
+        self.assertEqual(decision.field_set, "full")
+        self.assertIsNone(decision.fields)
+        self.assertEqual(decision.rule, "managers-read-full")
+
+    def test_employee_reads_limited_fields(self):
+        decision = self.policy.evaluate({"access_level": "employee"}, "sales")
+        self.assertTrue(decision.allowed)
+        self.assertEqual(decision.field_set, "limited")
+        self.assertEqual(decision.fields, frozenset({"deals"}))
+
+    def test_deny_overrides_allow(self):
+        decision = self.policy.evaluate("marketing_manager", "sales")
+        self.assertFalse(decision.allowed)
+        self.assertEqual(decision.rule, "marketing-only-marketing")
+        self.assertTrue(self.policy.evaluate("marketing_manager", "marketing").allowed)
+
+    def test_unknown_values_are_denied(self):
+        self.assertFalse(self.policy.evaluate({"access_level": "admin"}, "marketing").allowed)
+        self.assertFalse(self.policy.evaluate({"access_level": "manager"}, "finance").allowed)
+        self.assertFalse(self.policy.evaluate({"access_level": "manager"}, "marketing", "delete").allowed)
+        self.assertFalse(self.policy.knows_value("access_level", "admin"))
+
+    def test_unknown_named_subject_raises(self):
+        with self.assertRaises(PolicyError):
+            self.policy.evaluate("nobody", "marketing")
+
+    def test_evaluate_many_matches_evaluate(self):
+        pairs = [(subject, datastore) for subject in self.policy.subjects for datastore in ("marketing", "sales")] * 500
+        decisions = self.policy.evaluate_many(pairs)
+        self.assertEqual(len(decisions), len(pairs))
+        for (subject, datastore), decision in zip(pairs[:8], decisions[:8]):
+            self.assertEqual(decision, self.policy.evaluate(subject, datastore))
+
+    def test_invalid_policy_is_rejected(self):
+        spec = copy.deepcopy(DEFAULT_POLICY)
+        spec["rules"].append({"effect": "allow", "subject": {"clearance": "top"}, "field_set": "full"})
+        with self.assertRaises(PolicyError):
+            compile_policy(spec)
+        spec = copy.deepcopy(DEFAULT_POLICY)
+        spec["rules"][0]["field_set"] = "secret"
+        with self.assertRaises(PolicyError):
+            compile_policy(spec)
+
+    def test_load_policy_from_file(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "policy.json")
+            with open(path, "w") as f:
+                json.dump(DEFAULT_POLICY, f)
+            policy = load_policy(path)
+        self.assertEqual(len(policy), len(self.policy))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,26 @@
+import unittest
+
+from abac_demo.tools.projection import compile_projection
+
+class TestProjection(unittest.TestCase):
+
+    def test_projects_record(self):
+        project = compile_projection(["a", "c"])
+        self.assertEqual(project({"a": 1, "b": 2, "c": 3}), {"a": 1, "c": 3})
+
+    def test_projects_list_of_records_without_copying_values(self):
+        nested = {"deep": [1, 2]}
+        records = [{"a": nested, "b": 2}, {"b": 3}]
+        projected = compile_projection(["a"])(records)
+        self.assertEqual(projected, [{"a": nested}, {}])
+        self.assertIs(projected[0]["a"], nested)
+
+    def test_none_fields_is_identity(self):
+        record = {"a": 1}
+        self.assertIs(compile_projection(None)(record), record)
+
+    def test_projections_are_compiled_once(self):
+        self.assertIs(compile_projection(["b", "a"]), compile_projection({"a", "b"}))
+
+if __name__ == '__main__':
+    unittest.main()
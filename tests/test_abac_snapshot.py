@@ -0,0 +1,79 @@
+import unittest
+import json
+import os
+import tempfile
+from unittest.mock import MagicMock, patch
+
+from abac_demo.policy import DEFAULT_POLICY, compile_policy
+from abac_demo.tools import datastore
+from abac_demo.tools.snapshot import SnapshotError, SnapshotReader, compile_snapshot
+
+class TestABACSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.data_dir = self.tmp_dir.name
+        self.json_path = os.path.join(self.data_dir, "marketing_data.json")
+        self.snapshot_path = os.path.join(self.data_dir, "marketing_data.snap")
+        self.records = [{"campaigns": ["Q1_Launch"], "budget": 100}, {"campaigns": ["Holiday"], "budget": 200}]
+        with open(self.json_path, "w") as f:
+            json.dump({"full": self.records}, f)
+        self.field_sets = compile_policy(DEFAULT_POLICY).field_sets["marketing"]
+        self.mock_tool_context = MagicMock()
+        datastore.datastore_cache.clear()
+        self.addCleanup(datastore.datastore_cache.clear)
+        patcher = patch.object(datastore, "DATA_DIR", self.data_dir)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_sections_hold_pre_split_field_sets(self):
+        compile_snapshot(self.json_path, self.snapshot_path, self.field_sets)
+        reader = SnapshotReader(self.snapshot_path)
+        self.assertEqual(reader.section("full"), self.records)
+        self.assertEqual(reader.section("limited"), [{"campaigns": ["Q1_Launch"]}, {"campaigns": ["Holiday"]}])
+        self.assertTrue(reader.has_section("limited", frozenset({"campaigns"})))
+        self.assertFalse(reader.has_section("limited", frozenset({"campaigns", "budget"})))
+
+    def test_datastore_prefers_fresh_snapshot(self):
+        compile_snapshot(self.json_path, self.snapshot_path, self.field_sets)
+        with patch.object(datastore, "_load_json") as mock_load_json:
+            result = datastore.get_datastore_content("marketing", "employee", self.mock_tool_context)
+            paged = datastore.get_datastore_content("marketing", "manager", self.mock_tool_context, page_size=1)
+        mock_load_json.assert_not_called()
+        self.assertEqual(result["data"], [{"campaigns": ["Q1_Launch"]}, {"campaigns": ["Holiday"]}])
+        self.assertEqual(paged["data"], self.records[:1])
+
+    def test_stale_snapshot_falls_back_to_json(self):
+        compile_snapshot(self.json_path, self.snapshot_path, self.field_sets)
+        with open(self.json_path, "w") as f:
+            json.dump({"full": [{"campaigns": ["New"], "budget": 1}]}, f)
+        os.utime(self.json_path, ns=(1, 1))
+        result = datastore.get_datastore_content("marketing", "manager", self.mock_tool_context)
+        self.assertEqual(result["data"], [{"campaigns": ["New"], "budget": 1}])
+
+    def test_stale_snapshot_warned_once(self):
+        compile_snapshot(self.json_path, self.snapshot_path, self.field_sets)
+        os.utime(self.json_path, ns=(1, 1))
+        self.addCleanup(datastore._stale_snapshots_warned.clear)
+        with self.assertLogs(datastore.logger, level="WARNING") as logs:
+            for _ in range(3):
+                datastore.get_datastore_content("marketing", "manager", self.mock_tool_context)
+        self.assertEqual(sum("is stale" in line for line in logs.output), 1)
+
+    def test_snapshot_used_when_json_is_missing(self):
+        compile_snapshot(self.json_path, self.snapshot_path, self.field_sets)
+        os.remove(self.json_path)
+        result = datastore.get_datastore_content("marketing", "manager", self.mock_tool_context)
+        self.assertEqual(result["data"], self.records)
+
+    def test_corrupt_snapshot_is_ignored(self):
+        with open(self.snapshot_path, "wb") as f:
+            f.write(b"not a snapshot at all")
+        with self.assertRaises(SnapshotError):
+            SnapshotReader(self.snapshot_path)
+        result = datastore.get_datastore_content("marketing", "manager", self.mock_tool_context)
+        self.assertEqual(result["data"], self.records)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -83,5 +83,28 @@ class TestModelArmorAgent(unittest.IsolatedAsyncioTestCase):
         # Should not call API if prompt is empty
         mock_client_instance.sanitize_user_prompt.assert_not_called()
 
+    @patch('model_armor_demo.agent.modelarmor_v1.ModelArmorAsyncClient')
+    @patch('model_armor_demo.agent.GOOGLE_CLOUD_PROJECT_ID', 'test-project')
+    async def test_local_pii_detection_blocks_without_api_call(self, MockModelArmorAsyncClient):
+        mock_client_instance = MockModelArmorAsyncClient.return_value
+        mock_client_instance.sanitize_user_prompt = AsyncMock()
+
+        self.mock_llm_request.contents = [genai_types.Content(parts=[genai_types.Part(text="my card is 4111 1111 1111 1111")])]
+        response = await model_armor_callback(self.mock_callback_context, self.mock_llm_request)
+        self.assertIn("Blocked by Model Armor", response.content.parts[0].text)
+        self.assertEqual(response.custom_metadata, {"model_armor_tier": "local", "pii_kind": "credit_card"})
+        mock_client_instance.sanitize_user_prompt.assert_not_called()
+
+    @patch('model_armor_demo.agent.modelarmor_v1.ModelArmorAsyncClient')
+    @patch('model_armor_demo.agent.GOOGLE_CLOUD_PROJECT_ID', 'test-project')
+    @patch('model_armor_demo.agent.MODEL_ARMOR_FALLBACK', 'local')
+    async def test_local_fallback_when_model_armor_unavailable(self, MockModelArmorAsyncClient):
+        mock_client_instance = MockModelArmorAsyncClient.return_value
+        mock_client_instance.sanitize_user_prompt = AsyncMock(side_effect=Exception("API unavailable"))
+
+        response = await model_armor_callback(self.mock_callback_context, self.mock_llm_request)
+        self.assertIsNone(response)
+        mock_client_instance.sanitize_user_prompt.assert_called_once()
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,114 @@
+import unittest
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest
+from google.genai import types as genai_types
+
+from model_armor_demo.agent import model_armor_callback
+from model_armor_demo.client_pool import KEEPALIVE_OPTIONS, ModelArmorClientPool, _keepalive_channel
+
+
+def make_client(endpoint):
+    client = MagicMock(name=f"client-{endpoint}")
+    client.transport.close = AsyncMock()
+    client.transport._credentials = None
+    client.transport.grpc_channel.channel_ready = AsyncMock()
+    return client
+
+class TestModelArmorClientPool(unittest.IsolatedAsyncioTestCase):
+
+    async def test_reuses_one_client_per_endpoint(self):
+        pool = ModelArmorClientPool(client_factory=make_client)
+        first = pool.get("a.example.com")
+        self.assertIs(pool.get("a.example.com"), first)
+        self.assertIsNot(pool.get("b.example.com"), first)
+        self.assertEqual((len(pool), pool.created), (2, 2))
+
+    async def test_close_closes_transports(self):
+        pool = ModelArmorClientPool(client_factory=make_client)
+        client = pool.get("a.example.com")
+        await pool.close()
+        client.transport.close.assert_awaited_once()
+        self.assertEqual(len(pool), 0)
+        self.assertIsNot(pool.get("a.example.com"), client)
+
+    async def test_warm_up_connects_and_tolerates_failures(self):
+        pool = ModelArmorClientPool(client_factory=make_client)
+        await pool.warm_up(["a.example.com"])
+        pool.get("a.example.com").transport.grpc_channel.channel_ready.assert_awaited_once()
+
+        failing = make_client("b.example.com")
+        failing.transport.grpc_channel.channel_ready = AsyncMock(side_effect=asyncio.TimeoutError())
+        pool = ModelArmorClientPool(client_factory=lambda endpoint: failing)
+        with self.assertLogs("model_armor_demo.client_pool", level="WARNING"):
+            await pool.warm_up(["b.example.com"])
+        self.assertEqual(len(pool), 1) # The client stays pooled; the first request connects.
+
+    async def test_started_warm_up_is_kept_until_done(self):
+        pool = ModelArmorClientPool(client_factory=make_client)
+        task = pool.start_warm_up(["a.example.com"])
+        self.assertIn(task, pool._warm_up_tasks)
+        await task
+        await asyncio.sleep(0) # Let the done callback run.
+        self.assertEqual(pool._warm_up_tasks, set())
+
+        pool = ModelArmorClientPool(client_factory=MagicMock(side_effect=RuntimeError("no credentials")))
+        with self.assertLogs("model_armor_demo.client_pool", level="WARNING") as logs:
+            task = pool.start_warm_up(["a.example.com"])
+            await asyncio.wait([task])
+            await asyncio.sleep(0)
+        self.assertIn("no credentials", logs.output[0])
+        self.assertEqual(pool._warm_up_tasks, set())
+
+    async def test_clients_are_per_event_loop(self):
+        pool = ModelArmorClientPool(client_factory=make_client)
+        client = pool.get("a.example.com")
+
+        def other_loop():
+            async def get():
+                return pool.get("a.example.com")
+            return asyncio.run(get())
+
+        other = await asyncio.to_thread(other_loop)
+        self.assertIsNot(other, client)
+        pool.get("b.example.com") # Drops the client of the closed loop.
+        self.assertEqual(len(pool), 2)
+
+    def test_shutdown_closes_clients_of_idle_loops(self):
+        pool = ModelArmorClientPool(client_factory=make_client)
+        loop = asyncio.new_event_loop()
+        try:
+            async def get():
+                return pool.get("a.example.com")
+            client = loop.run_until_complete(get())
+            pool.shutdown()
+            client.transport.close.assert_awaited_once()
+            self.assertEqual(len(pool), 0)
+        finally:
+            loop.close()
+
+    @patch('model_armor_demo.client_pool.ModelArmorGrpcAsyncIOTransport.create_channel')
+    def test_channels_send_keepalive_pings(self, mock_create_channel):
+        _keepalive_channel("a.example.com", options=[("grpc.max_send_message_length", -1)])
+        options = mock_create_channel.call_args.kwargs["options"]
+        self.assertIn(("grpc.max_send_message_length", -1), options)
+        for option in KEEPALIVE_OPTIONS:
+            self.assertIn(option, options)
+
+    @patch('model_armor_demo.agent.modelarmor_v1.ModelArmorAsyncClient')
+    @patch('model_armor_demo.agent.GOOGLE_CLOUD_PROJECT_ID', 'test-project')
+    async def test_callback_reuses_pooled_client(self, MockModelArmorAsyncClient):
+        mock_response = MagicMock()
+        mock_response.sanitization_result.filter_match_state = 1
+        MockModelArmorAsyncClient.return_value.sanitize_user_prompt = AsyncMock(return_value=mock_response)
+        request = LlmRequest(contents=[genai_types.Content(parts=[genai_types.Part(text="test prompt")])])
+
+        for _ in range(3):
+            self.assertIsNone(await model_armor_callback(MagicMock(spec=CallbackContext), request))
+        MockModelArmorAsyncClient.assert_called_once()
+        self.assertEqual(MockModelArmorAsyncClient.return_value.sanitize_user_prompt.await_count, 3)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,265 @@
+import unittest
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest
+from google.api_core import exceptions as api_exceptions
+from google.cloud import modelarmor_v1
+from google.genai import types as genai_types
+
+from model_armor_demo import agent
+from model_armor_demo.agent import model_armor_callback, model_armor_metrics
+from model_armor_demo.resilience import CircuitBreaker, LatencyHistogram, hedged, metrics_text
+from model_armor_demo.singleflight import sanitize_flights
+from model_armor_demo.verdict_cache import sanitize_cache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def no_match_response():
+    return modelarmor_v1.SanitizeUserPromptResponse(sanitization_result=modelarmor_v1.SanitizationResult(
+        filter_match_state=modelarmor_v1.FilterMatchState.NO_MATCH_FOUND,
+        invocation_result=modelarmor_v1.InvocationResult.SUCCESS,
+    ))
+
+
+class TestLatencyHistogram(unittest.TestCase):
+
+    def test_percentile_needs_enough_samples(self):
+        histogram = LatencyHistogram()
+        for latency in range(1, 11):
+            histogram.observe(latency)
+        self.assertIsNone(histogram.percentile(95))
+        self.assertIsNone(histogram.hedge_delay())
+        for latency in range(11, 101):
+            histogram.observe(latency)
+        self.assertEqual(histogram.percentile(95), 96)
+        self.assertAlmostEqual(histogram.hedge_delay(95, floor_ms=50), 0.096)
+        self.assertAlmostEqual(histogram.hedge_delay(50, floor_ms=200), 0.2)
+        self.assertIsNone(histogram.hedge_delay(0))
+
+    def test_snapshot_is_cumulative(self):
+        histogram = LatencyHistogram(buckets_ms=(10, 100))
+        for latency in (5, 10, 50, 500):
+            histogram.observe(latency)
+        snapshot = histogram.snapshot()
+        self.assertEqual(snapshot["buckets"], {10: 2, 100: 3, float("inf"): 4})
+        self.assertEqual(snapshot["count"], 4)
+        self.assertEqual(snapshot["sum_ms"], 565)
+
+
+class TestCircuitBreaker(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker(
+            window=10, min_calls=4, error_rate=0.5, slow_call_ms=100, slow_rate=0.5, open_seconds=30, clock=self.clock
+        )
+
+    def test_trips_on_error_rate(self):
+        for success in (True, False, True):
+            self.breaker.record(success, 10)
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED) # Fewer than min_calls.
+        self.breaker.record(False, 10)
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(self.breaker.allow())
+        self.assertEqual(self.breaker.stats()["rejected"], 1)
+
+    def test_trips_on_slow_rate(self):
+        for latency in (10, 500, 10, 500):
+            self.breaker.record(True, latency)
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+
+    def test_half_open_probe_closes_or_reopens(self):
+        for _ in range(4):
+            self.breaker.record(False, 10)
+        self.clock.now = 30
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertTrue(self.breaker.allow())
+        self.assertFalse(self.breaker.allow()) # One probe at a time.
+        self.breaker.record(False, 10)
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.assertEqual(self.breaker.stats()["times_opened"], 2)
+
+        self.clock.now = 60
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record(True, 10)
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+        self.assertTrue(self.breaker.allow())
+
+    def test_lost_probe_expires(self):
+        for _ in range(4):
+            self.breaker.record(False, 10)
+        self.clock.now = 30
+        self.assertTrue(self.breaker.allow())
+        self.clock.now = 45
+        self.assertFalse(self.breaker.allow())
+        self.clock.now = 60
+        self.assertTrue(self.breaker.allow())
+
+
+class TestHedged(unittest.IsolatedAsyncioTestCase):
+
+    async def test_hedge_wins_over_slow_attempt(self):
+        delays = [1.0, 0.0]
+        cancelled = []
+
+        async def attempt():
+            delay = delays.pop(0)
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                cancelled.append(delay)
+                raise
+            return delay
+
+        self.assertEqual(await hedged(attempt, hedge_delay=0.01, max_attempts=2), 0.0)
+        await asyncio.sleep(0)
+        self.assertEqual(cancelled, [1.0])
+
+    async def test_retries_transient_error(self):
+        attempt = AsyncMock(side_effect=[api_exceptions.ServiceUnavailable("down"), "ok"])
+        self.assertEqual(await hedged(attempt, hedge_delay=None, max_attempts=2), "ok")
+        self.assertEqual(attempt.await_count, 2)
+
+    async def test_does_not_retry_other_errors(self):
+        attempt = AsyncMock(side_effect=api_exceptions.PermissionDenied("no"))
+        with self.assertRaises(api_exceptions.PermissionDenied):
+            await hedged(attempt, hedge_delay=None, max_attempts=3)
+        attempt.assert_awaited_once()
+
+    async def test_no_attempt_after_deadline(self):
+        loop = asyncio.get_running_loop()
+        attempt = AsyncMock(side_effect=[api_exceptions.DeadlineExceeded("late"), "ok"])
+        with self.assertRaises(api_exceptions.DeadlineExceeded):
+            await hedged(attempt, hedge_delay=None, max_attempts=2, deadline=loop.time())
+        attempt.assert_awaited_once()
+
+        async def slow():
+            await asyncio.sleep(0.05)
+            return "slow"
+        attempt = AsyncMock(side_effect=slow)
+        self.assertEqual(await hedged(attempt, hedge_delay=0.01, max_attempts=2, deadline=loop.time() + 0.005), "slow")
+        attempt.assert_awaited_once()
+
+    async def test_raises_last_error_when_attempts_run_out(self):
+        attempt = AsyncMock(side_effect=[api_exceptions.ServiceUnavailable("1"), api_exceptions.ServiceUnavailable("2")])
+        with self.assertRaisesRegex(api_exceptions.ServiceUnavailable, "2"):
+            await hedged(attempt, hedge_delay=None, max_attempts=2)
+
+
+class TestModelArmorCallbackResilience(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        for reset in (agent.breaker.reset, agent.rpc_latency.clear, agent.check_latency.clear,
+                      agent.check_outcomes.clear, sanitize_cache.clear, sanitize_flights.clear_stats):
+            reset()
+            self.addCleanup(reset)
+        self.context = MagicMock(spec=CallbackContext)
+
+    def request(self, text):
+        return LlmRequest(contents=[genai_types.Content(parts=[genai_types.Part(text=text)])])
+
+    def hanging_client(self, MockModelArmorAsyncClient):
+        async def sanitize(request, timeout=None):
+            await asyncio.sleep(10)
+        MockModelArmorAsyncClient.return_value.sanitize_user_prompt = AsyncMock(side_effect=sanitize)
+
+    @patch('model_armor_demo.resilience.DEADLINE_MS', 20)
+    @patch('model_armor_demo.agent.modelarmor_v1.ModelArmorAsyncClient')
+    @patch('model_armor_demo.agent.GOOGLE_CLOUD_PROJECT_ID', 'test-project')
+    async def test_deadline_applies_fallback_policy(self, MockModelArmorAsyncClient):
+        self.hanging_client(MockModelArmorAsyncClient)
+        with patch.object(agent, "MODEL_ARMOR_FALLBACK", "block"):
+            response = await model_armor_callback(self.context, self.request("summarize this"))
+            self.assertIn("An error occurred during safety check", response.content.parts[0].text)
+        with patch.object(agent, "MODEL_ARMOR_FALLBACK", "open"):
+            self.assertIsNone(await model_armor_callback(self.context, self.request("summarize that")))
+        with patch.object(agent, "MODEL_ARMOR_FALLBACK", "local"):
+            self.assertIsNone(await model_armor_callback(self.context, self.request("summarize both")))
+            response = await model_armor_callback(self.context, self.request("some sensitive plans"))
+            self.assertEqual(response.custom_metadata, {"model_armor_tier": "local", "rule": "sensitive-keyword"})
+        self.assertEqual(agent.check_outcomes["deadline_exceeded"], 4)
+
+    @patch('model_armor_demo.agent.modelarmor_v1.ModelArmorAsyncClient')
+    @patch('model_armor_demo.agent.GOOGLE_CLOUD_PROJECT_ID', 'test-project')
+    async def test_transient_error_is_retried(self, MockModelArmorAsyncClient):
+        sanitize = MockModelArmorAsyncClient.return_value.sanitize_user_prompt = AsyncMock(
+            side_effect=[api_exceptions.ServiceUnavailable("unavailable"), no_match_response()]
+        )
+        self.assertIsNone(await model_armor_callback(self.context, self.request("retry me")))
+        self.assertEqual(sanitize.await_count, 2)
+        self.assertIn("timeout", sanitize.await_args.kwargs)
+        self.assertEqual(agent.rpc_latency.snapshot()["count"], 1)
+
+    @patch('model_armor_demo.resilience.DEADLINE_MS', 20)
+    @patch('model_armor_demo.agent.modelarmor_v1.ModelArmorAsyncClient')
+    @patch('model_armor_demo.agent.GOOGLE_CLOUD_PROJECT_ID', 'test-project')
+    async def test_timed_out_check_records_one_breaker_outcome(self, MockModelArmorAsyncClient):
+        async def sanitize(request, timeout=None):
+            await asyncio.sleep(timeout)
+            raise api_exceptions.DeadlineExceeded("deadline exceeded")
+        sanitize_mock = MockModelArmorAsyncClient.return_value.sanitize_user_prompt = AsyncMock(side_effect=sanitize)
+        with patch.object(agent, "MODEL_ARMOR_FALLBACK", "open"):
+            self.assertIsNone(await model_armor_callback(self.context, self.request("too slow")))
+        await asyncio.sleep(0.03) # Let the shared call finish after the caller gave up.
+        sanitize_mock.assert_awaited_once()
+        self.assertEqual(agent.breaker.stats()["calls"], 1)
+
+    @patch('model_armor_demo.agent.modelarmor_v1.ModelArmorAsyncClient')
+    @patch('model_armor_demo.agent.GOOGLE_CLOUD_PROJECT_ID', 'test-project')
+    async def test_transient_error_records_one_breaker_outcome(self, MockModelArmorAsyncClient):
+        MockModelArmorAsyncClient.return_value.sanitize_user_prompt = AsyncMock(
+            side_effect=[api_exceptions.ServiceUnavailable("unavailable"), no_match_response()]
+        )
+        self.assertIsNone(await model_armor_callback(self.context, self.request("retry once")))
+        self.assertEqual(agent.breaker.stats()["calls"], 1)
+        self.assertEqual(agent.breaker.stats()["error_rate"], 0.0)
+
+    @patch('model_armor_demo.agent.modelarmor_v1.ModelArmorAsyncClient')
+    @patch('model_armor_demo.agent.GOOGLE_CLOUD_PROJECT_ID', 'test-project')
+    async def test_open_circuit_skips_model_armor(self, MockModelArmorAsyncClient):
+        sanitize = MockModelArmorAsyncClient.return_value.sanitize_user_prompt = AsyncMock(
+            side_effect=api_exceptions.PermissionDenied("denied")
+        )
+        for i in range(agent.breaker.min_calls):
+            await model_armor_callback(self.context, self.request(f"prompt {i}"))
+        self.assertEqual(agent.breaker.state, CircuitBreaker.OPEN)
+        calls = sanitize.await_count
+
+        with patch.object(agent, "MODEL_ARMOR_FALLBACK", "open"):
+            self.assertIsNone(await model_armor_callback(self.context, self.request("another prompt")))
+        self.assertEqual(sanitize.await_count, calls)
+        self.assertEqual(agent.check_outcomes["circuit_open"], 1)
+
+        metrics = model_armor_metrics()
+        self.assertIn('model_armor_circuit_state{state="open"} 1', metrics)
+        self.assertIn("model_armor_circuit_rejected_total 1", metrics)
+        self.assertIn("model_armor_circuit_open_total 1", metrics)
+
+
+class TestMetricsText(unittest.TestCase):
+
+    def test_renders_breaker_histograms_and_counters(self):
+        histogram = LatencyHistogram(buckets_ms=(10, 100))
+        histogram.observe(7)
+        histogram.observe(70)
+        text = metrics_text(CircuitBreaker(), {"rpc_latency": histogram}, counters={"errors_total": 3})
+        self.assertIn('model_armor_circuit_state{state="closed"} 1', text)
+        self.assertIn('model_armor_circuit_state{state="open"} 0', text)
+        self.assertIn("# TYPE model_armor_rpc_latency_ms histogram", text)
+        self.assertIn('model_armor_rpc_latency_ms_bucket{le="10"} 1', text)
+        self.assertIn('model_armor_rpc_latency_ms_bucket{le="+Inf"} 2', text)
+        self.assertIn("model_armor_rpc_latency_ms_count 2", text)
+        self.assertIn("model_armor_errors_total 3", text)
+        self.assertTrue(text.endswith("\n"))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import unittest
+import tracemalloc
+from unittest.mock import patch
+
+from model_armor_demo.tools import sensitive_tool
+from model_armor_demo.tools.sensitive_tool import handle_sensitive_data, handle_sensitive_data_stream, iter_chunks
+
+class TestSensitiveToolStreaming(unittest.TestCase):
+
+    def test_iter_chunks(self):
+        self.assertEqual(list(iter_chunks("abcdefg", 3)), ["abc", "def", "g"])
+        self.assertEqual(list(iter_chunks("", 3)), [])
+
+    def test_stream_summary_for_clean_payload(self):
+        result = handle_sensitive_data_stream(["quarterly ", "report ", "x" * 100])
+        self.assertEqual(result["status"], "success")
+        summary = result["summary"]
+        self.assertEqual((summary["characters"], summary["chunks"]), (117, 3))
+        self.assertEqual(summary["preview"], "quarterly report xxxxxxxxxxxxxxx...")
+        self.assertEqual(len(summary["digest"]), 32)
+        # Same payload, different chunking: same digest.
+        self.assertEqual(handle_sensitive_data_stream(["quarterly report " + "x" * 100])["summary"]["digest"], summary["digest"])
+
+    def test_stream_catches_term_split_across_chunks(self):
+        result = handle_sensitive_data_stream(["this is sens", "itive", " data"])
+        self.assertEqual(result["status"], "error")
+        self.assertEqual((result["rule"], result["chunk"]), ("sensitive-keyword", 1))
+        self.assertEqual(result["summary"]["characters"], 22)
+
+    def test_large_payload_uses_streaming_mode_without_logging_it(self):
+        payload = "a" * 100_000 + " sensitive " + "b" * 100_000
+        with patch.object(sensitive_tool, "STREAMING_THRESHOLD", 1000), self.assertLogs(sensitive_tool.logger) as logs:
+            result = handle_sensitive_data(payload)
+        self.assertEqual(result["status"], "error")
+        self.assertEqual(result["chunk"], 1) # 65,536-character chunks
+        self.assertTrue(all(len(line) < 500 for line in logs.output))
+
+    def test_small_payload_keeps_inline_result(self):
+        self.assertEqual(handle_sensitive_data("quarterly report"), {
+            "status": "success", "data": "Successfully handled data: quarterly report"
+        })
+
+    def test_inline_payload_is_not_logged_in_full(self):
+        payload = "quarterly report " + "x" * 60_000
+        with self.assertLogs(sensitive_tool.logger) as logs:
+            result = handle_sensitive_data(payload)
+        self.assertEqual(result["status"], "success")
+        self.assertTrue(all(len(line) < 500 for line in logs.output))
+        self.assertTrue(any("60017 characters" in line for line in logs.output))
+
+    def test_lone_surrogates_are_summarized(self):
+        self.assertEqual(handle_sensitive_data("abc \ud800 def")["status"], "success")
+        result = handle_sensitive_data_stream(["abc \ud800", " def"])
+        self.assertEqual(result["status"], "success")
+        self.assertEqual(result["summary"]["characters"], 9)
+
+    def test_streaming_memory_is_bounded_by_chunk_size(self):
+        chunk = "quarterly report " * 4000 # 68,000 characters
+        tracemalloc.start()
+        try:
+            result = handle_sensitive_data_stream(chunk for _ in range(30)) # About 2 MB in total
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        self.assertEqual(result["status"], "success")
+        self.assertLess(peak, 1_000_000)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+import unittest
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest
+from google.genai import types as genai_types
+
+from model_armor_demo.agent import model_armor_callback
+from model_armor_demo.singleflight import SingleFlight, sanitize_flights
+from model_armor_demo.verdict_cache import sanitize_cache
+
+class TestSingleFlight(unittest.IsolatedAsyncioTestCase):
+
+    async def test_concurrent_callers_share_one_call(self):
+        flights = SingleFlight()
+        release = asyncio.Event()
+        calls = 0
+
+        async def call():
+            nonlocal calls
+            calls += 1
+            await release.wait()
+            return "verdict"
+
+        waiters = [asyncio.create_task(flights.do("key", call)) for _ in range(5)]
+        await asyncio.sleep(0)
+        self.assertEqual(len(flights), 1)
+        release.set()
+        self.assertEqual(await asyncio.gather(*waiters), ["verdict"] * 5)
+        self.assertEqual(calls, 1)
+        self.assertEqual(len(flights), 0)
+        self.assertEqual(flights.stats()["coalesced"], 4)
+
+        self.assertEqual(await flights.do("key", call), "verdict") # Released: a new call
+        self.assertEqual(calls, 2)
+
+    async def test_error_propagates_to_every_waiter(self):
+        flights = SingleFlight()
+
+        async def call():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("unavailable")
+
+        results = await asyncio.gather(*(flights.do("key", call) for _ in range(3)), return_exceptions=True)
+        self.assertEqual(len(results), 3)
+        for result in results:
+            self.assertIsInstance(result, RuntimeError)
+        self.assertEqual(len(flights), 0)
+
+    async def test_cancelled_waiter_does_not_cancel_shared_call(self):
+        flights = SingleFlight()
+        release = asyncio.Event()
+
+        async def call():
+            await release.wait()
+            return 42
+
+        first = asyncio.create_task(flights.do("key", call))
+        second = asyncio.create_task(flights.do("key", call))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        self.assertEqual(await second, 42)
+        with self.assertRaises(asyncio.CancelledError):
+            await first
+
+    async def test_distinct_keys_run_separately(self):
+        flights = SingleFlight()
+
+        async def call(value):
+            await asyncio.sleep(0)
+            return value
+
+        self.assertEqual(await asyncio.gather(flights.do("a", lambda: call(1)), flights.do("b", lambda: call(2))), [1, 2])
+        self.assertEqual(flights.stats()["calls"], 2)
+
+class TestModelArmorCallbackSingleFlight(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        sanitize_cache.clear()
+        self.addCleanup(sanitize_cache.clear)
+        self.context = MagicMock(spec=CallbackContext)
+        self.request = LlmRequest(contents=[genai_types.Content(parts=[genai_types.Part(text="fan-out prompt")])])
+
+    @patch('model_armor_demo.agent.modelarmor_v1.ModelArmorAsyncClient')
+    @patch('model_armor_demo.agent.GOOGLE_CLOUD_PROJECT_ID', 'test-project')
+    async def test_concurrent_identical_prompts_issue_one_rpc(self, MockModelArmorAsyncClient):
+        async def sanitize(request, timeout=None):
+            await asyncio.sleep(0.01)
+            response = MagicMock()
+            response.sanitization_result.filter_match_state = 2
+            return response
+        mock_sanitize = MockModelArmorAsyncClient.return_value.sanitize_user_prompt = AsyncMock(side_effect=sanitize)
+
+        responses = await asyncio.gather(*(model_armor_callback(self.context, self.request) for _ in range(4)))
+        for response in responses:
+            self.assertIn("Blocked by Model Armor", response.content.parts[0].text)
+        mock_sanitize.assert_awaited_once()
+
+    @patch('model_armor_demo.agent.modelarmor_v1.ModelArmorAsyncClient')
+    @patch('model_armor_demo.agent.GOOGLE_CLOUD_PROJECT_ID', 'test-project')
+    async def test_shared_error_reaches_every_callback(self, MockModelArmorAsyncClient):
+        async def sanitize(request, timeout=None):
+            await asyncio.sleep(0.01)
+            raise Exception("API error")
+        MockModelArmorAsyncClient.return_value.sanitize_user_prompt = AsyncMock(side_effect=sanitize)
+
+        responses = await asyncio.gather(*(model_armor_callback(self.context, self.request) for _ in range(3)))
+        for response in responses:
+            self.assertIn("An error occurred during safety check", response.content.parts[0].text)
+        self.assertEqual(len(sanitize_flights), 0)
+
+if __name__ == '__main__':
+    unittest.main()
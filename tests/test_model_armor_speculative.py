@@ -0,0 +1,95 @@
+import unittest
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest, LlmResponse
+from google.adk.models.google_llm import Gemini
+from google.genai import types as genai_types
+
+from model_armor_demo.agent import model_armor_callback
+from model_armor_demo.speculative import SpeculativeGemini
+
+
+def text_response(text):
+    return LlmResponse(content=genai_types.Content(parts=[genai_types.Part(text=text)]))
+
+class TestSpeculativeGemini(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.events = []
+        self.request = LlmRequest(contents=[genai_types.Content(parts=[genai_types.Part(text="hello")])])
+
+    def fake_model(self, chunks, delay=0.0, error=None):
+        events = self.events
+
+        async def generate_content_async(model, llm_request, stream=False):
+            events.append("model-started")
+            try:
+                for chunk in chunks:
+                    if delay:
+                        await asyncio.sleep(delay)
+                    yield text_response(chunk)
+                if error is not None:
+                    raise error
+            finally:
+                events.append("model-finished")
+        return patch.object(Gemini, "generate_content_async", generate_content_async)
+
+    def make_check(self, verdict, delay=0.02):
+        async def check(llm_request):
+            self.events.append("check-started")
+            await asyncio.sleep(delay)
+            self.events.append("check-finished")
+            return verdict
+        return check
+
+    async def collect(self, model):
+        texts = []
+        async for response in model.generate_content_async(self.request, stream=True):
+            self.events.append("released")
+            texts.append(response.content.parts[0].text)
+        return texts
+
+    async def test_clean_prompt_releases_held_output_after_verdict(self):
+        model = SpeculativeGemini(model="gemini-2.5-flash", check=self.make_check(None))
+        with self.fake_model(["a", "b", "c"]):
+            self.assertEqual(await self.collect(model), ["a", "b", "c"])
+        # The model ran while the check was pending, and nothing was released before the verdict.
+        self.assertLess(self.events.index("model-finished"), self.events.index("check-finished"))
+        self.assertLess(self.events.index("check-finished"), self.events.index("released"))
+
+    async def test_blocked_prompt_cancels_model_call(self):
+        blocked = text_response("Blocked by Model Armor: Request contains sensitive information.")
+        model = SpeculativeGemini(model="gemini-2.5-flash", check=self.make_check(blocked))
+        with self.fake_model(["a", "b", "c", "d"], delay=0.05):
+            self.assertEqual(await self.collect(model), [blocked.content.parts[0].text])
+        self.assertIn("model-finished", self.events) # Closed by cancellation, not by completion.
+        self.assertEqual(self.events.count("released"), 1)
+
+    async def test_model_error_is_raised_after_clean_verdict(self):
+        model = SpeculativeGemini(model="gemini-2.5-flash", check=self.make_check(None))
+        with self.fake_model(["a"], error=RuntimeError("model failed")):
+            with self.assertRaises(RuntimeError):
+                await self.collect(model)
+
+    async def test_without_check_passes_through(self):
+        model = SpeculativeGemini(model="gemini-2.5-flash")
+        with self.fake_model(["a", "b"]):
+            self.assertEqual(await self.collect(model), ["a", "b"])
+
+    @patch('model_armor_demo.agent.modelarmor_v1.ModelArmorAsyncClient')
+    @patch('model_armor_demo.agent.GOOGLE_CLOUD_PROJECT_ID', 'test-project')
+    @patch('model_armor_demo.agent.MODEL_ARMOR_SPECULATIVE', True)
+    async def test_callback_leaves_remote_check_to_model(self, MockModelArmorAsyncClient):
+        MockModelArmorAsyncClient.return_value.sanitize_user_prompt = AsyncMock()
+        self.assertIsNone(await model_armor_callback(MagicMock(spec=CallbackContext), self.request))
+        MockModelArmorAsyncClient.return_value.sanitize_user_prompt.assert_not_called()
+
+        # The local tier still blocks before any model call.
+        self.request.contents = [genai_types.Content(parts=[genai_types.Part(text="my card is 4111 1111 1111 1111")])]
+        response = await model_armor_callback(MagicMock(spec=CallbackContext), self.request)
+        self.assertEqual(response.custom_metadata["model_armor_tier"], "local")
+
+if __name__ == '__main__':
+    unittest.main()
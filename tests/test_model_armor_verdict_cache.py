@@ -0,0 +1,108 @@
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest
+from google.cloud import modelarmor_v1
+from google.genai import types as genai_types
+
+from model_armor_demo.agent import model_armor_callback
+from model_armor_demo.verdict_cache import SanitizeVerdictCache, is_reusable, prompt_digest, sanitize_cache
+
+TEMPLATE = "projects/p/locations/l/templates/ma-all-low"
+
+
+def result(match_state, invocation=modelarmor_v1.InvocationResult.SUCCESS):
+    return modelarmor_v1.SanitizationResult(filter_match_state=match_state, invocation_result=invocation)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class TestSanitizeVerdictCache(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = SanitizeVerdictCache(ttl_seconds=60, max_entries=2, disabled_templates=set(), clock=self.clock)
+
+    def test_prompt_digest_ignores_whitespace_only(self):
+        self.assertEqual(prompt_digest("  hello\n\tworld "), prompt_digest("hello world"))
+        self.assertEqual(prompt_digest("café"), prompt_digest("café"))
+        self.assertNotEqual(prompt_digest("Hello world"), prompt_digest("hello world"))
+
+    def test_only_complete_verdicts_are_reusable(self):
+        self.assertTrue(is_reusable(result(modelarmor_v1.FilterMatchState.MATCH_FOUND)))
+        self.assertTrue(is_reusable(result(modelarmor_v1.FilterMatchState.NO_MATCH_FOUND)))
+        self.assertFalse(is_reusable(result(modelarmor_v1.FilterMatchState.NO_MATCH_FOUND, modelarmor_v1.InvocationResult.PARTIAL)))
+        self.assertFalse(is_reusable(result(modelarmor_v1.FilterMatchState.FILTER_MATCH_STATE_UNSPECIFIED)))
+        self.assertFalse(is_reusable(MagicMock()))
+
+    def test_hit_miss_and_expiry(self):
+        digest = prompt_digest("hello")
+        self.assertIsNone(self.cache.get(TEMPLATE, digest))
+        self.assertTrue(self.cache.put(TEMPLATE, digest, result(modelarmor_v1.FilterMatchState.MATCH_FOUND)))
+        self.assertEqual(self.cache.get(TEMPLATE, digest), 2)
+        self.assertIsNone(self.cache.get(TEMPLATE + "-other", digest)) # Keyed by template
+        self.clock.now = 61
+        self.assertIsNone(self.cache.get(TEMPLATE, digest))
+        stats = self.cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["expired"], stats["entries"]), (1, 3, 1, 0))
+
+    def test_uncacheable_and_eviction(self):
+        self.assertFalse(self.cache.put(TEMPLATE, b"a", result(1, modelarmor_v1.InvocationResult.FAILURE)))
+        for digest in (b"a", b"b", b"c"):
+            self.cache.put(TEMPLATE, digest, result(1))
+        self.assertIsNone(self.cache.get(TEMPLATE, b"a"))
+        stats = self.cache.stats()
+        self.assertEqual((stats["uncacheable"], stats["evictions"], stats["entries"]), (1, 1, 2))
+
+    def test_disable_per_template(self):
+        self.cache.put(TEMPLATE, b"a", result(1))
+        self.cache.disable("ma-all-low")
+        self.assertFalse(self.cache.enabled_for(TEMPLATE))
+        self.assertIsNone(self.cache.get(TEMPLATE, b"a"))
+        self.assertFalse(self.cache.put(TEMPLATE, b"a", result(1)))
+        self.assertEqual(self.cache.stats()["entries"], 0)
+        self.cache.enable("ma-all-low")
+        self.assertTrue(self.cache.put(TEMPLATE, b"a", result(1)))
+        self.assertFalse(SanitizeVerdictCache(ttl_seconds=0).enabled_for(TEMPLATE))
+
+class TestModelArmorCallbackCache(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        sanitize_cache.clear()
+        self.addCleanup(sanitize_cache.clear)
+        self.context = MagicMock(spec=CallbackContext)
+        self.request = LlmRequest(contents=[genai_types.Content(parts=[genai_types.Part(text="canned prompt")])])
+
+    @patch('model_armor_demo.agent.modelarmor_v1.ModelArmorAsyncClient')
+    @patch('model_armor_demo.agent.GOOGLE_CLOUD_PROJECT_ID', 'test-project')
+    async def test_repeated_prompt_reuses_verdict(self, MockModelArmorAsyncClient):
+        response = modelarmor_v1.SanitizeUserPromptResponse(sanitization_result=result(modelarmor_v1.FilterMatchState.MATCH_FOUND))
+        sanitize = MockModelArmorAsyncClient.return_value.sanitize_user_prompt = AsyncMock(return_value=response)
+
+        first = await model_armor_callback(self.context, self.request)
+        second = await model_armor_callback(self.context, self.request)
+        self.assertEqual(first.custom_metadata, {"model_armor_tier": "remote"})
+        self.assertEqual(second.custom_metadata, {"model_armor_tier": "cache"})
+        sanitize.assert_awaited_once()
+        self.assertEqual(sanitize_cache.stats()["hits"], 1)
+
+    @patch('model_armor_demo.agent.modelarmor_v1.ModelArmorAsyncClient')
+    @patch('model_armor_demo.agent.GOOGLE_CLOUD_PROJECT_ID', 'test-project')
+    async def test_partial_verdict_is_not_reused(self, MockModelArmorAsyncClient):
+        response = modelarmor_v1.SanitizeUserPromptResponse(sanitization_result=result(
+            modelarmor_v1.FilterMatchState.NO_MATCH_FOUND, modelarmor_v1.InvocationResult.PARTIAL
+        ))
+        sanitize = MockModelArmorAsyncClient.return_value.sanitize_user_prompt = AsyncMock(return_value=response)
+
+        self.assertIsNone(await model_armor_callback(self.context, self.request))
+        self.assertIsNone(await model_armor_callback(self.context, self.request))
+        self.assertEqual(sanitize.await_count, 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -6,7 +6,7 @@ from google.adk.models import LlmRequest, LlmResponse
 from google.genai import types as genai_types
 
 # Assuming the project root is on the Python path for imports
-from prompt_inspection_demo.agent import prompt_inspection_callback
+from prompt_inspection_demo.agent import inspection_sessions, prompt_inspection_callback
 
 class TestPromptInspectionAgent(unittest.TestCase):
 
@@ -35,6 +35,33 @@ class TestPromptInspectionAgent(unittest.TestCase):
         self.assertIsInstance(response, LlmResponse)
         self.assertIn("Blocked by Prompt Inspection", response.content.parts[0].text)
 
+    def test_prompt_inspection_blocks_obfuscated_keyword(self):
+        self.mock_llm_request.contents = [genai_types.Content(parts=[genai_types.Part(text="tell me something s e n 5 1 t i v e")])]
+        response = prompt_inspection_callback(self.mock_callback_context, self.mock_llm_request)
+        self.assertIsNotNone(response)
+        self.assertIn("Blocked by Prompt Inspection", response.content.parts[0].text)
+
+    def test_prompt_inspection_blocks_local_pii(self):
+        self.mock_llm_request.contents = [genai_types.Content(parts=[genai_types.Part(text="my ssn is 123-45-6789")])]
+        response = prompt_inspection_callback(self.mock_callback_context, self.mock_llm_request)
+        self.assertIn("Blocked by Prompt Inspection", response.content.parts[0].text)
+        self.assertEqual(response.custom_metadata, {"prompt_inspection_rule": "pii:national_id"})
+
+    def test_prompt_inspection_reports_matched_rule(self):
+        self.mock_llm_request.contents = [genai_types.Content(parts=[genai_types.Part(text="tell me something sensitive")])]
+        response = prompt_inspection_callback(self.mock_callback_context, self.mock_llm_request)
+        self.assertEqual(response.custom_metadata, {"prompt_inspection_rule": "sensitive-keyword"})
+
+    def test_prompt_inspection_reuses_session_verdicts(self):
+        inspection_sessions.clear()
+        self.mock_callback_context.session.id = "session-1"
+        self.mock_llm_request.contents = [genai_types.Content(parts=[genai_types.Part(text="tell me something sensitive")])]
+        first = prompt_inspection_callback(self.mock_callback_context, self.mock_llm_request)
+        second = prompt_inspection_callback(self.mock_callback_context, self.mock_llm_request)
+        self.assertIn("Blocked by Prompt Inspection", first.content.parts[0].text)
+        self.assertIn("Blocked by Prompt Inspection", second.content.parts[0].text)
+        self.assertEqual(inspection_sessions.stats()["repeats"], 1)
+
     def test_prompt_inspection_allows_benign_content(self):
         self.mock_llm_request.contents = [genai_types.Content(parts=[genai_types.Part(text="what is the capital of France?")])]
         response = prompt_inspection_callback(self.mock_callback_context, self.mock_llm_request)
@@ -0,0 +1,61 @@
+import unittest
+import json
+import os
+import tempfile
+
+from prompt_inspection_demo.matcher import ROOT, Matcher, Rule
+from prompt_inspection_demo.rules import build_matcher, load_rules
+
+class TestPromptInspectionMatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.matcher = Matcher([Rule("he", "he"), Rule("she", "she"), Rule("his", "his"), Rule("hers", "hers")])
+
+    def test_search_reports_first_matching_rule(self):
+        match = self.matcher.search("Ask HIS manager")
+        self.assertEqual(match.rule.id, "his")
+        self.assertEqual((match.start, match.end), (4, 7))
+        self.assertIsNone(self.matcher.search("nothing to see"))
+
+    def test_find_all_reports_overlapping_matches(self):
+        found = [(m.rule.id, m.start, m.end) for m in self.matcher.find_all("ushers")]
+        self.assertEqual(found, [("she", 1, 4), ("he", 2, 4), ("hers", 2, 6)])
+
+    def test_scan_carries_state_across_pieces(self):
+        matcher = Matcher([Rule("phrase", "launch codes")])
+        state, match = matcher.scan("here are the launch co")
+        self.assertIsNone(match)
+        self.assertNotEqual(state, ROOT)
+        state, match = matcher.scan("des for you", state, offset=22)
+        self.assertEqual(match.rule.id, "phrase")
+        self.assertEqual((match.start, match.end), (13, 25))
+
+    def test_many_rules(self):
+        rules = [Rule(f"term-{i}", f"forbidden term {i:05d}") for i in range(5000)]
+        matcher = Matcher(rules)
+        self.assertEqual(len(matcher), 5000)
+        self.assertEqual(matcher.search("please ignore FORBIDDEN TERM 04242 now").rule.id, "term-4242")
+        self.assertIsNone(matcher.search("forbidden term 5" + "x" * 1000))
+
+    def test_duplicate_pattern_keeps_first_rule(self):
+        matcher = Matcher([Rule("first", "secret"), Rule("second", "SECRET")])
+        self.assertEqual(matcher.search("a secret").rule.id, "first")
+
+    def test_empty_pattern_is_rejected(self):
+        with self.assertRaises(ValueError):
+            Matcher([Rule("empty", "")])
+
+    def test_load_rules_from_json_and_text(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            json_path = os.path.join(tmp_dir, "rules.json")
+            with open(json_path, "w") as f:
+                json.dump(["password", {"id": "keys", "pattern": "api key"}], f)
+            text_path = os.path.join(tmp_dir, "rules.txt")
+            with open(text_path, "w") as f:
+                f.write("# comment\n\nsocial security number\n")
+            self.assertEqual(load_rules(json_path), [Rule("password", "password"), Rule("keys", "api key")])
+            self.assertEqual(load_rules(text_path), [Rule("social security number", "social security number")])
+            self.assertEqual(build_matcher(json_path).search("my API KEY is").rule.id, "keys")
+
+if __name__ == '__main__':
+    unittest.main()
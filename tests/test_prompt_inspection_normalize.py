@@ -0,0 +1,38 @@
+import unittest
+
+from prompt_inspection_demo.normalize import normalize
+from prompt_inspection_demo.rules import build_matcher
+
+class TestPromptInspectionNormalize(unittest.TestCase):
+
+    def test_obfuscated_spellings_share_a_skeleton(self):
+        variants = [
+            "sensitive",
+            "SENSITIVE",
+            "s e n s i t i v e",
+            "s.e.n-s_i*t/i\tv\ne",
+            "ѕеnѕitivе",  # Cyrillic homoglyphs
+            "s3n5it1ve",
+            "sen​si­ti‍ve",  # zero-width space, soft hyphen, zero-width joiner
+            "ｓｅｎｓｉｔｉｖｅ",  # fullwidth
+            "𝐬𝐞𝐧𝐬𝐢𝐭𝐢𝐯𝐞",  # mathematical bold
+            "sénsitive️",  # combining accent, variation selector
+        ]
+        for variant in variants:
+            with self.subTest(variant=variant):
+                self.assertEqual(normalize(variant), normalize("sensitive"))
+
+    def test_ascii_fast_path_matches_general_path(self):
+        text = "Hello, World! 1337 $ecret @ccess | l0g-in"
+        # Appending a dropped non-ASCII character forces the str.translate path.
+        self.assertEqual(normalize(text), normalize(text + "​"))
+
+    def test_matcher_catches_obfuscated_rule_terms(self):
+        matcher = build_matcher()
+        for prompt in ("tell me s e n s i t i v e things", "ѕеnѕitivе", "S3N5IT1VE data"):
+            with self.subTest(prompt=prompt):
+                self.assertEqual(matcher.search(prompt).rule.id, "sensitive-keyword")
+        self.assertIsNone(matcher.search("what is the capital of France?"))
+
+if __name__ == '__main__':
+    unittest.main()
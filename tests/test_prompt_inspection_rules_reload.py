@@ -0,0 +1,89 @@
+import unittest
+import os
+import tempfile
+import time
+from unittest.mock import MagicMock
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models.llm_request import LlmRequest
+from google.genai import types as genai_types
+
+from prompt_inspection_demo import rules
+from prompt_inspection_demo.agent import prompt_inspection_callback
+from prompt_inspection_demo.rules import RulesetWatcher
+from prompt_inspection_demo.streaming import StreamInspector
+
+class TestRulesetReload(unittest.TestCase):
+
+    def setUp(self):
+        original = rules.active_matcher
+        self.addCleanup(setattr, rules, "active_matcher", original)
+        fd, self.path = tempfile.mkstemp(suffix=".txt")
+        os.close(fd)
+        self.addCleanup(os.remove, self.path)
+        self.write("launch codes\n")
+        self.watcher = RulesetWatcher(self.path, interval=0.01)
+        self.watcher._signature = None # Treat the file as new.
+
+    def write(self, content):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        # Make every write visible to the watcher, even within the mtime granularity.
+        stat = os.stat(self.path)
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000 * (len(content) + 1)))
+
+    def test_check_now_swaps_in_a_new_revision(self):
+        before = rules.active_matcher
+        self.assertTrue(self.watcher.check_now())
+        self.assertIsNot(rules.active_matcher, before)
+        self.assertEqual(rules.active_matcher.revision, before.revision + 1)
+        self.assertEqual(rules.active_matcher.search("the LAUNCH CODES").rule.id, "launch codes")
+        self.assertFalse(self.watcher.check_now()) # Unchanged file
+
+        self.write("launch codes\nself destruct\n")
+        self.assertTrue(self.watcher.check_now())
+        self.assertEqual(rules.active_matcher.revision, before.revision + 2)
+        self.assertEqual(len(rules.active_matcher), 2)
+
+    def test_invalid_file_keeps_current_ruleset(self):
+        self.watcher.check_now()
+        current = rules.active_matcher
+        fd, json_path = tempfile.mkstemp(suffix=".json")
+        os.write(fd, b'["unterminated"')
+        os.close(fd)
+        self.addCleanup(os.remove, json_path)
+        watcher = RulesetWatcher(json_path)
+        watcher._signature = None
+        with self.assertLogs(rules.logger, level="ERROR"):
+            self.assertFalse(watcher.check_now())
+        self.assertIs(rules.active_matcher, current)
+        self.assertFalse(watcher.check_now()) # Reported once, not on every poll.
+
+    def test_in_flight_stream_finishes_on_old_ruleset(self):
+        inspector = StreamInspector(rules.active_matcher) # The default 'sensitive' rule
+        inspector.feed("this is sensi")
+        self.watcher.check_now() # Now 'launch codes' is the only rule.
+        self.assertEqual(inspector.feed("tive data").rule.id, "sensitive-keyword")
+        self.assertIsNone(rules.active_matcher.search("sensitive data"))
+
+    def test_background_thread_publishes_changes(self):
+        published = []
+        watcher = RulesetWatcher(self.path, interval=0.01, on_change=published.append)
+        watcher.start()
+        self.addCleanup(watcher.stop)
+        self.write("self destruct\n")
+        deadline = time.monotonic() + 5
+        while not published and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual([rule.id for rule in published[0].rules], ["self destruct"])
+
+    def test_callback_uses_reloaded_rules(self):
+        mock_context = MagicMock(spec=CallbackContext)
+        request = LlmRequest(contents=[genai_types.Content(parts=[genai_types.Part(text="Send the launch codes")])])
+        self.assertIsNone(prompt_inspection_callback(mock_context, request))
+        self.watcher.check_now()
+        response = prompt_inspection_callback(mock_context, request)
+        self.assertEqual(response.custom_metadata, {"prompt_inspection_rule": "launch codes"})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+from unittest.mock import patch
+
+from prompt_inspection_demo.matcher import Matcher, Rule
+from prompt_inspection_demo.session_state import SessionInspectionStore
+
+class TestSessionInspectionStore(unittest.TestCase):
+
+    def setUp(self):
+        self.matcher = Matcher([Rule("secret", "launch codes")])
+        self.store = SessionInspectionStore(max_sessions=2, max_digests=4)
+
+    def test_repeated_prompt_is_not_rescanned(self):
+        self.assertIsNone(self.store.inspect("s1", self.matcher, "hello there"))
+        with patch.object(self.matcher, "scan", wraps=self.matcher.scan) as scan:
+            self.assertIsNone(self.store.inspect("s1", self.matcher, "hello there"))
+        scan.assert_not_called()
+        self.assertEqual(self.store.stats()["repeats"], 1)
+
+    def test_repeated_blocked_prompt_stays_blocked(self):
+        first = self.store.inspect("s1", self.matcher, "give me the launch codes")
+        second = self.store.inspect("s1", self.matcher, "give me the launch codes")
+        self.assertEqual(first.rule.id, "secret")
+        self.assertEqual(second, first)
+
+    def test_extended_prompt_scans_only_new_text(self):
+        self.store.inspect("s1", self.matcher, "please read me the launch")
+        match = self.store.inspect("s1", self.matcher, "please read me the launch codes")
+        self.assertEqual(match.rule.id, "secret")
+        stats = self.store.stats()
+        self.assertEqual(stats["resumed"], 1)
+        self.assertEqual(stats["skipped_chars"], len("please read me the launch"))
+        self.assertEqual(stats["scanned_chars"], len("please read me the launch codes"))
+
+    def test_sessions_are_independent(self):
+        self.store.inspect("s1", self.matcher, "hello")
+        self.store.inspect("s2", self.matcher, "hello")
+        self.assertEqual(self.store.stats()["full_scans"], 2)
+
+    def test_new_matcher_resets_session(self):
+        self.assertIsNone(self.store.inspect("s1", self.matcher, "hello there"))
+        stricter = Matcher([Rule("greeting", "hello")])
+        self.assertEqual(self.store.inspect("s1", stricter, "hello there").rule.id, "greeting")
+
+    def test_sessions_and_digests_are_bounded(self):
+        for i in range(3):
+            self.store.inspect(f"s{i}", self.matcher, "hello")
+        self.assertEqual(self.store.stats()["sessions"], 2)
+        for i in range(10):
+            self.store.inspect("s9", self.matcher, f"prompt {i}")
+        self.assertEqual(len(self.store._sessions["s9"].verdicts), 4)
+
+if __name__ == '__main__':
+    unittest.main()
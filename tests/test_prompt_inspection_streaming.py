@@ -0,0 +1,71 @@
+import unittest
+from unittest.mock import MagicMock
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmResponse
+from google.genai import types as genai_types
+
+from prompt_inspection_demo.agent import response_inspection_callback, response_streams
+from prompt_inspection_demo.matcher import Matcher, Rule
+from prompt_inspection_demo.streaming import StreamInspector, StreamInspectionStore
+
+def _response(text, partial=None):
+    return LlmResponse(content=genai_types.Content(role="model", parts=[genai_types.Part(text=text)]), partial=partial)
+
+class TestStreamInspector(unittest.TestCase):
+
+    def test_term_split_across_chunks_is_caught(self):
+        inspector = StreamInspector(Matcher([Rule("secret", "launch codes")]))
+        self.assertIsNone(inspector.feed("here are the lau"))
+        self.assertIsNone(inspector.feed("nch co"))
+        match = inspector.feed("des: 1234")
+        self.assertEqual((match.rule.id, match.start, match.end), ("secret", 13, 25))
+        self.assertIs(inspector.feed("more text"), match)
+
+    def test_store_is_bounded(self):
+        store = StreamInspectionStore(max_streams=2)
+        matcher = Matcher([Rule("x", "x")])
+        for key in ("a", "b", "c"):
+            store.get(key, matcher)
+        self.assertEqual(len(store), 2)
+        self.assertIsNone(store.finish("a"))
+
+class TestResponseInspectionCallback(unittest.TestCase):
+
+    def setUp(self):
+        response_streams.clear()
+        self.mock_callback_context = MagicMock(spec=CallbackContext)
+        self.mock_callback_context.invocation_id = "invocation-1"
+        self.mock_callback_context.agent_name = "worker_agent"
+
+    def test_allows_benign_response(self):
+        self.assertIsNone(response_inspection_callback(self.mock_callback_context, _response("Paris is the capital.")))
+
+    def test_blocks_non_streamed_response(self):
+        response = response_inspection_callback(self.mock_callback_context, _response("Here is the SENSITIVE data"))
+        self.assertIn("Blocked by Response Inspection", response.content.parts[0].text)
+        self.assertEqual(response.custom_metadata, {"response_inspection_rule": "sensitive-keyword"})
+        self.assertTrue(response.turn_complete)
+
+    def test_blocks_stream_when_term_spans_chunks(self):
+        self.assertIsNone(response_inspection_callback(self.mock_callback_context, _response("this is sens", partial=True)))
+        blocked = response_inspection_callback(self.mock_callback_context, _response("itive, sorry", partial=True))
+        self.assertTrue(blocked.partial)
+        self.assertIn("Blocked by Response Inspection", blocked.content.parts[0].text)
+        self.assertTrue(self.mock_callback_context.get_invocation_context.return_value.end_invocation)
+
+        suppressed = response_inspection_callback(self.mock_callback_context, _response(" more text", partial=True))
+        self.assertEqual(suppressed.content.parts, [])
+
+        final = response_inspection_callback(self.mock_callback_context, _response("this is sensitive, sorry more text"))
+        self.assertIn("Blocked by Response Inspection", final.content.parts[0].text)
+        self.assertEqual(len(response_streams), 0)
+
+    def test_clean_stream_is_not_rescanned_at_the_end(self):
+        for chunk in ("all ", "good ", "here"):
+            self.assertIsNone(response_inspection_callback(self.mock_callback_context, _response(chunk, partial=True)))
+        self.assertIsNone(response_inspection_callback(self.mock_callback_context, _response("all good here")))
+        self.assertEqual(len(response_streams), 0)
+
+if __name__ == '__main__':
+    unittest.main()
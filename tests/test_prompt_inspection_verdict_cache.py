@@ -0,0 +1,58 @@
+import unittest
+from unittest.mock import patch
+
+from model_armor_demo.tools.sensitive_tool import handle_sensitive_data
+from prompt_inspection_demo.matcher import Matcher, Rule
+from prompt_inspection_demo.session_state import SessionInspectionStore
+from prompt_inspection_demo.verdict_cache import VerdictCache, verdict_cache
+
+class TestVerdictCache(unittest.TestCase):
+
+    def setUp(self):
+        self.matcher = Matcher([Rule("secret", "launch codes")])
+        self.cache = VerdictCache(max_entries=2)
+
+    def test_repeated_input_is_not_rescanned(self):
+        self.assertIsNone(self.cache.search(self.matcher, "boilerplate greeting"))
+        with patch.object(self.matcher, "scan", wraps=self.matcher.scan) as scan:
+            self.assertIsNone(self.cache.search(self.matcher, "boilerplate greeting"))
+        scan.assert_not_called()
+        stats = self.cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["hit_rate"]), (1, 1, 0.5))
+
+    def test_ruleset_version_is_part_of_the_key(self):
+        self.assertIsNone(self.cache.search(self.matcher, "hello there"))
+        other = Matcher([Rule("greeting", "hello")])
+        self.assertNotEqual(other.version, self.matcher.version)
+        self.assertEqual(self.cache.search(other, "hello there").rule.id, "greeting")
+        self.assertEqual(Matcher([Rule("secret", "launch codes")]).version, self.matcher.version)
+
+    def test_cache_is_bounded(self):
+        for text in ("a", "b", "c"):
+            self.cache.search(self.matcher, text)
+        stats = self.cache.stats()
+        self.assertEqual((stats["entries"], stats["evictions"]), (2, 1))
+
+    def test_sessions_reuse_shared_verdicts(self):
+        store = SessionInspectionStore(cache=self.cache)
+        store.inspect("s1", self.matcher, "shared boilerplate")
+        store.inspect("s2", self.matcher, "shared boilerplate")
+        self.assertEqual(store.stats()["cached"], 1)
+        self.assertEqual(store.stats()["full_scans"], 1)
+
+class TestSensitiveTool(unittest.TestCase):
+
+    def setUp(self):
+        verdict_cache.clear()
+
+    def test_blocks_sensitive_data(self):
+        result = handle_sensitive_data("this is sensitive")
+        self.assertEqual(result["status"], "error")
+
+    def test_handles_benign_data_and_caches_verdict(self):
+        self.assertEqual(handle_sensitive_data("quarterly report")["status"], "success")
+        self.assertEqual(handle_sensitive_data("quarterly report")["status"], "success")
+        self.assertEqual(verdict_cache.stats()["hits"], 1)
+
+if __name__ == '__main__':
+    unittest.main()